@@ -0,0 +1,111 @@
+import struct
+from array import array
+
+# LIS3DH registers and bits not exposed by adafruit_lis3dh
+_REG_CTRL5 = 0x24
+_REG_OUT_X_L = 0x28
+_REG_FIFO_CTRL = 0x2E
+_REG_FIFO_SRC = 0x2F
+_FIFO_EN = 0x40  #  CTRL_REG5: enable FIFO
+_STREAM = 0x80  #   FIFO_CTRL_REG: stream mode, newest 32 samples kept
+_OVERRUN = 0x40  #  FIFO_SRC_REG: full, samples were lost
+_UNREAD = 0x1F  #   FIFO_SRC_REG: unread sample count
+_AUTO_INC = 0x80  # Register address bit for multi-byte reads
+
+STANDARD_GRAVITY = 9.806
+DEPTH = 32  # Samples the LIS3DH FIFO holds
+# Data rate register codes by samples/second, as adafruit_lis3dh DATARATE_*
+DATA_RATES = {1: 0b0001, 10: 0b0010, 25: 0b0011, 50: 0b0100, 100: 0b0101, 200: 0b0110, 400: 0b0111}
+# Counts per g for adafruit_lis3dh RANGE_2_G, _4_G, _8_G and _16_G
+_DIVIDERS = (16380, 8190, 4096, 1365)
+
+
+class AccelFifo:
+    """Batched accelerometer readings: the LIS3DH samples at a fixed rate
+    into its FIFO (stream mode) and poll() collects everything waiting
+    since the last call, so a consumer running slower or jittery still sees
+    every sample, evenly spaced in time. Samples queue here, up to the FIFO
+    depth (oldest dropped), to be taken one at a time with pop(). The FIFO
+    registers are reached through an I2CDevice of our own rather than
+    adafruit_lis3dh's private register helpers. Without one (e.g. a desktop
+    stand-in), each poll() takes one 'acceleration' reading instead."""
+
+    def __init__(self, lis3dh, rate=100, device=None):
+        """'rate' is samples/second, one of DATA_RATES. 'device' is an
+        adafruit_bus_device I2CDevice at the LIS3DH's address, e.g.
+        I2CDevice(i2c, 0x18)."""
+        if rate not in DATA_RATES:
+            raise ValueError("rate must be one of %s" % sorted(DATA_RATES))
+        self.lis3dh = lis3dh
+        self.rate = rate
+        self.queue = array("f", [0.0] * (3 * DEPTH))  # Circular, x, y, z each
+        self.head = self.count = 0
+        self.lost = 0  # Samples overwritten before they were read
+        self.device = device
+        self.address = bytearray(1)  # Register to read
+        self.buffer = bytearray(6)  # What it read, or register and value to write
+        if device:
+            lis3dh.data_rate = DATA_RATES[rate]
+            self.write_register(_REG_CTRL5, self.read_register(_REG_CTRL5)[0] | _FIFO_EN)
+            self.write_register(_REG_FIFO_CTRL, _STREAM)
+            self.scale = STANDARD_GRAVITY / _DIVIDERS[lis3dh.range]
+
+    def read_register(self, register, length=1):
+        """Read 'length' (up to 6) bytes from 'register' on, into and
+        returning 'buffer'."""
+        self.address[0] = register | _AUTO_INC if length > 1 else register
+        with self.device as i2c:
+            i2c.write_then_readinto(self.address, self.buffer, in_end=length)
+        return self.buffer
+
+    def write_register(self, register, value):
+        buffer = self.buffer
+        buffer[0], buffer[1] = register, value
+        with self.device as i2c:
+            i2c.write(buffer, end=2)
+
+    def push(self, x, y, z):
+        if self.count == DEPTH:  # Full, drop oldest
+            self.head = (self.head + 1) % DEPTH
+            self.count -= 1
+            self.lost += 1
+        i = (self.head + self.count) % DEPTH * 3
+        self.queue[i] = x
+        self.queue[i + 1] = y
+        self.queue[i + 2] = z
+        self.count += 1
+
+    def poll(self):
+        """Move samples waiting in the LIS3DH FIFO to the queue, return how
+        many."""
+        if not self.device:
+            self.push(*self.lis3dh.acceleration)
+            return 1
+        status = self.read_register(_REG_FIFO_SRC)[0]
+        if status & _OVERRUN:
+            self.lost += 1  # At least
+            count = DEPTH
+        else:
+            count = status & _UNREAD
+        scale = self.scale
+        for _ in range(count):
+            x, y, z = struct.unpack_from("<hhh", self.read_register(_REG_OUT_X_L, 6))
+            self.push(x * scale, y * scale, z * scale)
+        return count
+
+    def pop(self, out):
+        """Fill 'out' (3 floats) with the oldest queued sample and return
+        True, or leave it as it was and return False if none are queued."""
+        if not self.count:
+            return False
+        i = self.head * 3
+        out[0], out[1], out[2] = self.queue[i], self.queue[i + 1], self.queue[i + 2]
+        self.head = (self.head + 1) % DEPTH
+        self.count -= 1
+        return True
+
+    def flush(self):
+        """Discard queued samples and any waiting in the FIFO, e.g. after not
+        polling for a while."""
+        self.poll()
+        self.head = self.count = 0
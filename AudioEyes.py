@@ -1,94 +1,308 @@
+import struct
 from array import array
-from math import log
-from time import monotonic
-from rainbowio import colorwheel
-from ulab import numpy as np
-from ulab.scipy.signal import spectrogram
+from math import cos, log, pi
+from Color import colorwheel
+from FixedDSP import BITS, Q, bit_reversal, column_spans, fft, fixed_window, log2_q8
+from FrameBuffer import FrameBuffer
+
+try:
+    from ulab import numpy as np
+    from ulab.scipy.signal import spectrogram
+except ImportError:
+    # Desktop CPython with NumPy, for host-side tests and benchmarks. Same
+    # math as ulab, same results give or take float precision.
+    import numpy as np
+
+    def spectrogram(samples):
+        return np.abs(np.fft.fft(samples))
+
+PEAK_COLOR = 0xE08080  # Color of the 'falling dots'
+# The fixed-point path keeps levels as log2 * 256 (Q8) instead of natural
+# logs, so the float path's level limits become these
+LN_Q8 = 256 / log(2)
+LEVEL_FLOOR = round(4 * LN_Q8)
+LEVEL_SPAN = round(6 * LN_Q8)
+LEVEL_CEILING = round(20 * LN_Q8)
+FFT_SIZES = (128, 256, 512, 1024)
+# Window functions by name, as cosine-sum coefficients (a0, a1, a2):
+# w(n) = a0 - a1 * cos(2 pi n / N) + a2 * cos(4 pi n / N)
+WINDOWS = {
+    "rectangular": (1.0, 0.0, 0.0),
+    "hann": (0.5, 0.5, 0.0),
+    "hamming": (0.54, 0.46, 0.0),
+    "blackman": (0.42, 0.5, 0.08),
+}
+_TABLE_HEADER = "<HHHH"  # fft_size, low_bin, high_bin, width
+_SPAN_HEADER = "<HH"  #    First bin (relative to low_bin), bin count
+
+# Memoized column weight matrices, keyed by (fft_size, low_bin, high_bin,
+# width), and window function arrays, keyed by (name, fft_size). Shared by
+# all AudioEyes instances.
+_weights_cache = {}
+_window_cache = {}
+
+
+def column_weights(fft_size, low_bin, high_bin, width):
+    """Return the column weight matrix for the given FFT size, bin range and
+    matrix width: a row per matrix column and a column per spectrum bin from
+    low_bin to high_bin, so all column heights come from a single dot
+    product per frame. Computed once per combination, then memoized.
+
+    To keep the display lively, each column of the matrix (of which there
+    are few) is the sum value and weighting of several bins from the FFT
+    spectrum output (of which there are many). The weights also help
+    visually linearize the output so octaves are evenly spaced, as on a
+    piano keyboard, whereas the source spectrum data is spaced by frequency
+    in Hz."""
+    key = (fft_size, low_bin, high_bin, width)
+    weights = _weights_cache.get(key)
+    if weights is not None:
+        return weights
+    weights = np.zeros((width, high_bin - low_bin + 1))
+
+    spectrum_bits = log(fft_size // 2, 2)  # e.g. 7 for 128-bin spectrum
+    # Scale low_bin and high_bin to 0.0 to 1.0 equivalent range in spectrum
+    low_frac = log(low_bin, 2) / spectrum_bits
+    frac_range = log(high_bin, 2) / spectrum_bits - low_frac
+
+    for column in range(width):
+        # Determine the lower and upper frequency range for this column, as
+        # fractions within the scaled 0.0 to 1.0 spectrum range. 0.95 below
+        # creates slight frequency overlap between columns, looks nicer.
+        lower = low_frac + frac_range * (column / width * 0.95)
+        upper = low_frac + frac_range * ((column + 1) / width)
+        mid = (lower + upper) * 0.5  # Center of lower-to-upper range
+        half_width = (upper - lower) * 0.5  # 1/2 of lower-to-upper range
+        # Map fractions back to spectrum bin indices that contribute to column
+        first_bin = int(2 ** (spectrum_bits * lower) + 1e-4)
+        last_bin = int(2 ** (spectrum_bits * upper) + 1e-4)
+        bin_weights = []  # Each spectrum bin's weighting will be added here
+        for bin_index in range(first_bin, last_bin + 1):
+            # Find distance from column's overall center to individual bin's
+            # center, expressed as 0.0 (bin at center) to 1.0 (bin at limit of
+            # lower-to-upper range).
+            bin_center = log(bin_index + 0.5, 2) / spectrum_bits
+            dist = abs(bin_center - mid) / half_width
+            if dist < 1.0:  # Filter out a few math stragglers at either end
+                # Bin weights have a cubic falloff curve within range:
+                dist = 1.0 - dist  # Invert dist so 1.0 is at center
+                bin_weights.append(((3.0 - (dist * 2.0)) * dist) * dist)
+        # Scale bin weights so total is 1.0 for each column, but then mute
+        # lower columns slightly and boost higher columns. It graphs better.
+        total = sum(bin_weights)
+        first_bin -= low_bin  # Bin index to weight matrix index
+        for idx, weight in enumerate(bin_weights):
+            weights[column, first_bin + idx] = (weight / total) * (0.8 + idx / width * 1.4)
+
+    _weights_cache[key] = weights
+    return weights
+
+
+def save_tables(path):
+    """Write all memoized column weight matrices to a binary file, so a
+    later load_tables() can skip the math. Only each column's run of
+    nonzero weights is stored, as float32. CIRCUITPY is usually read-only
+    to code (see boot.py remounting), in which case this raises OSError."""
+    with open(path, "wb") as file:
+        for (fft_size, low_bin, high_bin, width), weights in _weights_cache.items():
+            file.write(struct.pack(_TABLE_HEADER, fft_size, low_bin, high_bin, width))
+            for column in range(width):
+                row = [float(w) for w in weights[column]]
+                nonzero = [i for i, w in enumerate(row) if w]
+                first = nonzero[0] if nonzero else 0
+                count = nonzero[-1] - first + 1 if nonzero else 0
+                file.write(struct.pack(_SPAN_HEADER, first, count))
+                file.write(struct.pack("<%df" % count, *row[first : first + count]))
+
+
+def load_tables(path):
+    """Memoize the column weight matrices stored in a save_tables() file.
+    Raises OSError if there's no such file, ValueError if it's damaged."""
+    with open(path, "rb") as file:
+        data = file.read()
+    tables, pos = {}, 0
+    try:
+        while pos < len(data):
+            key = struct.unpack_from(_TABLE_HEADER, data, pos)
+            pos += struct.calcsize(_TABLE_HEADER)
+            fft_size, low_bin, high_bin, width = key
+            weights = np.zeros((width, high_bin - low_bin + 1))
+            for column in range(width):
+                first, count = struct.unpack_from(_SPAN_HEADER, data, pos)
+                pos += struct.calcsize(_SPAN_HEADER)
+                row = struct.unpack_from("<%df" % count, data, pos)
+                pos += count * 4
+                for idx in range(count):
+                    weights[column, first + idx] = row[idx]
+            tables[key] = weights
+    except (struct.error, IndexError) as error:
+        raise ValueError("bad table file") from error
+    _weights_cache.update(tables)
+
+
+def window_function(name, fft_size):
+    """Return window function 'name' (a WINDOWS key) as an ndarray of
+    fft_size samples, or None for rectangular (no windowing). Memoized."""
+    a0, a1, a2 = WINDOWS[name]  # KeyError for unknown window
+    if not (a1 or a2):
+        return None
+    key = (name, fft_size)
+    window = _window_cache.get(key)
+    if window is None:
+        step = 2 * pi / fft_size
+        window = np.array([a0 - a1 * cos(step * n) + a2 * cos(2 * step * n) for n in range(fft_size)])
+        _window_cache[key] = window
+    return window
 
 class AudioEyes:
 
-    def __init__(self, g, m):
+    def __init__(self, g, m, hop_size=None, table_file=None, framebuffer=None, fixed_point=False):
+        """'framebuffer' is an optional Surface to draw into, such as a
+        compositor Layer; by default AudioEyes has its own FrameBuffer.
+        'fixed_point' swaps the ulab float pipeline for integer math (see
+        FixedDSP). Its FFT is interpreted Python, slower than ulab's compiled
+        one, so it's only worth measuring on boards whose core has no FPU."""
         self.glasses = g
+        self.mic = m
+        self.fixed_point = fixed_point
+        # Optional file (e.g. "/audio_tables.bin") of precomputed column
+        # weights, loaded now and rewritten when a new table gets computed
+        self.table_file = table_file
+        if table_file:
+            try:
+                load_tables(table_file)
+            except (OSError, ValueError):
+                pass  # Missing or damaged, tables are computed as needed
+
+        width, height = self.glasses.width, self.glasses.height
+        # Palette for the matrix render: 0 is off, 1 to width are the column
+        # colors (the 225 is on purpose, providing hues from red to purple,
+        # leaving out magenta), width + 1 is the falling dot.
+        self.palette = array("L", [0] * (width + 2))
+        for column in range(width):
+            self.palette[column + 1] = colorwheel(225 * column / width)
+        self.palette[width + 1] = PEAK_COLOR
+        self.column_ids = np.array(list(range(1, width + 1)), dtype=np.uint8)
+        self.rows = np.array([[row + 1] for row in range(height)])  # Row bottoms
+        # Current height and velocity of each column's 'falling dot', updated
+        # each frame
+        self.dots = np.zeros(width) + height
+        self.velocity = np.zeros(width)
+        # Matrix drawn into its pixels; no rings, so the matrix wins shared LEDs
+        self.framebuffer = framebuffer or FrameBuffer(self.glasses, rings_on_top=False)
+        self.framebuffer.set_alpha(0, width * height)  # Matrix opaque, rings not
+
         # FFT/SPECTRUM CONFIG ----
-        self.fft_size = 256  # Sample size for Fourier transform, MUST be power of two
-        self.spectrum_size = self.fft_size // 2  # Output spectrum is 1/2 of FFT result
         # Bottom of spectrum tends to be noisy, while top often exceeds musical
-        # range and is just harmonics, so clip both ends off:
-        self.low_bin = 10  # Lowest bin of spectrum that contributes to graph
-        self.high_bin = 75  # Highest bin "
-
-        self.mic = m
-        self.rec_buf = array("H", [0] * self.fft_size)  # 16-bit audio samples
-
-        # FFT/SPECTRUM SETUP -----
-
-        # To keep the display lively, tables are precomputed where each column of
-        # the matrix (of which there are few) is the sum value and weighting of
-        # several bins from the FFT spectrum output (of which there are many).
-        # The tables also help visually linearize the output so octaves are evenly
-        # spaced, as on a piano keyboard, whereas the source spectrum data is
-        # spaced by frequency in Hz.
-        self.column_table = []
-
-        self.spectrum_bits = log(self.spectrum_size, 2)  # e.g. 7 for 128-bin spectrum
-        # Scale low_bin and high_bin to 0.0 to 1.0 equivalent range in spectrum
-        self.low_frac = log(self.low_bin, 2) / self.spectrum_bits
-        self.frac_range = log(self.high_bin, 2) / self.spectrum_bits - self.low_frac
-
-        for column in range(self.glasses.width):
-            # Determine the lower and upper frequency range for this column, as
-            # fractions within the scaled 0.0 to 1.0 spectrum range. 0.95 below
-            # creates slight frequency overlap between columns, looks nicer.
-            lower = self.low_frac + self.frac_range * (column / self.glasses.width * 0.95)
-            upper = self.low_frac + self.frac_range * ((column + 1) / self.glasses.width)
-            mid = (lower + upper) * 0.5  # Center of lower-to-upper range
-            half_width = (upper - lower) * 0.5  # 1/2 of lower-to-upper range
-            # Map fractions back to spectrum bin indices that contribute to column
-            first_bin = int(2 ** (self.spectrum_bits * lower) + 1e-4)
-            last_bin = int(2 ** (self.spectrum_bits * upper) + 1e-4)
-            bin_weights = []  # Each spectrum bin's weighting will be added here
-            for bin_index in range(first_bin, last_bin + 1):
-                # Find distance from column's overall center to individual bin's
-                # center, expressed as 0.0 (bin at center) to 1.0 (bin at limit of
-                # lower-to-upper range).
-                bin_center = log(bin_index + 0.5, 2) / self.spectrum_bits
-                dist = abs(bin_center - mid) / half_width
-                if dist < 1.0:  # Filter out a few math stragglers at either end
-                    # Bin weights have a cubic falloff curve within range:
-                    dist = 1.0 - dist  # Invert dist so 1.0 is at center
-                    bin_weights.append(((3.0 - (dist * 2.0)) * dist) * dist)
-            # Scale bin weights so total is 1.0 for each column, but then mute
-            # lower columns slightly and boost higher columns. It graphs better.
-            total = sum(bin_weights)
-            bin_weights = [
-                (weight / total) * (0.8 + idx / self.glasses.width * 1.4)
-                for idx, weight in enumerate(bin_weights)
-            ]
-            # List w/five elements is stored for each column:
-            # 0: Index of the first spectrum bin that impacts this column.
-            # 1: A list of bin weights, starting from index above, length varies.
-            # 2: Color for drawing this column on the LED matrix. The 225 is on
-            #    purpose, providing hues from red to purple, leaving out magenta.
-            # 3: Current height of the 'falling dot', updated each frame
-            # 4: Current velocity of the 'falling dot', updated each frame
-            self.column_table.append(
-                [
-                    first_bin - self.low_bin,
-                    bin_weights,
-                    colorwheel(225 * column / self.glasses.width),
-                    self.glasses.height,
-                    0.0,
-                ]
-            )
+        # range and is just harmonics, so clip both ends off. These are for
+        # a 256-sample FFT; other sizes scale them to the same frequencies.
+        self.fft_size = 256
+        self.bin_range = (10, 75)  # Lowest, highest bin that contribute to graph
+        self.configure(256, "rectangular", hop_size=hop_size)
 
         self.dynamic_level = 10  # For responding to changing volume levels
-        self.frames, self.start_time = 0, monotonic()  # For frames-per-second calc
+        self.level_q8 = round(10 * LN_Q8)  # Same, for the fixed-point path
+        self.profiler = None  # Optional Profiler, for per-stage timing
 
         print("audio eyes init done")
 
+    def configure(self, fft_size=None, window=None, low_bin=None, high_bin=None, hop_size=None):
+        """Switch FFT size (one of FFT_SIZES), window function (a WINDOWS
+        key), spectrum bin range (in bins of the new FFT size) and/or hop
+        size; anything not given stays as is, except that a new FFT size
+        scales the bin range (to the same frequencies) and hop size along
+        with it. Column tables are memoized, so switching back and forth is
+        cheap."""
+        if fft_size is None:
+            fft_size = self.fft_size
+        if fft_size not in FFT_SIZES:
+            raise ValueError("fft_size must be one of %s" % (FFT_SIZES,))
+        # Bin range is kept in 256-sample FFT bins, so repeated switching
+        # doesn't accumulate rounding
+        scale = fft_size / 256
+        bin_range = (
+            self.bin_range[0] if low_bin is None else low_bin / scale,
+            self.bin_range[1] if high_bin is None else high_bin / scale,
+        )
+        low_bin = int(bin_range[0] * scale + 0.5)
+        high_bin = min(int(bin_range[1] * scale + 0.5), fft_size // 2 - 1)
+        if not 0 < low_bin < high_bin < fft_size // 2:
+            raise ValueError("need 0 < low_bin < high_bin < fft_size / 2")
+        self.bin_range = bin_range
+        if hop_size is None:
+            hop_size = int(getattr(self, "hop_size", fft_size) * fft_size / self.fft_size)
+        self.window_name = window or getattr(self, "window_name", "rectangular")
+
+        self.window = window_function(self.window_name, fft_size)
+        computed = (fft_size, low_bin, high_bin, self.glasses.width) not in _weights_cache
+        self.weights = column_weights(fft_size, low_bin, high_bin, self.glasses.width)
+        if computed and self.table_file:
+            try:
+                save_tables(self.table_file)
+            except OSError:
+                pass  # Read-only filesystem, compute again next boot
+
+        self.fft_size = fft_size  # Sample size for Fourier transform
+        self.spectrum_size = fft_size // 2  # Output spectrum is 1/2 of FFT result
+        self.low_bin, self.high_bin = low_bin, high_bin
+        self.rec_buf = array("H", [0] * fft_size)  # 16-bit audio samples
+        # New samples recorded per frame. Less than fft_size overlaps each
+        # frame's window with the last one (e.g. fft_size // 2 for 50%), for
+        # more frames per second of audio without recording any longer.
+        self.hop_size = min(max(hop_size, 1), fft_size)
+        # Two sample windows, ping-ponged: each frame's window is the tail of
+        # the previous one plus the newly recorded samples, and the previous
+        # window stays intact while the new one is built and transformed.
+        self.windows = [np.zeros(fft_size), np.zeros(fft_size)]
+        self.page = 0
+        # Spectrum magnitudes grow with FFT size and shrink with windowing
+        # (by the window's mean); offset their logs so the graph's level
+        # limits below hold for any configuration.
+        gain = fft_size / 256
+        if self.window is not None:
+            gain *= np.mean(self.window)
+        self.level_offset = log(gain)
+        if self.fixed_point:
+            self.configure_fixed()
+
+    def configure_fixed(self):
+        """Integer tables and buffers for run_fixed(), to match the float
+        ones configure() just set up."""
+        fft_size, width = self.fft_size, self.glasses.width
+        self.window_q14 = fixed_window(self.window)
+        self.reverse = bit_reversal(fft_size)
+        self.spans = column_spans(self.weights)
+        self.level_offset_q8 = round(self.level_offset * LN_Q8)
+        self.history = array("H", [0] * fft_size)  # Recent samples, a ring; zeros as in windows
+        self.head = 0  # Oldest sample in history
+        self.re = array("i", [0] * fft_size)
+        self.im = array("i", [0] * fft_size)
+        self.spectrum_q8 = array("i", [0] * (self.high_bin - self.low_bin + 1))
+        self.tops_q8 = array("i", [0] * width)  # Column tops, in rows * 256
+        if not hasattr(self, "dots_q8"):
+            self.dots_q8 = array("i", [self.glasses.height << 8] * width)
+            self.velocity_q8 = array("i", [0] * width)
+
     def run(self):
-        self.mic.record(self.rec_buf, self.fft_size)  # Record batch of 16-bit samples
-        samples = np.array(self.rec_buf)  # Convert to ndarray
+        if self.fixed_point:
+            self.run_fixed()
+            return
+        profiler = self.profiler
+        if profiler:
+            profiler.begin()
+        hop = self.hop_size
+        self.mic.record(self.rec_buf, hop)  # Record batch of 16-bit samples
+        if profiler:
+            profiler.lap("record")
+        previous = self.windows[self.page]
+        self.page ^= 1
+        samples = self.windows[self.page]
+        keep = self.fft_size - hop  # Samples carried over from last window
+        if keep:
+            samples[:keep] = previous[hop:]
+        samples[keep:] = np.frombuffer(self.rec_buf, dtype=np.uint16, count=hop)
+        if self.window is not None:
+            samples = samples * self.window  # Copy, the window is reused
         # Compute spectrogram and trim results. Only the left half is
         # normally needed (right half is mirrored), but we trim further as
         # only the low_bin to high_bin elements are interesting to graph.
@@ -97,6 +311,8 @@ class AudioEyes:
         # but add a tiny value to change any zeros to nonzero numbers
         # (avoids rare 'inf' error)
         spectrum = np.log(spectrum + 1e-7)
+        if self.level_offset:
+            spectrum -= self.level_offset
         # Determine minimum & maximum across all spectrum bins, with limits
         lower = max(np.min(spectrum), 4)
         upper = min(max(np.max(spectrum), lower + 6), 20)
@@ -112,28 +328,154 @@ class AudioEyes:
         # Apply vertical scale to spectrum data. Results may exceed
         # matrix height...that's OK, adds impact!
         data = (spectrum - lower) * (7 / (self.dynamic_level - lower))
-        for column, element in enumerate(self.column_table):
-            # Start BELOW matrix and accumulate bin weights UP, saves math
-            first_bin = element[0]
-            column_top = self.glasses.height + 1
-            for bin_offset, weight in enumerate(element[1]):
-                column_top -= data[first_bin + bin_offset] * weight
-
-            if column_top < element[3]:  #       Above current falling dot?
-                element[3] = column_top - 0.5  # Move dot up
-                element[4] = 0  #                and clear out velocity
-            else:
-                element[3] += element[4]  #      Move dot down
-                element[4] += 0.2  #             and accelerate
-
-            column_top = int(column_top)  #      Quantize to pixel space
-            for row in range(column_top):  #     Erase area above column
-                self.glasses.pixel(column, row, 0)
-            for row in range(column_top, 5):  #  Draw column
-                self.glasses.pixel(column, row, element[2])
-            self.glasses.pixel(column, int(element[3]), 0xE08080)  # Draw peak dot
+        if profiler:
+            profiler.lap("spectrogram")
+        # Start BELOW matrix and subtract weighted bins UP, saves math
+        tops = (self.glasses.height + 1) - np.dot(self.weights, data)
+        if profiler:
+            profiler.lap("column sum")
+
+        rising = tops < self.dots  #  Columns above current falling dot
+        falling = tops >= self.dots
+        # Rising dots move up and clear out velocity, others move down
+        # and accelerate
+        self.dots = rising * (tops - 0.5) + falling * (self.dots + self.velocity)
+        self.velocity = falling * (self.velocity + 0.2)
+
+        # Column pixels are lit from the (truncated) top down, i.e. where
+        # the row's bottom edge is below the top. Each lit pixel gets its
+        # column's palette index, unlit ones 0.
+        indices = (self.rows > tops) * self.column_ids
+        width, height = self.glasses.width, self.glasses.height
+        colors, palette = self.framebuffer.pixels, self.palette
+        i = 0
+        for row in indices:
+            for index in row:
+                colors[i] = palette[int(index)]
+                i += 1
+        for column in range(width):  # Draw peak dots
+            row = int(self.dots[column])
+            if 0 <= row < height:
+                colors[row * width + column] = palette[width + 1]
+        self.framebuffer.touch(0, width * height)
+        self.framebuffer.commit()
+        if profiler:
+            profiler.lap("draw")
 
         self.glasses.show()  # Buffered mode MUST use show() to refresh matrix
+        if profiler:
+            profiler.lap("show")
+            profiler.end()
+
+    def run_fixed(self):
+        """run() in integer math only: same stages and profiler laps, with
+        levels as log2 * 256 and column heights, dots and their velocity
+        in rows * 256."""
+        profiler = self.profiler
+        if profiler:
+            profiler.begin()
+        hop, n = self.hop_size, self.fft_size
+        mask = n - 1
+        self.mic.record(self.rec_buf, hop)
+        history, head, rec_buf = self.history, self.head, self.rec_buf
+        for k in range(hop):
+            history[(head + k) & mask] = rec_buf[k]
+        head = self.head = (head + hop) & mask
+        if profiler:
+            profiler.lap("record")
+
+        # Window the samples (less their DC offset, which only bin 0 sees)
+        # into bit-reversed order for the FFT, noting the loudest
+        re, im, reverse, window = self.re, self.im, self.reverse, self.window_q14
+        peak = 0
+        for k in range(n):
+            v = history[(head + k) & mask] - 32768
+            if window:
+                v = (v * window[k]) >> Q
+            re[reverse[k]] = v
+            im[k] = 0
+            if v > peak:
+                peak = v
+            elif -v > peak:
+                peak = -v
+        # Scale the loudest up (or down) to just under 1 << BITS, so quiet
+        # audio keeps its precision through the FFT
+        shift = 0
+        while peak >= 1 << BITS:
+            peak >>= 1
+            shift -= 1
+        while peak and peak < 1 << (BITS - 1):
+            peak <<= 1
+            shift += 1
+        if shift > 0:
+            for k in range(n):
+                re[k] <<= shift
+        elif shift < 0:
+            for k in range(n):
+                re[k] >>= -shift
+        halvings = fft(re, im, n)
+        # log2 of each bin's magnitude (half the log2 of its square), back
+        # to the unscaled transform's level, less the configuration's offset
+        spectrum = self.spectrum_q8
+        offset = ((halvings - shift) << 8) - self.level_offset_q8
+        lowest, highest = 1 << 30, -(1 << 30)
+        for i in range(len(spectrum)):
+            b = self.low_bin + i
+            level = (log2_q8(re[b] * re[b] + im[b] * im[b]) >> 1) + offset
+            spectrum[i] = level
+            if level < lowest:
+                lowest = level
+            if level > highest:
+                highest = level
+        lower = max(lowest, LEVEL_FLOOR)
+        upper = min(max(highest, lower + LEVEL_SPAN), LEVEL_CEILING)
+        if upper > self.level_q8:
+            self.level_q8 = (upper * 179 + self.level_q8 * 77) >> 8  # 0.7, 0.3
+        else:
+            self.level_q8 = (self.level_q8 + lower) >> 1
+        # Vertical scale, in rows * 256; capped well past the matrix so
+        # column sums stay small ints
+        scale = max(self.level_q8 - lower, 1)
+        for i in range(len(spectrum)):
+            spectrum[i] = min((spectrum[i] - lower) * 1792 // scale, 1 << 15)  # 7 * 256
+        if profiler:
+            profiler.lap("spectrogram")
+        width, height = self.glasses.width, self.glasses.height
+        tops, bottom = self.tops_q8, (height + 1) << 8
+        for column in range(width):
+            first, weights = self.spans[column]
+            total = 0
+            for j in range(len(weights)):
+                total += weights[j] * spectrum[first + j]
+            tops[column] = bottom - (total >> 8)
+        if profiler:
+            profiler.lap("column sum")
+
+        dots, velocity = self.dots_q8, self.velocity_q8
+        colors, palette = self.framebuffer.pixels, self.palette
+        for column in range(width):
+            top = tops[column]
+            if top < dots[column]:  # Rising, clears out velocity
+                dots[column] = top - 128
+                velocity[column] = 0
+            else:  # Falling, accelerates
+                dots[column] += velocity[column]
+                velocity[column] += 51  # 0.2
+            color = palette[column + 1]
+            i = column
+            for row in range(height):
+                colors[i] = color if (row + 1) << 8 > top else 0
+                i += width
+            dot = dots[column]
+            row = dot >> 8 if dot >= 0 else -(-dot >> 8)  # Truncated, as int()
+            if 0 <= row < height:
+                colors[row * width + column] = palette[width + 1]
+        self.framebuffer.touch(0, width * height)
+        self.framebuffer.commit()
+        if profiler:
+            profiler.lap("draw")
 
-        self.frames += 1
-        # print(frames / (monotonic() - start_time), "FPS")
+        self.glasses.show()
+        if profiler:
+            profiler.lap("show")
+            profiler.end()
@@ -3,11 +3,14 @@ import board
 from adafruit_ble import BLERadio
 from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
 from adafruit_ble.services.nordic import UARTService
-from adafruit_bluefruit_connect.packet import Packet
-from adafruit_bluefruit_connect.color_packet import ColorPacket
-from adafruit_bluefruit_connect.button_packet import ButtonPacket
+from PacketParser import PacketParser
 
 class BleEyes:
+    """Fills the glasses with the color last picked in the Bluefruit
+    Connect app, over BLE UART."""
+
+    reads_uart = True  # Runtime's BLE listener leaves the UART alone
+
     def __init__(self, g):
         self.glasses = g
         self.ble = BLERadio()
@@ -15,38 +18,43 @@ class BleEyes:
         self.advertisement = ProvideServicesAdvertisement(self.uart)
         self.ble.name = "LED Glasses"
         self.DEBOUNCE = 0.25
+        self.quietUntil = 0  # No new color shown until then, see run()
+        self.parser = PacketParser()
         self.color = 0x000000
         print("ble eyes init done")
 
-    def rgb_to_hex(self, rgb):
-        hex_str = '0x%02x%02x%02x' % rgb
-        return int(hex_str, 16)
+    def enter(self):
+        """Switched to: show the color right away, over everything."""
+        self.show()
+
+    def show(self):
+        self.glasses.fill(self.color)
+        self.glasses.left_ring.fill(self.color)
+        self.glasses.right_ring.fill(self.color)
+        self.glasses.show()
 
     def run(self):
+        # Returns promptly either way; the caller paces frames, and a
+        # BufferedGlasses makes repeated show()s of the same color free.
         if not self.ble.connected:
-            self.ble.start_advertising(self.advertisement)
-        while not self.ble.connected:
-            self.glasses.fill(self.color)
-            self.glasses.left_ring.fill(self.color)
-            self.glasses.right_ring.fill(self.color)
-            self.glasses.show()
+            if not self.ble.advertising:
+                self.ble.start_advertising(self.advertisement)
+            self.parser.reset()  # Drop any packet cut off by a disconnect
+            self.show()
+            return
         try:
-            incoming_bytes = self.uart.in_waiting
-            if incoming_bytes:
-                bytes_in = self.uart.read(incoming_bytes)
-                packet = Packet.from_bytes(bytes_in)
-                if isinstance(packet, ColorPacket):
-                    self.color = self.rgb_to_hex(packet.color)
-                    self.glasses.fill(self.color)
-                    self.glasses.left_ring.fill(self.color)
-                    self.glasses.right_ring.fill(self.color)
-                    self.glasses.show()
-                if isinstance(packet, ButtonPacket):
-                    tempMode = packet.button
-                    #if (tempMode in allowedModes):
-                    #    mode = tempMode
-                    #uart.write(str.encode(mode))
-                    #print(tempMode)
-                time.sleep(self.DEBOUNCE)
-        except:
-            pass
+            self.parser.poll(self.uart)  # All that's arrived, never waits
+        except ConnectionError:
+            self.parser.reset()  # Disconnected mid-read, advertise next run
+            return
+        # Colors arriving while the last one is still quiet are held, and
+        # only the latest is shown once the quiet time is up
+        color = self.parser.color
+        if color is not None and time.monotonic() >= self.quietUntil:
+            self.parser.color = None
+            self.color = color
+            self.show()
+            self.quietUntil = time.monotonic() + self.DEBOUNCE
+        #if self.parser.button in allowedModes:
+        #    mode = self.parser.button
+        #uart.write(str.encode(mode))
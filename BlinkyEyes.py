@@ -1,115 +1,173 @@
 import math
 import time
 import random
+from array import array
+from math import ceil, floor
+from Color import blend, gammify, gradient
 from Eye import Eye
+from FrameBuffer import FrameBuffer
+
+BLINK_STEPS = 64  # Eyelid positions in the precomputed blink ring table
 
 class BlinkyEyes:
 
-    def rasterize(self, data, point1, point2, rect):
+    def rasterize(self, data, x1, y1, x2, y2, left, top, right, bottom):
         """Rasterize an arbitrary ellipse into the 'data' bitmap (3X pixel
-        space), given foci point1 and point2 and with area determined by global
-        'radius' (when foci are same point; a circle). Foci and radius are all
-        floating point values, which adds to the buttery impression. 'rect' is
-        a 4-tuple rect of which pixels are likely affected. Data is assumed 0
-        before arriving here; no clearing is performed."""
-
-        dx = point2[0] - point1[0]
-        dy = point2[1] - point1[1]
+        space), given foci (x1, y1) and (x2, y2) and with area determined by
+        global 'radius' (when foci are same point; a circle). Foci and radius
+        are all floating point values, which adds to the buttery impression.
+        left/top/right/bottom bound the pixels likely affected (right and
+        bottom exclusive); passed separately, not as a tuple, so nothing is
+        allocated per frame. Each row of 'data' is an integer with bit N set
+        for pixel N; rows are assumed 0 before arriving here, no clearing is
+        performed."""
+
+        dx = x2 - x1
+        dy = y2 - y1
         d2 = dx * dx + dy * dy  # Dist between foci, squared
         if d2 <= 0:
-            # Foci are in same spot - it's a circle
-            perimeter = 2 * self.radius
-            d = 0
+            # Foci are in same spot - it's a circle. Any axis will do.
+            a2 = b2 = self.radius * self.radius
+            ux, uy = 1.0, 0.0
         else:
-            # Foci are separated - it's an ellipse.
-            d = d2 ** 0.5  # Distance between foci
-            c = d * 0.5  # Center-to-foci distance
-            # This is an utterly brute-force way of ellipse-filling based on
-            # the "two nails and a string" metaphor...we have the foci points
+            # Foci are separated - it's an ellipse. This is based on the
+            # "two nails and a string" metaphor...we have the foci points
             # and just need the string length (triangle perimeter) to yield
             # an ellipse with area equal to a circle of 'radius'.
             # c^2 = a^2 - b^2  <- ellipse formula
             #   a = r^2 / b    <- substitute
             # c^2 = (r^2 / b)^2 - b^2
             # b = sqrt(((c^2) + sqrt((c^4) + 4 * r^4)) / 2)  <- solve for b
-            b2 = ((c ** 2) + (((c ** 4) + 4 * (self.radius ** 4)) ** 0.5)) * 0.5
-            # By my math, perimeter SHOULD be...
-            # perimeter = d + 2 * ((b2 + (c ** 2)) ** 0.5)
-            # ...but for whatever reason, working approach here is really...
-            perimeter = d + 2 * (b2 ** 0.5)
-
-        # Like I'm sure there's a way to rasterize this by spans rather than
-        # all these square roots on every pixel, but for now...
-        for y in range(rect[1], rect[3]):  # For each row...
-            y5 = y + 0.5  #         Pixel center
-            dy1 = y5 - point1[1]  # Y distance from pixel to first point
-            dy2 = y5 - point2[1]  # " to second
-            dy1 *= dy1  # Y1^2
-            dy2 *= dy2  # Y2^2
-            for x in range(rect[0], rect[2]):  # For each column...
-                x5 = x + 0.5  #         Pixel center
-                dx1 = x5 - point1[0]  # X distance from pixel to first point
-                dx2 = x5 - point2[0]  # " to second
-                d1 = (dx1 * dx1 + dy1) ** 0.5  # 2D distance to first point
-                d2 = (dx2 * dx2 + dy2) ** 0.5  # " to second
-                if (d1 + d2 + d) <= perimeter:
-                    data[y][x] = 1  # Point is inside ellipse
-
-
-    def gammify(self, color):
-        """Given an (R,G,B) color tuple, apply gamma correction and return
-        a packed 24-bit RGB integer."""
-        rgb = [int(((color[x] / 255) ** self.gamma) * 255 + 0.5) for x in range(3)]
-        return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
-
-
-    def interp(self, color1, color2, blend):
-        """Given two (R,G,B) color tuples and a blend ratio (0.0 to 1.0),
-        interpolate between the two colors and return a gamma-corrected
-        in-between color as a packed 24-bit RGB integer. No bounds clamping
-        is performed on blend value, be nice."""
-        inv = 1.0 - blend  # Weighting of second color
-        return self.gammify([color1[x] * blend + color2[x] * inv for x in range(3)])
+            # ...though in practice the string length that looks right is
+            # d + 2 * sqrt(that), so the result is really the semi-major
+            # axis squared (a2), and semi-minor follows from a2 - c^2.
+            d = d2 ** 0.5  # Distance between foci
+            c2 = d2 * 0.25  # Center-to-foci distance, squared
+            a2 = (c2 + ((c2 * c2 + 4 * (self.radius ** 4)) ** 0.5)) * 0.5
+            b2 = a2 - c2
+            ux, uy = dx / d, dy / d  # Unit vector along major axis
+
+        # Rather than testing every pixel against both foci, solve the
+        # ellipse equation once per row for where the span starts and ends.
+        # In the ellipse's own frame a point is inside when
+        # s^2 / a^2 + t^2 / b^2 <= 1; rotating back to X/Y relative to the
+        # center gives A*X^2 + B*X + C <= 0, a quadratic in X for each row.
+        ia, ib = 1 / a2, 1 / b2
+        qa = ux * ux * ia + uy * uy * ib  #     X^2 coefficient (constant)
+        qb = 2 * ux * uy * (ia - ib)  #          X coefficient, times Y
+        qc = uy * uy * ia + ux * ux * ib  #     Y^2 coefficient
+        inv_2qa = 0.5 / qa
+        cx = (x1 + x2) * 0.5 - 0.5  # Center, less pixel center
+        cy = (y1 + y2) * 0.5 - 0.5  # offset, saves an add below
+        for y in range(top, bottom):  # For each row...
+            yc = y - cy  #                    Row center relative to ellipse
+            b = qb * yc
+            disc = b * b - 4 * qa * (qc * yc * yc - 1)
+            if disc < 0:
+                continue  # Row misses ellipse entirely
+            disc **= 0.5
+            start = max(ceil(cx + (-b - disc) * inv_2qa), left)
+            end = min(floor(cx + (-b + disc) * inv_2qa) + 1, right)
+            if start < end:
+                data[y] |= (1 << end) - (1 << start)  # Point(s) inside ellipse
 
 
     def __init__(self, g):
         self.glasses = g
 
-        self.eye_color = (255, 128, 0)  #      Amber pupils
-        self.ring_open_color = (75, 75, 75)  # Color of LED rings when eyes open
-        self.ring_blink_color = (50, 25, 0)  # Color of LED ring "eyelid" when blinking
+        self.eye_color = 0xFF8000  #        Amber pupils
+        self.ring_open_color = 0x4B4B4B  #  Color of LED rings when eyes open
+        self.ring_blink_color = 0x321900  # Color of LED ring "eyelid" when blinking
         self.radius = 3.4  # Size of pupil (3X because of downsampling later)
-        self.gamma = 2.6  # For color adjustment. Leave as-is.
 
-        self.colormap = []
+        # Pupil colors by coverage (0-9 of a 3x3 block), off to eye_color
+        self.colormap = gradient(0x000000, self.eye_color, 9)
         self.y_pos = []
 
-        for n in range(10):
-            self.colormap.append(self.gammify([n / 9 * self.eye_color[x] for x in range(3)]))
-
         for n in range(13):
             angle = n / 24 * math.pi * 2
             self.y_pos.append(10 - math.cos(angle) * 12)
 
-        self.ring_open_color_packed = self.gammify(self.ring_open_color)
+        self.ring_open_color_packed = gammify(self.ring_open_color)
+
+        # Ring colors during a blink depend only on how far closed the eyes
+        # are, so precompute all 24 LEDs for BLINK_STEPS+1 evenly spaced
+        # eyelid positions (0 = open, BLINK_STEPS = shut); a blink frame then
+        # just copies one row of this table into each ring.
+        self.blink_rings = array("L", [0] * ((BLINK_STEPS + 1) * 24))
+        for step in range(BLINK_STEPS + 1):
+            upper = step / BLINK_STEPS * 15 - 4  # Same as run()
+            lower = 23 - step / BLINK_STEPS * 8
+            row = step * 24
+            for i in range(13):  # Half an LED ring, top-to-bottom...
+                a = min(max(self.y_pos[i] - upper + 1, 0), 3)
+                b = min(max(lower - self.y_pos[i] + 1, 0), 3)
+                ratio = a * b / 9  # Proximity of LED to eyelid edges
+                level = int(ratio * 256 + 0.5)  # 256 = fully open color
+                color = gammify(blend(self.ring_blink_color, self.ring_open_color, level))
+                self.blink_rings[row + i] = color
+                if 0 < i < 12:
+                    self.blink_rings[row + 24 - i] = color  # Mirror to other side
 
-        self.eyelid = (
-            b"\x01\x01\x00\x01\x01\x00\x01\x01\x00" b"\x01\x01\x00\x01\x01\x00\x01\x01\x00"
-        )  # 2/3 of pixels set
+        self.eyelid = 0b011011011011011011  # 2/3 of pixels set
 
-        # Initialize eye position and move/blink animation timekeeping
-        self.cur_pos = self.next_pos = (9, 7.5)  # Current, next eye position in 3X space
+        # Initialize eye position and move/blink animation timekeeping.
+        # Positions are kept as separate X/Y floats so no tuples are built
+        # in the frame loop.
+        self.cur_x = self.next_x = 9  #     Current, next eye position in 3X space
+        self.cur_y = self.next_y = 7.5
         self.in_motion = False  #             True = eyes moving, False = eyes paused
         self.blink_state = 0  #               0, 1, 2 = unblinking, closing, opening
         self.move_start_time = self.move_duration = self.blink_start_time = self.blink_duration = 0
-        self.eyes = [Eye(self.glasses, 1, 2), Eye(self.glasses, 11, -2)]
-
-        self.frames, self.start_time = 0, time.monotonic()  # For frames/second calculation
+        self.framebuffer = FrameBuffer(self.glasses)  # Shared by both eyes, rings on top
+        self.eyes = [Eye(self.glasses, 1, 2, self.framebuffer), Eye(self.glasses, 11, -2, self.framebuffer)]
+
+        # Preallocated pool of 3X bitmaps, two per eye (this frame and the
+        # last), reused every frame. If an eye's bitmap comes out the same
+        # as last frame, its smooth() and matrix writes are skipped.
+        self.bitmaps = [[[0] * (5 * 3), [0] * (5 * 3)] for _ in self.eyes]
+        self.page = 0  # Which of each eye's two bitmaps is current
+        self.invalidate()
+
+        # Optional allocation counter: set 'mem_alloc' to a function
+        # returning bytes currently allocated (gc.mem_alloc on the board,
+        # something tracemalloc-based on a host) and each frame adds the heap
+        # growth since the previous one to 'alloc_bytes'. Read it before and
+        # after a range of frames. Measured from frame start to frame start,
+        # so one frame's temporaries are gone by the time they're counted.
+        self.mem_alloc = None
+        self.alloc_bytes = 0
+        self.alloc_mark = None
+
+        self.profiler = None  # Optional Profiler, for per-stage timing
+        self.clock = time.monotonic  # Swappable, e.g. for simulated time
         print("blinky eyes init done")
 
+    def enter(self):
+        """Switched to: redraw every pixel, no need to clear the glasses
+        first."""
+        self.invalidate()
+
+    def invalidate(self):
+        """Force the next frame to redraw everything, e.g. after something
+        else has drawn on or cleared the glasses."""
+        for pair in self.bitmaps:
+            pair[self.page][0] = -1  # Never matches a real bitmap row
+        self.framebuffer.touch_all()
+
     def run(self):
 
-        now = time.monotonic()  # 'Snapshot' the time once per frame
+        if self.mem_alloc:
+            allocated = self.mem_alloc()
+            if self.alloc_mark is not None:
+                self.alloc_bytes += allocated - self.alloc_mark
+            self.alloc_mark = allocated
+
+        profiler = self.profiler
+        if profiler:
+            profiler.begin()
+
+        now = self.clock()  # 'Snapshot' the time once per frame
 
         # Blink logic
         elapsed = now - self.blink_start_time  # Time since start of blink event
@@ -133,6 +191,7 @@ class BlinkyEyes:
                 ratio = 1.0 - ratio  #          1.0-0.0 as it opens
             upper = ratio * 15 - 4  #       Upper eyelid pos. in 3X space
             lower = 23 - ratio * 8  #       Lower eyelid pos. in 3X space
+            blink_row = int(ratio * BLINK_STEPS + 0.5) * 24  # Ring table row
 
         # Eye movement logic. Two points, 'p1' and 'p2', are the foci of an
         # ellipse. p1 moves from current to next position a little faster
@@ -146,85 +205,100 @@ class BlinkyEyes:
         if self.in_motion:  #                   Currently moving?
             if elapsed > self.move_duration:  # If end of motion reached,
                 self.in_motion = False  #            Stop motion and
-                p1 = p2 = self.cur_pos = self.next_pos  # Set to new position
+                p1x = p2x = self.cur_x = self.next_x  # Set to new position
+                p1y = p2y = self.cur_y = self.next_y
                 self.move_duration = random.uniform(0.5, 1.5)  # Wait this long
             else:  # Still moving
                 # Determine p1, p2 position in time
-                delta = (self.next_pos[0] - self.cur_pos[0], self.next_pos[1] - self.cur_pos[1])
+                delta_x = self.next_x - self.cur_x
+                delta_y = self.next_y - self.cur_y
                 ratio = elapsed / self.move_duration
                 if ratio < 0.6:  # First 60% of move time
                     # p1 is in motion
                     # Easing function: 3*e^2-2*e^3 0.0 to 1.0
                     e = ratio / 0.6  # 0.0 to 1.0
                     e = 3 * e * e - 2 * e * e * e
-                    p1 = (self.cur_pos[0] + delta[0] * e, self.cur_pos[1] + delta[1] * e)
+                    p1x = self.cur_x + delta_x * e
+                    p1y = self.cur_y + delta_y * e
                 else:  # Last 40% of move time
-                    p1 = self.next_pos  # p1 has reached end position
+                    p1x, p1y = self.next_x, self.next_y  # p1 has reached end position
                 if ratio > 0.3:  # Last 60% of move time
                     # p2 is in motion
                     e = (ratio - 0.3) / 0.7  #       0.0 to 1.0
                     e = 3 * e * e - 2 * e * e * e  # Easing func.
-                    p2 = (self.cur_pos[0] + delta[0] * e, self.cur_pos[1] + delta[1] * e)
+                    p2x = self.cur_x + delta_x * e
+                    p2y = self.cur_y + delta_y * e
                 else:  # First 40% of move time
-                    p2 = self.cur_pos  # p2 waits at start position
+                    p2x, p2y = self.cur_x, self.cur_y  # p2 waits at start position
         else:  # Eye is stopped
-            p1 = p2 = self.cur_pos  # Both foci at current eye position
+            p1x = p2x = self.cur_x  # Both foci at current eye position
+            p1y = p2y = self.cur_y
             if elapsed > self.move_duration:  # Pause time expired?
                 self.in_motion = True  #        Start up new motion!
                 self.move_start_time = now
                 self.move_duration = random.uniform(0.15, 0.25)
                 angle = random.uniform(0, math.pi * 2)
                 dist = random.uniform(0, 7.5)
-                self.next_pos = (
-                    9 + math.cos(angle) * dist,
-                    7.5 + math.sin(angle) * dist * 0.8,
-                )
+                self.next_x = 9 + math.cos(angle) * dist
+                self.next_y = 7.5 + math.sin(angle) * dist * 0.8
+
+        # Compute bounding rectangle (in 3X space) of ellipse, less the
+        # per-eye X offset. Like the ellipse rasterizer, this isn't optimal,
+        # but will suffice.
+        left = min(p1x, p2x) - self.radius
+        right = max(p1x, p2x) + self.radius + 1
+        top = max(int(min(p1y, p2y) - self.radius), 0, int(upper))
+        bottom = min(int(max(p1y, p2y) + self.radius + 1), 15, int(lower) + 1)
+
+        if profiler:
+            profiler.lap("motion")
+
         # Draw the raster part of each eye...
-        for eye in self.eyes:
-            # Allocate/clear the 3X bitmap buffer
-            bitmap = [bytearray(6 * 3) for _ in range(5 * 3)]
+        self.page ^= 1  # Swap current and previous bitmaps
+        for index, eye in enumerate(self.eyes):
+            # Clear this eye's current 3X bitmap buffer, one int per row
+            pair = self.bitmaps[index]
+            bitmap = pair[self.page]
+            for row in range(5 * 3):
+                bitmap[row] = 0
             # Each eye's foci are offset slightly, to fixate toward center
-            p1a = (p1[0] + eye.x_offset, p1[1])
-            p2a = (p2[0] + eye.x_offset, p2[1])
-            # Compute bounding rectangle (in 3X space) of ellipse
-            # (min X, min Y, max X, max Y). Like the ellipse rasterizer,
-            # this isn't optimal, but will suffice.
-            bounds = (
-                max(int(min(p1a[0], p2a[0]) - self.radius), 0),
-                max(int(min(p1a[1], p2a[1]) - self.radius), 0, int(upper)),
-                min(int(max(p1a[0], p2a[0]) + self.radius + 1), 18),
-                min(int(max(p1a[1], p2a[1]) + self.radius + 1), 15, int(lower) + 1),
+            offset = eye.x_offset
+            self.rasterize(  # Render ellipse into buffer
+                bitmap,
+                p1x + offset,
+                p1y,
+                p2x + offset,
+                p2y,
+                max(int(left + offset), 0),
+                top,
+                min(int(right + offset), 18),
+                bottom,
             )
-            self.rasterize(bitmap, p1a, p2a, bounds)  # Render ellipse into buffer
             # If the eye is currently blinking, and if the top edge of the
-            # eyelid overlaps the bitmap, draw a scanline across the bitmap
-            # and update the bounds rect so the whole width of the bitmap
-            # is scaled.
+            # eyelid overlaps the bitmap, draw a scanline across the bitmap.
             if self.blink_state and upper >= 0:
                 bitmap[int(upper)] = self.eyelid
-                bounds = (0, int(upper), 18, bounds[3])
-            eye.smooth(bitmap, bounds, self.colormap)  # 1:3 downsampling for eye
-
-        # Matrix and rings share a few pixels. To make the rings take
-        # precedence, they're drawn later. So blink state is revisited now...
+            if profiler:
+                profiler.lap("rasterize")
+            if bitmap != pair[self.page ^ 1]:  # Changed since last frame?
+                eye.smooth(bitmap, self.colormap)  # 1:3 downsampling for eye
+            if profiler:
+                profiler.lap("smooth")
+
+        # Matrix and rings share a few pixels; the frame buffer gives the
+        # rings precedence. Blink state is revisited now...
+        framebuffer = self.framebuffer
         if self.blink_state:  # In mid-blink?
-            for i in range(13):  # Half an LED ring, top-to-bottom...
-                a = min(max(self.y_pos[i] - upper + 1, 0), 3)
-                b = min(max(lower - self.y_pos[i] + 1, 0), 3)
-                ratio = a * b / 9  # Proximity of LED to eyelid edges
-                packed = self.interp(self.ring_open_color, self.ring_blink_color, ratio)
-                self.glasses.left_ring[i] = self.glasses.right_ring[i] = packed
-                if 0 < i < 12:
-                    i = 24 - i  # Mirror half-ring to other side
-                    self.glasses.left_ring[i] = self.glasses.right_ring[i] = packed
+            framebuffer.write_ring(framebuffer.left_ring, self.blink_rings, blink_row)
+            framebuffer.write_ring(framebuffer.right_ring, self.blink_rings, blink_row)
         else:
-            self.glasses.left_ring.fill(self.ring_open_color_packed)
-            self.glasses.right_ring.fill(self.ring_open_color_packed)
-
+            framebuffer.fill_ring(framebuffer.left_ring, self.ring_open_color_packed)
+            framebuffer.fill_ring(framebuffer.right_ring, self.ring_open_color_packed)
+        framebuffer.commit()
+        if profiler:
+            profiler.lap("rings")
 
         self.glasses.show()  # Buffered mode MUST use show() to refresh matrix
-        self.frames += 1
-        elapsed = time.monotonic() - self.start_time
-
-        #print(self.frames / elapsed)
-
+        if profiler:
+            profiler.lap("show")
+            profiler.end()
@@ -0,0 +1,66 @@
+class BufferedGlasses:
+    """Wraps an LED_Glasses so show() only sends what changed. A copy of
+    the pixel buffer as last sent is kept; show() does nothing if the
+    buffer still matches it, else writes just the span of changed PWM
+    registers on each of the IS31FL3741's two pages, instead of all 351.
+    Everything else is read through from the wrapped glasses, so animation
+    code uses this just like an LED_Glasses. Setting attributes isn't
+    passed through though: configure the glasses (global_current etc.)
+    before wrapping them, or via .glasses."""
+
+    def __init__(self, glasses):
+        self.glasses = glasses
+        self.buffer = getattr(glasses, "_pixel_buffer", None)
+        self.sent = bytearray(len(self.buffer)) if self.buffer else None
+        self.full = True  # Next show() sends everything
+        # Counters, for benchmarks and the curious
+        self.shows = self.skipped = self.bytes_sent = 0
+
+    def __getattr__(self, name):
+        return getattr(self.glasses, name)
+
+    def invalidate(self):
+        """Make the next show() resend the whole buffer, e.g. if the driver
+        chip was reset or written to behind our back."""
+        self.full = True
+
+    def show(self):
+        self.shows += 1
+        buf, sent = self.buffer, self.sent
+        if not buf:  # Unbuffered driver, every write already went out
+            return
+        if self.full:
+            self.glasses.show()
+            sent[:] = buf
+            self.full = False
+            self.bytes_sent += len(buf)
+            return
+        if buf == sent:
+            self.skipped += 1
+            return
+        # buf[n + 1] is LED n; page 0 holds LEDs 0-179, page 1 180-350
+        self._send(0, 1, 181)
+        self._send(1, 181, len(buf))
+
+    def _send(self, page, start, end):
+        """Write the changed span of buffer positions start to end-1 (all on
+        one page) to the driver chip, and note it as sent."""
+        buf, sent = self.buffer, self.sent
+        while start < end and buf[start] == sent[start]:
+            start += 1
+        if start == end:
+            return  # Nothing changed on this page
+        while buf[end - 1] == sent[end - 1]:
+            end -= 1
+        glasses = self.glasses
+        glasses.page = page
+        # As in LED_Glasses.show(), borrow the byte ahead of the span for
+        # the register address so the write can go straight from the buffer
+        save = buf[start - 1]
+        buf[start - 1] = start - 1 - page * 180
+        with glasses.i2c_device as i2c:
+            i2c.write(buf, start=start - 1, end=end)
+        buf[start - 1] = save
+        for n in range(start, end):
+            sent[n] = buf[n]
+        self.bytes_sent += end - start + 1
@@ -1,10 +1,15 @@
 import board
+from time import monotonic
 from digitalio import DigitalInOut, Direction, Pull
 
+DEBOUNCE = 0.05  # Seconds a press must follow the last release
+
 class ButtonManager:
     def __init__(self):
         self.enabled = True
         self.Button = self.InitButton(board.SWITCH)
+        self.wasPressed = False
+        self.releaseTime = 0
 
     def InitButton(self, pin):
         btn = DigitalInOut(pin)
@@ -22,3 +27,16 @@ class ButtonManager:
 
     def ButtonClicked(self, waitForRelease = False):
         return self.Clicked(self.Button, waitForRelease)
+
+    def ButtonPressed(self):
+        """Non-blocking, edge-triggered: True once per press, on the poll
+        that first sees the button down. Bounces right after a release are
+        ignored."""
+        pressed = not self.Button.value
+        now = monotonic()
+        edge = pressed and not self.wasPressed and now - self.releaseTime > DEBOUNCE
+        if self.wasPressed and not pressed:
+            self.releaseTime = now
+        if not pressed or edge:
+            self.wasPressed = pressed
+        return edge
@@ -0,0 +1,87 @@
+"""Color math shared by the animation modes, on packed 24-bit RGB ints:
+one gamma curve as a 256-entry table, integer-only scaling and blending,
+and a cache of gamma-corrected gradients. The curve applies everywhere
+it's looked up; change it with set_gamma() before the modes are built,
+as they bake it into their own tables at startup."""
+
+from array import array
+
+try:
+    from rainbowio import colorwheel  # pylint: disable=unused-import
+except ImportError:
+    # Desktop CPython, for host-side tests and benchmarks
+    def colorwheel(pos):
+        pos = int(pos) & 0xFF
+        if pos < 85:
+            return ((255 - pos * 3) << 16) | ((pos * 3) << 8)
+        if pos < 170:
+            pos -= 85
+            return ((255 - pos * 3) << 8) | (pos * 3)
+        pos -= 170
+        return ((pos * 3) << 16) | (255 - pos * 3)
+
+GAMMA = 2.6  # Default curve; makes LED brightness more perceptually linear
+gamma_table = bytearray(256)  # Filled by set_gamma(), updated in place
+_gradients = {}  # (color1, color2, steps): array of packed colors
+
+
+def set_gamma(gamma):
+    """Rebuild the gamma table for a new curve (1.0 for none)."""
+    for n in range(256):
+        gamma_table[n] = int(((n / 255) ** gamma) * 255 + 0.5)
+    _gradients.clear()  # Built with the old curve
+
+
+set_gamma(GAMMA)
+
+
+def gammify(color):
+    """Given a packed 24-bit RGB color, apply gamma correction and return
+    a packed 24-bit RGB integer."""
+    table = gamma_table
+    return (table[color >> 16] << 16) | (table[(color >> 8) & 0xFF] << 8) | table[color & 0xFF]
+
+
+def gamma_adjust(palette):
+    """Gamma correct every color of a palette (displayio.Palette, array or
+    anything indexable) in place."""
+    for index, color in enumerate(palette):
+        palette[index] = gammify(color)
+
+
+def scale(color, level):
+    """Packed color scaled by level/256 (0 to 256), no gamma."""
+    return (
+        (((color >> 16) * level >> 8) << 16)
+        | ((((color >> 8) & 0xFF) * level >> 8) << 8)
+        | ((color & 0xFF) * level >> 8)
+    )
+
+
+def blend(color1, color2, level):
+    """Packed color level/256 (0 to 256) of the way from color1 to color2,
+    no gamma."""
+    result = 0
+    for shift in (16, 8, 0):
+        a = (color1 >> shift) & 0xFF
+        result |= (a + (((color2 >> shift) & 0xFF) - a) * level // 256) << shift
+    return result
+
+
+def gradient(color1, color2, steps):
+    """array("L") of steps+1 gamma-corrected colors evenly spaced from
+    color1 to color2 inclusive: channel a + (b - a) * n // steps for entry n.
+    Cached, so asking again (from any mode) costs a dict lookup. Don't
+    modify the result."""
+    key = (color1, color2, steps)
+    table = _gradients.get(key)
+    if table is None:
+        table = array("L", [0] * (steps + 1))
+        for n in range(steps + 1):
+            color = 0
+            for shift in (16, 8, 0):
+                a = (color1 >> shift) & 0xFF
+                color |= (a + (((color2 >> shift) & 0xFF) - a) * n // steps) << shift
+            table[n] = gammify(color)
+        _gradients[key] = table
+    return table
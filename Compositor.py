@@ -0,0 +1,173 @@
+from array import array
+from FrameBuffer import Surface
+from LedMap import LedMap
+
+# Layer blend modes
+OVER = 0  # Layer drawn over what's below, by its alpha
+ADD = 1  #  Layer's channels (times alpha) added, up to full brightness
+MAX = 2  #  Brighter of the layer (times alpha) and what's below, per channel
+
+
+def composite(below, color, alpha, blend):
+    """Packed color of 'color' at 'alpha' (0-255) blended onto 'below'."""
+    if blend == OVER and alpha == 255:
+        return color
+    result = 0
+    for shift in (16, 8, 0):
+        lower = (below >> shift) & 0xFF
+        upper = ((color >> shift) & 0xFF) * alpha // 255
+        if blend == OVER:
+            value = upper + lower * (255 - alpha) // 255
+        elif blend == ADD:
+            value = min(lower + upper, 255)
+        else:
+            value = max(lower, upper)
+        result |= value << shift
+    return result
+
+
+class Layer(Surface):
+    """One compositor layer: a Surface blended onto the layers below by
+    its alpha and a blend mode. Pixels start transparent; the drawing
+    methods make what they store opaque (and masked-out pixels
+    transparent), pixels set directly in 'pixels' take set_alpha().
+    commit() is left to the compositor, so a mode drawing into a layer
+    works unchanged."""
+
+    def __init__(self, compositor, blend=OVER):
+        super().__init__(compositor.width, compositor.height, alpha=0)
+        self.blend = blend
+        self.enabled = True
+
+    def commit(self):
+        pass  # Compositor.commit() picks up the changed span
+
+
+class HeldGlasses:
+    """Glasses for modes drawing into compositor layers: everything reads
+    through to the real glasses except show(), which does nothing; the
+    Stack shows once all its layers are drawn."""
+
+    def __init__(self, glasses):
+        self.glasses = glasses
+
+    def __getattr__(self, name):
+        return getattr(self.glasses, name)
+
+    def show(self):
+        pass
+
+
+class Compositor:
+    """Stacks Layers, bottom first, and stores the blended result into the
+    glasses' pixel buffer. Only pixels some enabled layer changed since the
+    last commit() are blended again. Where the matrix and a ring share an
+    LED, each layer shows there whichever of its two pixels is opaque,
+    preferring the ring if rings_on_top, else the matrix."""
+
+    def __init__(self, glasses, rings_on_top=True):
+        self.width = glasses.width
+        self.height = glasses.height
+        self.glasses = glasses
+        self.held = HeldGlasses(glasses)  # For modes drawing into layers
+        self.layers = []
+        self.active = None  # Stack whose layers are enabled
+        ledmap = LedMap(glasses)
+        self.buffer = ledmap.buffer
+        self.regs = ledmap.matrix + ledmap.left_ring + ledmap.right_ring  # 3 per pixel
+        size = self.size = len(self.regs) // 3
+        # For each pixel, the one shown at its LED by preference and the
+        # other; the pixel itself both times unless its LED is shared
+        self.first = array("H", range(size))
+        self.second = array("H", range(size))
+        ring = {self.regs[j * 3]: j for j in range(self.width * self.height, size)}
+        for i in range(self.width * self.height):
+            j = ring.get(self.regs[i * 3])
+            if j is not None:
+                top, under = (j, i) if rings_on_top else (i, j)
+                self.first[i] = self.first[j] = top
+                self.second[i] = self.second[j] = under
+        self.touch_all()
+
+    def layer(self, blend=OVER):
+        """Add a layer on top of the others and return it."""
+        layer = Layer(self, blend)
+        self.layers.append(layer)
+        return layer
+
+    def remove(self, layer):
+        """Take a layer out, e.g. when the mode drawing into it is dropped."""
+        self.layers.remove(layer)
+        self.touch_all()
+
+    def touch_all(self):
+        """Blend every pixel on the next commit(), e.g. after the glasses
+        were cleared or layers enabled or disabled."""
+        self.start, self.end = 0, self.size
+
+    def commit(self):
+        """Blend pixels changed in any enabled layer and store them into
+        the glasses' pixel buffer. Call before show()."""
+        start, end = self.start, self.end
+        layers = []
+        for layer in self.layers:
+            if layer.enabled:
+                layers.append(layer)
+                start, end = min(start, layer.start), max(end, layer.end)
+            layer.start, layer.end = layer.size, 0
+        buf, regs, first, second = self.buffer, self.regs, self.first, self.second
+        for k in range(start, end):
+            p, q = first[k], second[k]
+            color = 0
+            for layer in layers:
+                alpha = layer.alpha
+                i = p if alpha[p] else q
+                if alpha[i]:
+                    color = composite(color, layer.pixels[i], alpha[i], layer.blend)
+            j = k * 3
+            buf[regs[j]] = color >> 16
+            buf[regs[j + 1]] = (color >> 8) & 0xFF
+            buf[regs[j + 2]] = color & 0xFF
+        self.start, self.end = self.size, 0
+
+
+class Stack:
+    """A mode made of several modes running at once, each drawing into its
+    own layer of one Compositor (constructed with the layer as framebuffer
+    and the compositor's held glasses): runs them all, then blends what
+    changed and shows once. Only this stack's layers are shown while it
+    runs, so stacks sharing layers can be scheduled as separate modes."""
+
+    def __init__(self, compositor, modes):
+        self.compositor = compositor
+        self.modes = modes
+        self.layers = [mode.framebuffer for mode in modes]
+
+    def activate(self):
+        compositor = self.compositor
+        for layer in compositor.layers:
+            layer.enabled = any(layer is mine for mine in self.layers)
+        compositor.active = self
+        compositor.touch_all()
+
+    def enter(self):
+        """Switched to: show only this stack's layers, redrawing every
+        pixel, with no need to clear the glasses first."""
+        self.activate()
+        self.invalidate()
+
+    def invalidate(self):
+        """Redraw from scratch, e.g. after the glasses were cleared."""
+        self.compositor.touch_all()
+        for mode in self.modes:
+            if hasattr(mode, "invalidate"):
+                mode.invalidate()
+
+    def run(self):
+        compositor = self.compositor
+        if compositor.active is not self:
+            self.activate()
+        for mode in self.modes:
+            mode.run()
+        compositor.commit()
+        compositor.glasses.show()
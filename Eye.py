@@ -1,43 +1,50 @@
+from array import array
+from FrameBuffer import FrameBuffer
+
+# Number of set bits in each 3-bit value, i.e. lit pixels in a 3-pixel
+# segment of one bitmap row
+_POPCOUNT = b"\x00\x01\x01\x02\x01\x02\x02\x03"
+
 class Eye:
     """Holds per-eye positional data; each covers a different area of the
     overall LED matrix."""
 
-    def __init__(self, glasses, left, xoff):
+    def __init__(self, glasses, left, xoff, framebuffer=None):
         self.glasses = glasses
         self.left = left  #     Leftmost column on LED matrix
         self.x_offset = xoff  # Horizontal offset (3X space) to fixate
+        # Frame buffer may be shared between eyes, it covers whole matrix
+        self.framebuffer = framebuffer or FrameBuffer(glasses)
+        self.colors = array("L", [0] * (6 * 5))  # Packed colors, reused
+        self.colormap = self.lut = None  # See smooth()
 
-    def smooth(self, data, rect, colormap):
+    def smooth(self, data, colormap):
         """Scale bitmap (in 'data') to LED array, with smooth 1:3
-        downsampling. 'rect' is a 4-tuple rect of which pixels get
-        filtered (anything outside is cleared to 0), saves a few cycles."""
-        # Quantize bounds rect from 3X space to LED matrix space.
-        rect = (
-            rect[0] // 3,  #       Left
-            rect[1] // 3,  #       Top
-            (rect[2] + 2) // 3,  # Right
-            (rect[3] + 2) // 3,  # Bottom
-        )
-        for y in range(rect[1]):  # Erase rows above top
-            for x in range(6):
-                self.glasses.pixel(self.left + x, y, 0)
-        for y in range(rect[1], rect[3]):  #  Each row, top to bottom...
-            pixel_sum = bytearray(6)  #  Initialize row of pixel sums to 0
-            for y1 in range(3):  # 3 rows of bitmap...
-                row = data[y * 3 + y1]  # Bitmap data for current row
-                for x in range(rect[0], rect[2]):  # Column, left to right
-                    x3 = x * 3
-                    # Accumulate 3 pixels of bitmap into pixel_sum
-                    pixel_sum[x] += row[x3] + row[x3 + 1] + row[x3 + 2]
-            # 'pixel_sum' will now contain values from 0-9, indicating the
-            # number of set pixels in the corresponding section of the 3X
-            # bitmap. 'colormap' expands the sum to 24-bit RGB space.
-            for x in range(rect[0]):  # Erase any columns to left
-                self.glasses.pixel(self.left + x, y, 0)
-            for x in range(rect[0], rect[2]):  # Column, left to right
-                self.glasses.pixel(self.left + x, y, colormap[pixel_sum[x]])
-            for x in range(rect[2], 6):  # Erase columns to right
-                self.glasses.pixel(self.left + x, y, 0)
-        for y in range(rect[3], 5):  # Erase rows below bottom
-            for x in range(6):
-                self.glasses.pixel(self.left + x, y, 0)
+        downsampling. Each of the 15 bitmap rows is an integer with bit N
+        set for lit pixel N (0-17), so a 3x3 block is three 3-bit fields.
+        'colormap' is a list of 10 packed colors for 0-9 lit pixels."""
+        if colormap is not self.colormap:
+            # Expand colormap to a 512-entry table indexed directly by the
+            # nine bits of a 3x3 block, so each LED is a single lookup.
+            self.colormap = colormap
+            self.lut = [
+                colormap[_POPCOUNT[n & 7] + _POPCOUNT[(n >> 3) & 7] + _POPCOUNT[n >> 6]]
+                for n in range(512)
+            ]
+        lut, colors = self.lut, self.colors
+        i = 0
+        for y in range(0, 15, 3):  # Each LED row, top to bottom...
+            r0 = data[y]  #           3 rows of bitmap, shifted so that
+            r1 = data[y + 1] << 3  #  each 3-pixel segment lands in its own
+            r2 = data[y + 2] << 6  #  field of a 9-bit LUT index
+            if r0 | r1 | r2:
+                for shift in range(0, 18, 3):  # Column, left to right
+                    colors[i] = lut[
+                        ((r0 >> shift) & 0o7) | ((r1 >> shift) & 0o70) | ((r2 >> shift) & 0o700)
+                    ]
+                    i += 1
+            else:  # Empty row, erase
+                for _ in range(6):
+                    colors[i] = 0
+                    i += 1
+        self.framebuffer.write_matrix(colors, self.left, 0, 6, 5)
@@ -0,0 +1,118 @@
+"""Integer-only signal processing for AudioEyes' fixed-point path, for
+cores without fast floating point: a block floating point radix-2 FFT on
+values under 1 << 15 with Q14 twiddles (stages halve when they might
+outgrow that, so products stay small ints), a log2 lookup table, and Q8
+column weights. Every table is memoized per size, like AudioEyes' float
+ones."""
+
+from array import array
+from math import cos, log, pi, sin
+
+Q = 14  # Fraction bits of twiddles
+BITS = 15  # FFT values stay under 1 << BITS
+# A butterfly can grow a value to 1 + sqrt(2) times the largest going in,
+# so stages starting with one this big halve
+HALVE_AT = (1 << BITS) * 2 // 5
+ROUND = 1 << (Q - 1)
+# log2(1 + m / 256) * 256 for each 8-bit mantissa m, rounded
+LOG2_TABLE = bytearray(round(log(1 + m / 256) / log(2) * 256) for m in range(256))
+
+_twiddle_cache = {}
+_reverse_cache = {}
+
+
+def twiddles(n):
+    """Q14 cosines and sines of 2 pi k / n, k from 0 to n/2 - 1. Memoized."""
+    table = _twiddle_cache.get(n)
+    if table is None:
+        step = 2 * pi / n
+        table = (
+            array("h", [round(cos(step * k) * (1 << Q)) for k in range(n // 2)]),
+            array("h", [round(sin(step * k) * (1 << Q)) for k in range(n // 2)]),
+        )
+        _twiddle_cache[n] = table
+    return table
+
+
+def bit_reversal(n):
+    """Index n's bits reversed, for each index below n (a power of 2), as
+    the order an in-place FFT takes its input in. Memoized."""
+    table = _reverse_cache.get(n)
+    if table is None:
+        bits = len(bin(n)) - 3
+        table = array("H", [0] * n)
+        for i in range(n):
+            r, v = 0, i
+            for _ in range(bits):
+                r = (r << 1) | (v & 1)
+                v >>= 1
+            table[i] = r
+        _reverse_cache[n] = table
+    return table
+
+
+def fft(re, im, n):
+    """In-place FFT of the n (a power of 2) complex values re + i im,
+    already in bit-reversed order, each under 1 << BITS in magnitude.
+    Returns how many stages halved their results: the transform is what's
+    left in re and im times 2 to that power. Twiddle products and halving
+    round to nearest, which keeps quiet bins close to the float FFT's."""
+    cosines, sines = twiddles(n)
+    halvings = 0
+    size = 2
+    while size <= n:
+        half, step = size >> 1, n // size
+        halve = int(max(max(re), -min(re), max(im), -min(im)) >= HALVE_AT)
+        halvings += halve
+        for start in range(0, n, size):
+            k = 0
+            for j in range(start, start + half):
+                c, s = cosines[k], sines[k]
+                m = j + half
+                tr = (re[m] * c + im[m] * s + ROUND) >> Q
+                ti = (im[m] * c - re[m] * s + ROUND) >> Q
+                r, i = re[j] + halve, im[j] + halve  # Halving rounds too
+                re[m] = (r - tr) >> halve
+                im[m] = (i - ti) >> halve
+                re[j] = (r + tr) >> halve
+                im[j] = (i + ti) >> halve
+                k += step
+        size <<= 1
+    return halvings
+
+
+def log2_q8(value):
+    """log2 of a positive int, times 256, to the nearest (table) step; 0
+    for 0."""
+    if value <= 0:
+        return 0
+    exponent, v = 0, value
+    for shift in (16, 8, 4, 2, 1):
+        if v >= 1 << shift:
+            v >>= shift
+            exponent += shift
+    if exponent >= 8:
+        mantissa = (value >> (exponent - 8)) & 0xFF
+    else:
+        mantissa = (value << (8 - exponent)) & 0xFF
+    return (exponent << 8) + LOG2_TABLE[mantissa]
+
+
+def fixed_window(window):
+    """Q14 copy of a window function array, or None for None."""
+    if window is None:
+        return None
+    return array("h", [round(float(w) * (1 << Q)) for w in window])
+
+
+def column_spans(weights):
+    """Q8 integer version of a column weight matrix: (first bin, weights)
+    per matrix column, for just its run of nonzero weights."""
+    spans = []
+    for row in weights:
+        row = [float(w) for w in row]
+        nonzero = [i for i, w in enumerate(row) if w]
+        first = nonzero[0] if nonzero else 0
+        last = nonzero[-1] + 1 if nonzero else 0
+        spans.append((first, array("h", [round(w * 256) for w in row[first:last]])))
+    return spans
@@ -0,0 +1,148 @@
+from array import array
+from LedMap import LedMap
+
+class Surface:
+    """Flat packed-color image of the whole glasses to draw into: the
+    matrix (row-major) then the left and right rings, 24 LEDs each, with
+    the span of pixels changed since the last commit(). In the drawing
+    methods, 'ring' is this surface's left_ring or right_ring (an offset).
+    Pixels can also be set directly in 'pixels', followed by touch().
+
+    Each pixel also has an opacity (0-255) in 'alpha': the drawing methods
+    make what they store opaque and masked-out pixels transparent, pixels
+    set directly keep theirs unless changed with set_alpha() (or 'alpha'
+    directly). Pixels start as opaque as 'alpha' says."""
+
+    def __init__(self, width, height, alpha=255):
+        self.width = width
+        self.height = height
+        self.left_ring = width * height
+        self.right_ring = self.left_ring + 24
+        self.size = self.right_ring + 24
+        self.pixels = array("L", [0] * self.size)
+        self.alpha = bytearray([alpha] * self.size)
+        self.touch_all()  # First commit stores everything
+
+    def touch(self, start, end):
+        """Mark pixels start to end-1, changed by writing 'pixels' directly,
+        to be stored by the next commit()."""
+        if start < self.start:
+            self.start = start
+        if end > self.end:
+            self.end = end
+
+    def touch_all(self):
+        """Store every pixel on the next commit(), e.g. after the glasses
+        were cleared by something else."""
+        self.start, self.end = 0, self.size
+
+    def write_matrix(self, colors, left, top, width, height, mask=None):
+        """Store a width x height rectangle of packed 24-bit colors (row-major
+        sequence, e.g. array("L")) with upper-left corner at (left, top). If
+        'mask' is given, only colors whose bit is set in it (bit N for
+        colors[N]) are stored, the rest made transparent. No clipping is
+        performed, be nice."""
+        pixels, alpha = self.pixels, self.alpha
+        i = 0
+        for y in range(top, top + height):
+            j = y * self.width + left
+            for _ in range(width):
+                if mask is None or (mask >> i) & 1:
+                    pixels[j] = colors[i]
+                    alpha[j] = 255
+                else:
+                    alpha[j] = 0
+                i += 1
+                j += 1
+        self.touch(top * self.width + left, (top + height - 1) * self.width + left + width)
+
+    def write_ring(self, ring, colors, start=0, mask=None):
+        """Store 24 packed colors, beginning at index 'start' of 'colors',
+        into a ring. If 'mask' is given, only LEDs whose bit is set in it
+        (bit N for LED N) are stored, the rest made transparent."""
+        pixels, alpha = self.pixels, self.alpha
+        for n in range(24):
+            if mask is None or (mask >> n) & 1:
+                pixels[ring + n] = colors[start + n]
+                alpha[ring + n] = 255
+            else:
+                alpha[ring + n] = 0
+        self.touch(ring, ring + 24)
+
+    def write_ring_bytes(self, ring, data):
+        """Store 72 bytes of R, G, B per LED (e.g. from ulab's tobytes())
+        into a ring."""
+        pixels, alpha = self.pixels, self.alpha
+        j = 0
+        for n in range(ring, ring + 24):
+            pixels[n] = (data[j] << 16) | (data[j + 1] << 8) | data[j + 2]
+            alpha[n] = 255
+            j += 3
+        self.touch(ring, ring + 24)
+
+    def fill_ring(self, ring, color):
+        """Set all 24 LEDs of a ring to one packed color."""
+        pixels, alpha = self.pixels, self.alpha
+        for n in range(ring, ring + 24):
+            pixels[n] = color
+            alpha[n] = 255
+        self.touch(ring, ring + 24)
+
+    def set_alpha(self, start, end, alpha=255):
+        """Opacity of pixels start to end-1."""
+        for i in range(start, end):
+            self.alpha[i] = alpha
+        self.touch(start, end)
+
+    def commit(self):
+        """Store changed pixels wherever this surface's output goes."""
+        self.start, self.end = self.size, 0
+
+
+class FrameBuffer(Surface):
+    """A Surface committed straight to an LED_Glasses: commit() stores what
+    changed into the driver's pixel buffer in one pass, through a
+    precomputed register map, before show(). A transparent (alpha 0) pixel
+    leaves its LED the color it had. Where the matrix and a ring share an
+    LED, it shows the one on top if that's opaque (any nonzero alpha),
+    else the other if that is, else keeps the color it had, as if drawn
+    bottom first straight to the glasses; so drawing order doesn't
+    matter."""
+
+    def __init__(self, glasses, rings_on_top=True):
+        super().__init__(glasses.width, glasses.height)
+        self.ledmap = ledmap = LedMap(glasses)
+        self.regs = ledmap.matrix + ledmap.left_ring + ledmap.right_ring  # 3 per pixel
+        # For each pixel, the other one at its LED (itself unless shared),
+        # and 1 for the lower of a shared pair; so an unshared pixel is
+        # both top and bottom
+        self.other = array("H", range(self.size))
+        self.under = bytearray(self.size)
+        ring = {self.regs[i * 3]: i for i in range(self.left_ring, self.size)}
+        for i in range(self.left_ring):
+            j = ring.get(self.regs[i * 3])
+            if j is not None:
+                self.other[i], self.other[j] = j, i
+                self.under[i if rings_on_top else j] = 1
+
+    def commit(self):
+        """Store pixels changed since the last commit into the glasses'
+        pixel buffer. Call before show()."""
+        buf, regs, pixels, alpha = self.ledmap.buffer, self.regs, self.pixels, self.alpha
+        other, under = self.other, self.under
+        j = self.start * 3
+        for i in range(self.start, self.end):
+            k = other[i]
+            top, bottom = (k, i) if under[i] else (i, k)
+            if alpha[top]:
+                color = pixels[top]
+            elif alpha[bottom]:
+                color = pixels[bottom]
+            else:
+                j += 3
+                continue  # Nothing opaque, the LED keeps its color
+            buf[regs[j]] = color >> 16
+            buf[regs[j + 1]] = (color >> 8) & 0xFF
+            buf[regs[j + 2]] = color & 0xFF
+            j += 3
+        self.start, self.end = self.size, 0
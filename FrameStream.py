@@ -0,0 +1,88 @@
+"""Whole frames streamed over BLE UART, as Bluefruit Connect style packets
+of variable length: "!", a type letter, payload length, payload, checksum.
+Pixels are palette indices, in Surface order: the matrix row by row, then
+the left and right rings. A frame is one packet, either a keyframe (every
+pixel) or the changes from the frame before it, which must carry the next
+sequence number; after a gap, changes are ignored until a keyframe.
+host/stream_encoder.py makes these from packed colors."""
+
+from array import array
+from Color import gammify
+from PacketParser import LENGTHS, PacketParser
+
+PALETTE = 0x50  # "P": first index, then R, G, B per color (before gamma)
+FRAME = 0x46  #   "F": sequence number (0-255, wrapping), encoding, pixels
+# Frame encodings
+RAW = 0  #   One index per pixel
+RUNS = 1  #  Count, index pairs: 'count' pixels of one color
+DELTA = 2  # Skip, count, index triples: 'skip' pixels as they were, then a run
+
+STREAM_LENGTHS = dict(LENGTHS)
+STREAM_LENGTHS[PALETTE] = STREAM_LENGTHS[FRAME] = 0
+RING_SIZE = 320  # Longest packet (259 bytes) and then some
+
+
+class StreamParser(PacketParser):
+    """PacketParser that also takes palette and frame packets, drawing each
+    frame into a Surface as it's decoded. 'fresh' is set when a frame has
+    been drawn, for the caller to commit and show, then clear."""
+
+    def __init__(self, surface):
+        super().__init__(RING_SIZE, STREAM_LENGTHS)
+        self.surface = surface
+        self.palette = array("L", [0] * 256)  # Gamma-corrected
+        self.fresh = False
+        self.frames = self.missed = 0  # Frames drawn, and deltas ignored
+
+    def reset(self):
+        super().reset()
+        self.sequence = None  # Of the last frame drawn, None to await a keyframe
+
+    def handle(self, kind):
+        if kind == FRAME:
+            self.frame(3 + self.byte(2))
+        elif kind == PALETTE:
+            palette, byte = self.palette, self.byte
+            index = byte(3)
+            for i in range(4, 2 + byte(2), 3):
+                palette[index] = gammify((byte(i) << 16) | (byte(i + 1) << 8) | byte(i + 2))
+                index = (index + 1) & 0xFF
+        else:
+            super().handle(kind)
+
+    def frame(self, end):
+        """Draw the frame packet at the head of the ring, payload ending
+        before byte 'end'."""
+        byte, palette, surface = self.byte, self.palette, self.surface
+        pixels, size = surface.pixels, surface.size
+        sequence, encoding = byte(3), byte(4)
+        if encoding == DELTA and (self.sequence is None or sequence != (self.sequence + 1) & 0xFF):
+            self.missed += 1  # Changes from a frame that was lost
+            self.sequence = None
+            return
+        i, p = 5, 0
+        if encoding == RAW:
+            for p in range(min(end - i, size)):
+                pixels[p] = palette[byte(i + p)]
+            first, last = 0, size
+        elif encoding == RUNS or encoding == DELTA:
+            step = 3 if encoding == DELTA else 2
+            first, last = size, 0
+            while i + step <= end:
+                if encoding == DELTA:
+                    p += byte(i)
+                count, color = byte(i + step - 2), palette[byte(i + step - 1)]
+                stop = min(p + count, size)
+                if p < stop:
+                    first, last = min(first, p), stop
+                while p < stop:
+                    pixels[p] = color
+                    p += 1
+                i += step
+        else:
+            return  # Unknown encoding
+        if first < last:
+            surface.touch(first, last)
+        self.sequence = sequence
+        self.frames += 1
+        self.fresh = True
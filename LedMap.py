@@ -0,0 +1,48 @@
+from array import array
+
+class LedMap:
+    """Precomputed mapping from LED_Glasses matrix and ring pixels to the
+    IS31FL3741's PWM registers, so whole runs of packed colors can be stored
+    straight into the driver's pixel buffer without going through pixel()
+    (bounds checks, unpack_from and three __setitem__ calls per pixel).
+    FrameBuffer, Compositor and TintedGlasses store through it."""
+
+    def __init__(self, glasses):
+        self.width = glasses.width
+        self.height = glasses.height
+        buffer = getattr(glasses, "_pixel_buffer", None)
+        if buffer:
+            # Buffered driver keeps a leading register-address byte, so
+            # LED n lives at buffer[n + 1]
+            self.buffer, base = buffer, 1
+        else:
+            # Unbuffered: assign through the driver, which writes each
+            # register over I2C. Slow, but same result.
+            self.buffer, base = glasses, 0
+        # Older drivers predate configurable color order and are BGR
+        order = (
+            getattr(glasses, "r_offset", 2),
+            getattr(glasses, "g_offset", 1),
+            getattr(glasses, "b_offset", 0),
+        )
+
+        # Three register indices (R, G, B) per pixel, in row-major order
+        self.matrix = array("H")
+        for y in range(self.height):
+            for x in range(self.width):
+                addrs = glasses.pixel_addrs(x, y)
+                for offset in order:
+                    self.matrix.append(addrs[offset] + base)
+
+        # Same for the 24 LEDs of each ring, in ring order
+        self.left_ring = self._ring(glasses.left_ring, order, base)
+        self.right_ring = self._ring(glasses.right_ring, order, base)
+
+    @staticmethod
+    def _ring(ring, order, base):
+        regs = array("H")
+        for n in range(24):
+            addrs = ring.pixel_addrs(n)
+            for offset in order:
+                regs.append(addrs[offset] + base)
+        return regs
@@ -0,0 +1,152 @@
+import gc
+from time import monotonic
+
+
+class Entry:
+    def __init__(self, name, factory, fps, release, pinned):
+        self.name = name
+        self.factory = factory
+        self.fps = fps
+        self.release = release  # Called with the mode before it's dropped
+        self.pinned = pinned  # Never dropped once built
+        self.mode = None
+        self.size = 0  # Heap bytes it took to build, if known
+        self.used = 0  # When last asked for
+        self.parts = []  # Entries it got from the registry while being built
+
+
+class ModeRegistry:
+    """Builds animation modes on first use instead of all at boot, keeping
+    those built under a heap budget: when building one puts the total over
+    budget, the least recently used idle modes are dropped (and built again
+    if wanted later). Entries added with an fps are the modes to switch
+    between, in order, looked up by index as Scheduler's (mode, fps) list
+    was. Others are parts modes are built from (e.g. a mode shared by two
+    compositor Stacks), built when a mode's factory gets them and dropped
+    when no built mode uses them. Heap use is measured with gc.mem_free()
+    where there is one (CircuitPython); elsewhere pass 'mem_free', or
+    nothing is dropped."""
+
+    def __init__(self, budget=None, mem_free=None, clock=monotonic):
+        self.budget = budget  # Bytes, None for no limit
+        self.mem_free = mem_free or getattr(gc, "mem_free", None)
+        self.clock = clock
+        self.entries = {}
+        self.order = []  # Entries with an fps, in switching order
+        self.building = None  # Entry whose factory is running
+        self.nested = 0  # Heap bytes taken by parts it built
+        self.current = None  # Entry of the mode last looked up by index
+        self.builds = self.drops = 0
+
+    def add(self, name, factory, fps=None, release=None, pinned=False):
+        """Register 'factory', called with no arguments to build the mode
+        (or part) 'name'. With an fps, it's a mode to switch to, at that
+        frame rate (0 for as fast as possible). 'release' is called with
+        the mode when it's dropped, e.g. to detach its compositor layer;
+        'pinned' modes are never dropped once built (e.g. BLE, which can't
+        be set up twice)."""
+        entry = Entry(name, factory, fps, release, pinned)
+        self.entries[name] = entry
+        if fps is not None:
+            self.order.append(entry)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        """(mode, fps) for mode number 'index', building the mode if need
+        be."""
+        entry = self.order[index]
+        self.current = entry
+        return self.get(entry.name), entry.fps
+
+    def built(self, name):
+        """Mode or part 'name' if it's built, else None; never builds."""
+        return self.entries[name].mode
+
+    def get(self, name):
+        """Mode or part 'name', built if it isn't already."""
+        entry = self.entries[name]
+        if self.building and entry not in self.building.parts:
+            self.building.parts.append(entry)
+        if entry.mode is None:
+            self.build(entry)
+        entry.used = self.clock()
+        return entry.mode
+
+    def build(self, entry):
+        outer, outer_nested = self.building, self.nested
+        self.building, self.nested = entry, 0
+        entry.parts = []
+        gc.collect()
+        before = self.mem_free() if self.mem_free else 0
+        try:
+            try:
+                entry.mode = entry.factory()
+            except MemoryError:
+                self.drop_idle()  # Make all the room there is, try once more
+                gc.collect()
+                entry.mode = entry.factory()
+        finally:
+            self.building = outer
+        used = 0
+        if self.mem_free:
+            gc.collect()
+            used = before - self.mem_free()
+        entry.size = max(used - self.nested, 0)  # Less parts built along the way
+        self.nested = outer_nested + used
+        self.builds += 1
+        if self.budget is not None and outer is None:
+            self.enforce(entry)
+
+    def in_use(self, keep=None):
+        """Entries that must stay built: the current mode, 'keep', any
+        factory running, and everything they're built from."""
+        roots = [entry for entry in (self.current, keep, self.building) if entry]
+        needed = []
+        while roots:
+            entry = roots.pop()
+            if entry not in needed:
+                needed.append(entry)
+                roots.extend(entry.parts)
+        return needed
+
+    def total(self):
+        """Heap bytes held by built modes and parts, as measured."""
+        return sum(entry.size for entry in self.entries.values() if entry.mode is not None)
+
+    def enforce(self, keep=None):
+        """Drop least recently used idle modes until within budget."""
+        needed = self.in_use(keep)
+        idle = [entry for entry in self.order if self.idle(entry, needed)]
+        idle.sort(key=lambda entry: entry.used)
+        while idle and self.total() > self.budget:
+            self.drop(idle.pop(0))
+
+    def drop_idle(self):
+        """Drop every mode not in use, e.g. to free memory for something
+        else."""
+        needed = self.in_use()
+        for entry in self.order:
+            if self.idle(entry, needed):
+                self.drop(entry)
+
+    @staticmethod
+    def idle(entry, needed):
+        return entry.mode is not None and not entry.pinned and entry not in needed
+
+    def drop(self, entry):
+        """Drop a built mode, then any parts no built mode uses now."""
+        mode, entry.mode = entry.mode, None
+        if mode is None:
+            return  # Already dropped, as a part of another
+        if entry.release:
+            entry.release(mode)
+        self.drops += 1
+        for part in entry.parts:
+            if part.mode is not None and not part.pinned and not any(
+                part in other.parts for other in self.entries.values() if other.mode is not None
+            ):
+                self.drop(part)
+        entry.parts = []
+        gc.collect()
@@ -0,0 +1,105 @@
+START = 0x21  # "!", first byte of every packet
+COLOR = 0x43  #  "C", ColorPacket type
+BUTTON = 0x42  # "B", ButtonPacket type
+# Bluefruit Connect packets are "!", a type letter, a fixed-size payload and
+# a checksum byte (the others' sum, inverted). Whole length by type, 0 for
+# variable: a payload length byte follows the type letter.
+LENGTHS = {
+    0x41: 15,  # "A" accelerometer, 3 floats
+    0x47: 15,  # "G" gyro, 3 floats
+    0x4D: 15,  # "M" magnetometer, 3 floats
+    0x4C: 15,  # "L" location, 3 floats
+    0x51: 19,  # "Q" quaternion, 4 floats
+    COLOR: 6,  # R, G, B
+    BUTTON: 5,  # Button "1"-"8", "1" pressed or "0" released
+}
+
+
+class PacketParser:
+    """Bluefruit Connect packets from a UART byte stream, which BLE delivers
+    in arbitrary pieces: several packets at once, or one split across
+    reads. Bytes queue in a fixed ring buffer until a whole packet is in,
+    packets with a bad checksum or unknown type are skipped a byte at a
+    time to resync on the next "!". Nothing is allocated per packet; the
+    latest color and button are kept, for the caller to take when it's
+    ready, rather than each packet being handed over as it arrives."""
+
+    def __init__(self, size=64, lengths=LENGTHS):
+        """'size' must hold the longest packet in 'lengths' (259 bytes if
+        any are variable)."""
+        self.ring = bytearray(size)
+        self.chunk = bytearray(20)  # One BLE notification's worth
+        self.lengths = lengths
+        self.color = None  # Latest packed color received, None once taken
+        self.button = None  # Latest button, "1"-"8", and whether pressed
+        self.pressed = False
+        self.packets = self.dropped = 0  # Packets decoded, bytes skipped
+        self.reset()
+
+    def reset(self):
+        """Discard queued bytes, e.g. a partial packet when the connection
+        dropped."""
+        self.head = self.count = 0
+
+    def poll(self, uart):
+        """Read whatever 'uart' (e.g. a UARTService) has waiting, without
+        waiting for more, and decode every whole packet; return how many."""
+        ring, chunk, size = self.ring, self.chunk, len(self.ring)
+        decoded = 0
+        while True:
+            n = min(uart.in_waiting, size - self.count, len(chunk))
+            if n <= 0:
+                break
+            n = uart.readinto(chunk, n) or 0
+            if not n:
+                break
+            tail = self.head + self.count
+            for i in range(n):
+                ring[(tail + i) % size] = chunk[i]
+            self.count += n
+            decoded += self.parse()  # Frees room for the next chunk
+        return decoded
+
+    def byte(self, n):
+        """Byte 'n' of the packet at the head of the ring."""
+        return self.ring[(self.head + n) % len(self.ring)]
+
+    def skip(self, n):
+        self.head = (self.head + n) % len(self.ring)
+        self.count -= n
+
+    def parse(self):
+        """Decode whole packets queued in the ring, return how many."""
+        decoded = 0
+        while self.count >= 2:
+            length = self.lengths.get(self.byte(1)) if self.byte(0) == START else None
+            if length is None:
+                self.skip(1)  # Not a packet start, look further on
+                self.dropped += 1
+                continue
+            if not length:
+                if self.count < 3:
+                    break
+                length = self.byte(2) + 4  # "!", type, length, checksum
+            if self.count < length:
+                break  # Rest of it still to come
+            total = 0
+            for i in range(length - 1):
+                total += self.byte(i)
+            if ~total & 0xFF != self.byte(length - 1):
+                self.skip(1)  # Corrupt, or a "!" inside another packet
+                self.dropped += 1
+                continue
+            self.handle(self.byte(1))
+            self.skip(length)
+            decoded += 1
+        self.packets += decoded
+        return decoded
+
+    def handle(self, kind):
+        """Take in the packet of type 'kind' at the head of the ring."""
+        if kind == COLOR:
+            self.color = (self.byte(2) << 16) | (self.byte(3) << 8) | self.byte(4)
+        elif kind == BUTTON:
+            self.button = chr(self.byte(2))
+            self.pressed = self.byte(3) == 0x31
@@ -1,52 +1,95 @@
 import math
 import random
-import board
-
-class Pendulum:
-    """A small class for our pendulum simulation."""
-
-    def __init__(self, ring, color):
-        """Initial pendulum position, plus axle friction, are randomized
-        so the two rings don't spin in perfect lockstep."""
-        self.ring = ring  # Save reference to corresponding LED ring
-        self.color = color  # (R,G,B) tuple for color
-        self.angle = random.random()  # Position around ring, in radians
-        self.momentum = 0
-        self.friction = random.uniform(0.85, 0.9)  # Inverse friction, really
-
-    def interp(self, pixel, scale):
-        """Given a pixel index (0-23) and a scaling factor (0.0-1.0),
-        interpolate between LED "off" color (at 0.0) and this item's fully-
-        lit color (at 1.0) and set pixel to the result."""
-        self.ring[pixel] = (
-            (int(self.color[0] * scale) << 16)
-            | (int(self.color[1] * scale) << 8)
-            | int(self.color[2] * scale)
-        )
 
-    def iterate(self, xyz):
-        """Given an accelerometer reading, run one cycle of the pendulum
-        physics simulation and render the corresponding LED ring."""
+try:
+    from ulab import numpy as np
+except ImportError:
+    import numpy as np  # Desktop CPython, for host-side tests
+
+SUB = 32  # Pendulum positions per LED, sub-pixel steps
+
+
+def _profile():
+    """Falloff table: row f holds the brightness (0.0-1.0) of each of the
+    24 ring pixels with a pendulum at position f/SUB, i.e. just past pixel
+    0. Solid within 2 pixels, fading out to nothing at 5, measured the
+    short way around the ring. For a pendulum past pixel b, roll row by b."""
+    table = np.zeros((SUB, 24))
+    for f in range(SUB):
+        for i in range(24):
+            dist = abs(f / SUB - i)
+            dist = min(dist, 24 - dist)
+            table[f, i] = min(1.0, max(0.0, (5 - dist) / 3))
+    return table
+
+
+PROFILE = _profile()
+
+
+class Pendulums:
+    """Pendulum simulation for any number of pendulums spread across the
+    two LED rings, all stepped at once: angles, momenta and frictions live
+    in arrays, and each ring's colors come from one matrix product of the
+    pendulums' colors by their brightness profiles."""
+
+    def __init__(self, framebuffer, weights):
+        """'weights' is a list of (ring, (R,G,B)) pairs, ring being the
+        FrameBuffer's left_ring or right_ring. Initial pendulum positions, plus
+        axle friction, are randomized so the rings don't spin in perfect
+        lockstep."""
+        self.framebuffer = framebuffer
+        count = len(weights)
+        angle, friction = [], []
+        for _ in weights:
+            angle.append(random.random())  # Position around ring, in radians
+            friction.append(random.uniform(0.85, 0.9))  # Inverse friction, really
+        self.angle = np.array(angle)
+        self.previous = self.angle  # Angles before the last step
+        self.momentum = np.zeros(count)
+        self.friction = np.array(friction)
+        self.profiles = np.zeros((count, 24))  # Brightness per pendulum, pixel
+        # For each ring: its offset, and colors as a 3 x count matrix
+        # whose columns are zero for pendulums on the other ring
+        self.rings = []
+        for ring in (framebuffer.left_ring, framebuffer.right_ring):
+            colors = np.zeros((3, count))
+            for k, (where, color) in enumerate(weights):
+                if where == ring:
+                    for channel in range(3):
+                        colors[channel, k] = color[channel]
+            self.rings.append((ring, colors))
+
+    def step(self, xyz):
+        """Given an accelerometer reading, run one cycle of the physics
+        simulation for every pendulum. Constants are per step, so steps
+        should come at a fixed rate."""
+        self.previous = self.angle
         # Minus here is because LED pixel indices run clockwise vs. trigwise.
         # 0.05 is just an empirically-derived scaling fudge factor that looks
         # good; smaller values for more sluggish rings, higher = more twitch.
         self.momentum = (
             self.momentum * self.friction
-            - (math.cos(self.angle) * xyz[2] + math.sin(self.angle) * xyz[0]) * 0.05
+            - (np.cos(self.angle) * xyz[2] + np.sin(self.angle) * xyz[0]) * 0.05
         )
-        self.angle += self.momentum
+        self.angle = self.angle + self.momentum
 
-        # Scale pendulum angle into pixel space
-        midpoint = self.angle * 12 / math.pi % 24
-        # Go around the whole ring, setting each pixel based on proximity
-        # (this is also to erase the prior position)...
-        for i in range(24):
-            dist = abs(midpoint - i)  # Pixel to pendulum distance...
-            if dist > 12:  #            If it crosses the "seam" at top,
-                dist = 24 - dist  #      take the shorter path.
-            if dist > 5:  #             Not close to pendulum,
-                self.ring[i] = 0  #      erase pixel.
-            elif dist < 2:  #           Close to pendulum,
-                self.interp(i, 1.0)  #   solid color
-            else:  #                    Anything in-between,
-                self.interp(i, (5 - dist) / 3)  # interpolate
+    def render(self, alpha=1.0):
+        """Draw both rings with the pendulums at 'alpha' (0.0-1.0) of the
+        way from their positions before the last step to after it."""
+        angle = self.angle if alpha >= 1.0 else self.previous + (self.angle - self.previous) * alpha
+        # Scale angles into sub-pixel steps, look up each one's profile
+        steps = angle * (12 * SUB / math.pi)
+        profiles = self.profiles
+        for k in range(len(steps)):
+            step = int(math.floor(steps[k] + 0.5)) % (24 * SUB)
+            profiles[k, :] = np.roll(PROFILE[step % SUB], step // SUB)
+
+        for ring, colors in self.rings:
+            rgb = np.minimum(np.dot(colors, profiles), 255)  # 3 x 24
+            # Transposed, that's R, G, B per LED
+            self.framebuffer.write_ring_bytes(ring, np.array(rgb.transpose(), dtype=np.uint8).flatten().tobytes())
+
+    def iterate(self, xyz):
+        """One physics step and render, for a step per frame."""
+        self.step(xyz)
+        self.render()
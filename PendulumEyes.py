@@ -1,22 +1,73 @@
-import math
-import random
-import board
-from Pendulum import Pendulum
+from time import monotonic
+from AccelFifo import AccelFifo
+from FrameBuffer import FrameBuffer
+from Pendulum import Pendulums
+
+PHYSICS_RATE = 100  # Simulation steps/second, one per accelerometer sample
+MAX_STEPS = 32  # Most steps per frame, after that the simulation falls behind
 
 class PendulumEyes:
 
-    def __init__(self, g, l):
+    def __init__(self, g, l, weights=((0, 20, 50),), clock=monotonic, framebuffer=None, device=None):
+        """'weights' is the colors of the pendulums swinging in each eye;
+        by default one, cerulean blue (50 is plenty bright!). The physics
+        run at a fixed PHYSICS_RATE, fed from the accelerometer's FIFO, no
+        matter the frame rate; frames are drawn part way between steps.
+        'clock' is any monotonic seconds function, swappable for testing.
+        'framebuffer' is an optional Surface to draw into, such as a
+        compositor Layer; by default PendulumEyes has its own FrameBuffer.
+        'device' is an I2CDevice for the LIS3DH's FIFO (see AccelFifo);
+        without it, one reading is taken per frame."""
         self.glasses = g
         self.lis3dh = l
-        self.pendulums = [
-            Pendulum(self.glasses.left_ring, (0, 20, 50)),  # Cerulean blue,
-            Pendulum(self.glasses.right_ring, (0, 20, 50)),  # 50 is plenty bright!
-        ]
+        self.accel = AccelFifo(l, PHYSICS_RATE, device)
+        self.clock = clock
+        self.framebuffer = framebuffer = framebuffer or FrameBuffer(g)
+        self.pendulums = Pendulums(
+            framebuffer,
+            [(ring, color) for ring in (framebuffer.left_ring, framebuffer.right_ring) for color in weights],
+        )
+        self.xyz = [0.0, 0.0, 0.0]  # Latest sample used, reused if none new
+        self.invalidate()
+        self.profiler = None  # Optional Profiler, for per-stage timing
         print("pendulum eyes init done")
 
+    def enter(self):
+        """Switched to: redraw every pixel, no need to clear the glasses
+        first."""
+        self.invalidate()
+
+    def invalidate(self):
+        """Restart the physics clock, e.g. on coming back to this mode, so
+        time spent elsewhere isn't simulated all at once."""
+        self.start = self.clock()
+        self.steps = 0  # Physics steps run since start
+        self.accel.flush()
+        self.framebuffer.touch_all()
+
     def run(self):
-        accel = self.lis3dh.acceleration
-        for p in self.pendulums:
-            p.iterate(accel)
+        profiler = self.profiler
+        if profiler:
+            profiler.begin()
+        self.accel.poll()
+        if profiler:
+            profiler.lap("accel")
+
+        # Steps due by now, and how far into the next one this frame falls
+        elapsed = (self.clock() - self.start) * PHYSICS_RATE
+        due = int(elapsed)
+        if due - self.steps > MAX_STEPS:
+            self.steps = due - MAX_STEPS
+        for _ in range(due - self.steps):
+            self.accel.pop(self.xyz)
+            self.pendulums.step(self.xyz)
+        self.steps = due
+        self.pendulums.render(elapsed - due)
+        self.framebuffer.commit()
+        if profiler:
+            profiler.lap("physics")
 
         self.glasses.show()
+        if profiler:
+            profiler.lap("show")
+            profiler.end()
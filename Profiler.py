@@ -0,0 +1,97 @@
+from array import array
+from time import monotonic_ns
+
+# Frame time histogram bucket limits, in milliseconds; the last bucket
+# catches everything slower
+BUCKETS = (5, 10, 17, 25, 33, 50, 100)
+
+class Profiler:
+    """Per-stage and per-frame timing for an animation mode. A mode with a
+    'profiler' attribute calls begin() at the start of each frame, lap(name)
+    at the end of each stage and end() after the last one. Modes check for
+    a profiler before each call, so with none attached the cost is an
+    attribute load and a test per stage.
+
+    Stage times are totalled by name (a stage may lap several times per
+    frame, e.g. once per eye). The last 'history' frame times are kept in a
+    ring buffer for the histogram and percentiles in dump()."""
+
+    def __init__(self, name, history=256, dump_every=0, path=None):
+        """'dump_every' > 0 dumps stats every that many frames, to the
+        serial console or appended to file 'path'."""
+        self.name = name
+        self.dump_every = dump_every
+        self.path = path
+        self.times = array("L", [0] * history)  # Frame times, microseconds
+        self.reset()
+
+    def reset(self):
+        self.stages = {}  # Name: [laps, total ns, max ns]
+        self.order = []  #  Stage names, first-lapped first
+        self.frames = self.index = 0
+        self.frame_start = self.lap_start = self.first_start = 0
+
+    def begin(self):
+        self.frame_start = self.lap_start = monotonic_ns()
+        if not self.frames:
+            self.first_start = self.frame_start
+
+    def lap(self, name):
+        now = monotonic_ns()
+        elapsed = now - self.lap_start
+        self.lap_start = now
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = [0, 0, 0]
+            self.order.append(name)
+        stage[0] += 1
+        stage[1] += elapsed
+        if elapsed > stage[2]:
+            stage[2] = elapsed
+
+    def end(self):
+        self.times[self.index] = (monotonic_ns() - self.frame_start) // 1000
+        self.index = (self.index + 1) % len(self.times)
+        self.frames += 1
+        if self.dump_every and not self.frames % self.dump_every:
+            self.dump(self.path)
+
+    def report(self):
+        """Return stats so far as a list of text lines."""
+        frames = max(self.frames, 1)
+        elapsed = (monotonic_ns() - self.first_start) / 1e9
+        lines = ["%s: %d frames, %.1f fps" % (self.name, self.frames, self.frames / elapsed if elapsed else 0)]
+        for name in self.order:
+            laps, total, peak = self.stages[name]
+            lines.append(
+                "  %-12s %7.2f ms/frame  max %6.2f ms  (%d laps)"
+                % (name, total / frames / 1e6, peak / 1e6, laps)
+            )
+        count = min(self.frames, len(self.times))
+        if count:
+            recent = sorted(self.times[:count])
+            lines.append(
+                "  frame ms: min %.2f  median %.2f  p95 %.2f  max %.2f (last %d)"
+                % (recent[0] / 1000, recent[count // 2] / 1000,
+                   recent[min(count * 95 // 100, count - 1)] / 1000, recent[-1] / 1000, count)
+            )
+            histogram = [0] * (len(BUCKETS) + 1)
+            for micros in recent:
+                bucket = 0
+                while bucket < len(BUCKETS) and micros >= BUCKETS[bucket] * 1000:
+                    bucket += 1
+                histogram[bucket] += 1
+            labels = ["<%d" % limit for limit in BUCKETS] + [">=%d" % BUCKETS[-1]]
+            lines.append("  " + "  ".join("%s:%d" % pair for pair in zip(labels, histogram)))
+        return lines
+
+    def dump(self, path=None):
+        """Print report() to the serial console, or append it to file 'path'
+        (needs a writable filesystem, see boot.py)."""
+        if path:
+            with open(path, "a") as file:
+                for line in self.report():
+                    file.write(line + "\n")
+        else:
+            for line in self.report():
+                print(line)
@@ -0,0 +1,133 @@
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio  # Older CircuitPython/MicroPython
+from time import monotonic
+from Scheduler import Scheduler
+
+POLL = 0.01  #   Seconds between button polls
+LISTEN = 0.05  # Seconds between BLE checks
+
+
+class Runtime(Scheduler):
+    """Runs the glasses as concurrent asyncio tasks instead of one loop:
+    one per animation mode, each awaiting tick() for its frames (which
+    return only while that mode is selected, paced to its frame rate as
+    by Scheduler), one polling the button to switch modes, and one
+    listening over BLE, so neither waits on the other. Colors picked in
+    the Bluefruit Connect app tint whatever mode is showing, through a
+    TintedGlasses, except in modes that read the BLE UART themselves
+    (reads_uart set), which the listener stays out of the way of.
+
+    Switching calls the old mode's exit() and the new one's enter(), if
+    they have them; a mode without enter() gets the glasses cleared and
+    invalidate() called instead. Time from 'boot' to the first frame, and
+    from each switch to the new mode's first frame, are printed."""
+
+    def __init__(self, modes, glasses, clock=monotonic, boot=None):
+        """'modes' are (mode, fps) pairs as for Scheduler, or a
+        ModeRegistry, 'glasses' the TintedGlasses they all draw to."""
+        self.glasses = glasses
+        self.selected = [asyncio.Event() for _ in range(len(modes))]
+        self.tint = None  # Latest color received over BLE
+        self.switches = 0
+        self.exiting = None  # Mode to exit() on the next switch
+        self.switched = clock() if boot is None else boot  # Awaiting first frame since
+        self.latency = None  # Seconds from the last switch to its first frame
+        super().__init__(modes, clock)
+
+    def select(self, index):
+        """Switch to mode number 'index' (building it, from a registry),
+        have it take over the glasses and wake its task."""
+        previous = getattr(self, "index", None)
+        if previous is not None:
+            self.switched = self.clock()
+            self.switches += 1
+            self.selected[previous].clear()
+            if hasattr(self.exiting, "exit"):
+                self.exiting.exit()
+        super().select(index)
+        mode = self.exiting = self.mode
+        if hasattr(mode, "enter"):
+            mode.enter()
+        elif previous is not None:
+            glasses = self.glasses
+            glasses.fill(0x000000)
+            glasses.left_ring.fill(0x000000)
+            glasses.right_ring.fill(0x000000)
+            glasses.show()
+            if hasattr(mode, "invalidate"):
+                mode.invalidate()  # Redraw from scratch
+        self.glasses.set_tint(None if getattr(mode, "reads_uart", False) else self.tint)
+        self.selected[self.index].set()
+
+    async def tick(self, index):
+        """Return when mode number 'index' is selected and its next frame
+        is due, sleeping (letting the other tasks run) until then."""
+        while True:
+            if self.index != index:
+                await self.selected[index].wait()
+                continue
+            now = self.clock()
+            if now >= self.deadline:
+                break
+            await asyncio.sleep(self.deadline - now)
+        self.frames += 1
+        self.deadline += self.period
+        if self.period and self.deadline < now:
+            self.late += 1  # Overran a whole frame, pace afresh from here
+            self.deadline = now + self.period
+        if not self.period:
+            await asyncio.sleep(0)  # Uncapped, but let the others in
+
+    async def animate(self, index):
+        """Task running mode number 'index' whenever it's selected."""
+        while True:
+            await self.tick(index)
+            self.mode.run()
+            if self.switched is not None:
+                self.latency = self.clock() - self.switched
+                self.switched = None
+                print("%s after %d ms" % ("switched" if self.switches else "first frame", int(self.latency * 1000)))
+
+    async def buttons(self, button_manager):
+        """Task switching to the next mode on each button press."""
+        while True:
+            if button_manager.ButtonPressed():
+                self.next()
+            await asyncio.sleep(POLL)
+
+    async def listen(self, ble):
+        """Task keeping the BleEyes' radio advertising while disconnected,
+        and taking colors sent over its UART as the tint. 'ble' can also be
+        a function returning the BleEyes, or None while it's not built."""
+        lookup = ble if callable(ble) else lambda: ble
+        while True:
+            await asyncio.sleep(LISTEN)
+            ble = lookup()
+            if ble is None or getattr(self.mode, "reads_uart", False):
+                continue  # Not up yet, or the mode reads the UART itself
+            parser = ble.parser
+            if not ble.ble.connected:
+                if not ble.ble.advertising:
+                    ble.ble.start_advertising(ble.advertisement)
+                parser.reset()
+                continue
+            try:
+                parser.poll(ble.uart)
+            except ConnectionError:
+                parser.reset()
+                continue
+            if parser.color is not None:
+                self.tint = ble.color = parser.color  # BleEyes shows it too
+                parser.color = None
+                self.glasses.set_tint(self.tint)
+
+    async def main(self, button_manager=None, ble=None):
+        """Run every task, forever."""
+        tasks = [asyncio.create_task(self.animate(index)) for index in range(len(self.modes))]
+        if button_manager:
+            tasks.append(asyncio.create_task(self.buttons(button_manager)))
+        if ble:
+            tasks.append(asyncio.create_task(self.listen(ble)))
+        await asyncio.gather(*tasks)
@@ -0,0 +1,52 @@
+from time import monotonic, sleep
+
+class Scheduler:
+    """Runs one animation mode at a time, paced to a per-mode target frame
+    rate: each frame has a deadline, and time left over before it is slept
+    away rather than spent redrawing the same thing. The clock and sleep
+    functions can be swapped for fakes to test pacing off the board."""
+
+    def __init__(self, modes, clock=monotonic, sleeper=sleep, max_sleep=0.02):
+        """'modes' is a list of (mode, fps) pairs; each mode has a run()
+        method drawing one frame, fps None means as fast as possible.
+        Sleeps are capped at max_sleep seconds so the caller gets control
+        back often enough to poll the button."""
+        self.modes = modes
+        self.clock = clock
+        self.sleeper = sleeper
+        self.max_sleep = max_sleep
+        self.frames = self.late = 0  # Frames run, and how many overran
+        self.select(0)
+
+    @property
+    def mode(self):
+        return self.modes[self.index][0]
+
+    def select(self, index):
+        """Switch to mode number 'index', its first frame due right away."""
+        self.index = index % len(self.modes)
+        fps = self.modes[self.index][1]
+        self.period = 1 / fps if fps else 0
+        self.deadline = self.clock()
+
+    def next(self):
+        """Switch to the next mode in the list, wrapping around."""
+        self.select(self.index + 1)
+
+    def step(self):
+        """Run the current mode's next frame if it's due and return True,
+        else sleep toward its deadline (at most max_sleep) and return
+        False."""
+        now = self.clock()
+        if now < self.deadline:
+            self.sleeper(min(self.deadline - now, self.max_sleep))
+            return False
+        self.mode.run()
+        self.frames += 1
+        self.deadline += self.period
+        if self.period and self.deadline < now:
+            # Overran a whole frame. Start pacing afresh from here rather
+            # than rushing out frames to catch up.
+            self.late += 1
+            self.deadline = now + self.period
+        return True
@@ -0,0 +1,49 @@
+from FrameBuffer import FrameBuffer
+from FrameStream import StreamParser
+
+
+class StreamEyes:
+    """Shows frames a phone or computer streams over BLE UART (see
+    FrameStream; host/stream_encoder.py makes them), sharing BleEyes' radio
+    and UART service. Each run() takes whatever has arrived and shows the
+    newest frame, so run it often: the UART service only buffers 64 bytes."""
+
+    reads_uart = True  # Runtime's BLE listener leaves the UART alone
+
+    def __init__(self, g, ble, framebuffer=None):
+        """'ble' is the BleEyes whose connection to use."""
+        self.glasses = g
+        self.ble = ble
+        self.framebuffer = framebuffer or FrameBuffer(g)
+        self.parser = StreamParser(self.framebuffer)
+        print("stream eyes init done")
+
+    def enter(self):
+        """Switched to: redraw every pixel, no need to clear the glasses
+        first."""
+        self.invalidate()
+
+    def exit(self):
+        """Switched away from: forget any partly received frame."""
+        self.parser.reset()
+
+    def invalidate(self):
+        """Redraw from scratch, e.g. after the glasses were cleared."""
+        self.framebuffer.touch_all()
+        self.parser.fresh = True
+
+    def run(self):
+        ble, parser = self.ble, self.parser
+        if not ble.ble.connected:
+            if not ble.ble.advertising:
+                ble.ble.start_advertising(ble.advertisement)
+            parser.reset()  # Wait for a keyframe from the next connection
+        else:
+            try:
+                parser.poll(ble.uart)  # All that's arrived, never waits
+            except ConnectionError:
+                parser.reset()
+        if parser.fresh:
+            parser.fresh = False
+            self.framebuffer.commit()
+            self.glasses.show()
@@ -0,0 +1,53 @@
+from array import array
+from LedMap import LedMap
+
+
+class TintedGlasses:
+    """Wraps an LED_Glasses (or BufferedGlasses) so show() sends every
+    pixel tinted by one color, each channel scaled by the tint's: e.g. a
+    color picked over BLE coloring whatever mode is running. The modes'
+    pixel buffer is tinted only for the duration of show() and put back
+    after, so incremental drawing into it carries on unaffected. With no
+    tint (the default) show() passes straight through. Like
+    BufferedGlasses, everything else reads through to the wrapped glasses."""
+
+    def __init__(self, glasses):
+        self.glasses = glasses
+        ledmap = LedMap(glasses)
+        self.buffer = getattr(glasses, "_pixel_buffer", None)
+        self.saved = bytearray(len(self.buffer)) if self.buffer else None
+        # Registers of each channel, each once (the matrix and rings share
+        # some LEDs)
+        regs = ledmap.matrix + ledmap.left_ring + ledmap.right_ring
+        self.channels = []
+        for channel in range(3):
+            self.channels.append(array("H", sorted(set(regs[i] for i in range(channel, len(regs), 3)))))
+        self.tables = [bytearray(256) for _ in range(3)]
+        self.tint = None
+
+    def __getattr__(self, name):
+        return getattr(self.glasses, name)
+
+    def set_tint(self, color):
+        """Tint by packed color 'color' from now on; None or white for none."""
+        if color is None or color == 0xFFFFFF:
+            self.tint = None
+            return
+        self.tint = color
+        for channel, shift in enumerate((16, 8, 0)):
+            level, table = (color >> shift) & 0xFF, self.tables[channel]
+            for n in range(256):
+                table[n] = n * level // 255
+
+    def show(self):
+        buf = self.buffer
+        if self.tint is None or not buf:
+            self.glasses.show()
+            return
+        saved = self.saved
+        saved[:] = buf
+        for regs, table in zip(self.channels, self.tables):
+            for r in regs:
+                buf[r] = table[buf[r]]
+        self.glasses.show()
+        buf[:] = saved
@@ -1,4 +1,6 @@
 import time
+boot = time.monotonic()  # For boot-to-first-frame time
+import asyncio
 import board
 import busio
 import digitalio
@@ -6,43 +8,103 @@ import supervisor
 import adafruit_lis3dh
 import adafruit_is31fl3741
 from audiobusio import PDMIn
+from adafruit_bus_device.i2c_device import I2CDevice
 from adafruit_is31fl3741.adafruit_ledglasses import LED_Glasses
+from BufferedGlasses import BufferedGlasses
 from ButtonManager import ButtonManager
+from Color import set_gamma
+from Compositor import Compositor, Stack, MAX
+from Profiler import Profiler
+from ModeRegistry import ModeRegistry
+from Runtime import Runtime
+from TintedGlasses import TintedGlasses
 from BlinkyEyes import BlinkyEyes
 from PendulumEyes import PendulumEyes
 from AudioEyes import AudioEyes
 from BleEyes import BleEyes
+from StreamEyes import StreamEyes
 
 #i2c = board.I2C()
 i2c = busio.I2C(board.SCL, board.SDA, frequency=1000000)
 lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c)
+lis3dh_device = I2CDevice(i2c, 0x18)  # Same chip, for the FIFO registers
 mic = PDMIn(board.MICROPHONE_CLOCK, board.MICROPHONE_DATA, bit_depth=16)
-glasses = LED_Glasses(i2c, allocate=adafruit_is31fl3741.MUST_BUFFER)
+driver = LED_Glasses(i2c, allocate=adafruit_is31fl3741.MUST_BUFFER)
+driver.global_current = 20  # Just middlin' bright, please
+# show() sends only what changed, tinted by any color picked over BLE
+glasses = TintedGlasses(BufferedGlasses(driver))
 glasses.show()  # Clear any residue on startup
-glasses.global_current = 20  # Just middlin' bright, please
 
 bm = ButtonManager()
-ae = AudioEyes(glasses, mic)
-be = BlinkyEyes(glasses)
-pe = PendulumEyes(glasses, lis3dh)
-ble = BleEyes(glasses)
-
-index = 0
-animationList = [ble, ae, be, pe]
-
-while True:
-    try:
-        if (bm.ButtonClicked(True)):
-            index = index + 1
-            index = index % len(animationList)
-            glasses.fill(0x000000)
-            glasses.left_ring.fill(0x000000)
-            glasses.right_ring.fill(0x000000)
-            glasses.show()
-        animationList[index].run()
-    except OSError:
-        print("Restarting")
-        supervisor.reload()
+set_gamma(2.6)  # One color curve for every mode; set before they're built
+# Set to N to print per-stage timing stats for the current mode every N
+# frames on the serial console; 0 for none (and no profiling overhead)
+PROFILE_EVERY = 0
+# Heap bytes built modes may hold; past it, idle ones are dropped (and
+# built again when next switched to)
+MODE_BUDGET = 64 * 1024
+# Audio in integer math instead of ulab floats. Off: the integer FFT runs
+# in the interpreter, so it's slower than ulab's compiled one (about 35x on
+# the desktop). Only worth timing (PROFILE_EVERY) on a board whose core
+# has no FPU (e.g. SAMD21, RP2040); the nRF52840 here has one
+AUDIO_FIXED_POINT = False
+
+
+def profiled(mode, name):
+    if PROFILE_EVERY:
+        mode.profiler = Profiler(name, dump_every=PROFILE_EVERY)
+    return mode
+
+
+# Audio and pendulum modes draw into layers of one compositor, so they
+# can also run together: pendulums over the spectrum, brightest wins.
+compositor = Compositor(glasses)
+drop_layer = lambda mode: compositor.remove(mode.framebuffer)
+
+# Modes and their target frames/second, each built when first switched to.
+# BLE mode is mostly waiting, so it idles along; streamed frames are polled
+# often so the UART's small buffer doesn't overflow. Pendulum physics run
+# at their own fixed rate, whatever the frame rate.
+modes = ModeRegistry(MODE_BUDGET)
+modes.add("blinky", lambda: profiled(BlinkyEyes(glasses), "blinky"), 60)
+modes.add("ble", lambda: BleEyes(glasses), 10, pinned=True)  # Radio setup is once only
+modes.add("stream", lambda: StreamEyes(glasses, modes.get("ble")), 100)
+modes.add("audio", lambda: Stack(compositor, [modes.get("audio eyes")]), 60)
+modes.add("pendulum", lambda: Stack(compositor, [modes.get("pendulum eyes")]), 60)
+modes.add("both", lambda: Stack(compositor, [modes.get("audio eyes"), modes.get("pendulum eyes")]), 60)
+# Parts of the stacks above. 50% overlapping FFT windows; column tables are
+# cached on flash if boot.py makes CIRCUITPY writable, else they're just
+# computed when audio is first wanted.
+modes.add(
+    "audio eyes",
+    lambda: profiled(
+        AudioEyes(
+            compositor.held,
+            mic,
+            hop_size=128,
+            table_file="/audio_tables.bin",
+            framebuffer=compositor.layer(),
+            fixed_point=AUDIO_FIXED_POINT,
+        ),
+        "audio",
+    ),
+    release=drop_layer,
+)
+modes.add(
+    "pendulum eyes",
+    lambda: profiled(PendulumEyes(compositor.held, lis3dh, framebuffer=compositor.layer(MAX), device=lis3dh_device), "pendulum"),
+    release=drop_layer,
+)
+
+# Each mode runs as its own task, alongside the button and BLE listening
+# tasks; colors picked over BLE tint the other modes once BLE is up.
+runtime = Runtime(modes, glasses, boot=boot)
+
+try:
+    asyncio.run(runtime.main(bm, lambda: modes.built("ble")))
+except OSError:
+    print("Restarting")
+    supervisor.reload()
 
 
 
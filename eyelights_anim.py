@@ -19,30 +19,347 @@ Despite this contrast, the same conventions are maintained here to avoid
 conflicting explanations...what worked in those guides is what works here,
 only the resolutions are different."""
 
+import struct
+from array import array
+from time import monotonic
 import displayio
 import adafruit_imageload
+from Color import gamma_adjust
+from FrameBuffer import FrameBuffer
 
+# Delta-encoded animation file (.eya, made from a matrix.bmp/rings.bmp pair
+# by host/compile_anim.py). All numbers little-endian:
+#   header: magic, version (1), matrix width and height, 0, matrix frames
+#           and ring frames (either may be 0 for no track), keyframe
+#           interval, file offset of the ring track -- "<4sBBBBHHHI"
+#   then for each track present, matrix first:
+#     palette: color count (uint16), then R, G, B bytes per color
+#     keyframe table: file offset (uint32) of the record for every
+#                     interval'th frame, starting at frame 0
+#     one record per frame: DELTA_KEYFRAME and all pixels' palette
+#     indices (a keyframe), or a count of runs and for each: pixels
+#     skipped since the previous run, run length, and the new indices
+#     (a patch against the prior frame; a count of 0 is an unchanged frame)
+# Matrix pixels are row-major, ring LEDs left ring then right.
+DELTA_MAGIC = b"EYEA"
+DELTA_HEADER = "<4sBBBBHHHI"
+DELTA_KEYFRAME = 0xFF  # More runs than 90 pixels could ever need
 
-def gamma_adjust(palette):
-    """Given a color palette that was returned by adafruit_imageload, apply
-    gamma correction and place results back in original palette. This makes
-    LED brightness and colors more perceptually linear, to better match how
-    the source BMP might've appeared on screen."""
+# Playback orders for EyeLightsAnim.play()
+LOOP = 0  # 0, 1, ... last, 0, 1, ...
+PING_PONG = 1  # 0, 1, ... last, last-1, ... 1, 0, 1, ...
+ONCE = 2  # 0, 1, ... last, then stays on last
 
-    for index, entry in enumerate(palette):
-        palette[index] = sum(
-            [
-                int(((((entry >> shift) & 0xFF) / 255) ** 2.6) * 255 + 0.5) << shift
-                for shift in range(16, -1, -8)
-            ]
+# Approximate heap cost of one cached frame beyond its colors: the mask
+# int, the entry tuple and dict slot
+FRAME_OVERHEAD = 48
+
+
+class StreamPalette:
+    """Palette of a BmpStream: packed colors by index, none transparent
+    (BMP has no transparency). Indexable like a displayio.Palette, so
+    gamma_adjust() and the drawing code work on either."""
+
+    def __init__(self, colors):
+        self.colors = colors
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __iter__(self):
+        return iter(self.colors)
+
+    def __getitem__(self, index):
+        return self.colors[index]
+
+    def __setitem__(self, index, color):
+        self.colors[index] = color
+
+    def is_transparent(self, index):
+        return False
+
+
+class BmpStream:
+    """An uncompressed 1, 4 or 8 bit indexed BMP read from the file on
+    demand, rather than loaded whole, so animation length isn't limited by
+    RAM. Only the header and palette are held in memory. Pixels can be
+    read singly as bitmap[x, y] (slow, a seek per pixel) or a rectangle at
+    a time into a bytearray of palette indices with read_rect()."""
+
+    def __init__(self, filename):
+        self.file = open(filename, "rb")  # pylint: disable=consider-using-with
+        header = self.file.read(54)
+        if header[:2] != b"BM":
+            raise ValueError("Not a BMP file")
+        self.offset, dib_size = struct.unpack_from("<II", header, 10)
+        width, height, _, self.bpp, compression = struct.unpack_from("<iiHHI", header, 18)
+        colors = struct.unpack_from("<I", header, 46)[0] or 1 << self.bpp
+        if compression or self.bpp not in (1, 4, 8):
+            raise ValueError("BMP must be uncompressed 1, 4 or 8 bit indexed color")
+        self.width = width
+        self.height = abs(height)
+        self.top_down = height < 0  # Rows are normally stored bottom-up
+        self.stride = (width * self.bpp + 31) // 32 * 4  # Rows pad to 4 bytes
+        self.file.seek(14 + dib_size)
+        palette = self.file.read(colors * 4)  # B, G, R, unused
+        self.palette = StreamPalette(
+            array("L", [struct.unpack_from("<I", palette, n * 4)[0] & 0xFFFFFF for n in range(colors)])
+        )
+        self.row = bytearray(self.stride)  # Scratch for 1 and 4 bit rows
+        self.pixel = bytearray(1)
+
+    def __getitem__(self, xy):
+        self.read_rect(xy[0], xy[1], 1, 1, self.pixel)
+        return self.pixel[0]
+
+    def read_rect(self, x, y, width, height, out):
+        """Read palette indices of a width x height rectangle, upper-left
+        corner (x, y), into bytearray 'out' in row-major order."""
+        file, bpp = self.file, self.bpp
+        i = 0
+        for row in range(y, y + height):
+            if not self.top_down:
+                row = self.height - 1 - row
+            start = self.offset + row * self.stride
+            if bpp == 8:
+                file.seek(start + x)
+                file.readinto(memoryview(out)[i : i + width])
+                i += width
+                continue
+            first = x * bpp // 8
+            count = ((x + width) * bpp + 7) // 8 - first
+            file.seek(start + first)
+            file.readinto(memoryview(self.row)[:count])
+            for n in range(x, x + width):
+                bit = n * bpp - first * 8  # Index of pixel's first bit in row
+                out[i] = (self.row[bit >> 3] >> (8 - bpp - (bit & 7))) & ((1 << bpp) - 1)
+                i += 1
+
+    def close(self):
+        self.file.close()
+
+
+class ReadAhead:
+    """Double buffer of palette indices for one streamed image: while a
+    frame is drawn from one buffer, the next frame is read into the other,
+    so each frame costs one read and a frame is ready when it's drawn.
+    'read(frame, buffer)' fills a buffer for a frame."""
+
+    def __init__(self, read, size, frames):
+        self.read = read
+        self.frames = frames
+        self.now, self.ahead = bytearray(size), bytearray(size)
+        self.ahead_frame = None
+
+    def take(self, frame):
+        """Return the indices for 'frame', read ahead if it was predicted,
+        else read now."""
+        if frame == self.ahead_frame:
+            self.now, self.ahead = self.ahead, self.now
+        else:
+            self.read(frame, self.now)
+        self.ahead_frame = None
+        return self.now
+
+    def prefetch(self, frame):
+        frame %= self.frames
+        self.read(frame, self.ahead)
+        self.ahead_frame = frame
+
+
+class FrameCache:
+    """Decoded frames by key, holding at most 'budget' bytes (None for no
+    limit); the least recently used frames are evicted to make room."""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.frames = {}  # Key: [entry, size, last use]
+        self.size = self.clock = 0
+
+    def get(self, key):
+        item = self.frames.get(key)
+        if item is None:
+            return None
+        self.clock += 1
+        item[2] = self.clock
+        return item[0]
+
+    def fits(self, size):
+        """True if 'size' more bytes fit without evicting anything."""
+        return self.budget is None or self.size + size <= self.budget
+
+    def put(self, key, entry, size):
+        while self.frames and not self.fits(size):
+            oldest = min(self.frames, key=lambda k: self.frames[k][2])
+            self.size -= self.frames.pop(oldest)[1]
+        self.clock += 1
+        self.frames[key] = [entry, size, self.clock]
+        self.size += size
+
+
+class DeltaTrack:
+    """One track (matrix or rings) of a delta-encoded animation file (see
+    DELTA_MAGIC), played into a FrameBuffer. Holds the palette indices of
+    the frame now shown; moving to another frame applies the patches in
+    between, and only pixels whose index actually changed are written.
+    The track's 'pixels' pixels start at index 'base' of the buffer."""
+
+    def __init__(self, file, pixels, frames, interval, base):
+        self.file = file
+        self.pixels = pixels
+        self.frames = frames
+        self.interval = interval
+        self.base = base
+        count = struct.unpack("<H", file.read(2))[0]
+        rgb = file.read(count * 3)
+        self.palette = StreamPalette(
+            array("L", [rgb[n] << 16 | rgb[n + 1] << 8 | rgb[n + 2] for n in range(0, count * 3, 3)])
         )
+        gamma_adjust(self.palette)
+        keys = (frames + interval - 1) // interval
+        self.keys = array("L", struct.unpack("<%dI" % keys, file.read(keys * 4)))
+        self.indices = bytearray(pixels)
+        self.dirty = bytearray(pixels)  # 1 if pixel changed since written
+        self.changed = bytearray(pixels)  # Positions of dirty pixels...
+        self.count = 0  # ...and how many there are
+        self.run = bytearray(max(pixels, 2))  # Scratch for reads
+        self.frame = None  # Nothing decoded yet
+        self.pos = 0  # File offset of next frame's record
+        self.touch_all()  # First frame draws everything
+
+    def touch(self, i):
+        if not self.dirty[i]:
+            self.dirty[i] = 1
+            self.changed[self.count] = i
+            self.count += 1
+
+    def touch_all(self):
+        """Mark every pixel to be written, e.g. after the display was
+        cleared by someone else."""
+        for i in range(self.pixels):
+            self.touch(i)
+
+    def patch(self):
+        """Apply the record at self.pos to the indices, advance one frame."""
+        file, run, indices = self.file, self.run, self.indices
+        file.seek(self.pos)
+        file.readinto(memoryview(run)[:1])
+        if run[0] == DELTA_KEYFRAME:
+            file.readinto(memoryview(run)[: self.pixels])
+            for i in range(self.pixels):
+                if indices[i] != run[i]:
+                    indices[i] = run[i]
+                    self.touch(i)
+        else:
+            i = 0
+            for _ in range(run[0]):
+                file.readinto(memoryview(run)[:2])
+                i += run[0]  # Skip unchanged pixels
+                length = run[1]
+                file.readinto(memoryview(run)[:length])
+                for n in range(length):
+                    if indices[i] != run[n]:  # Runs may bridge unchanged pixels
+                        indices[i] = run[n]
+                        self.touch(i)
+                    i += 1
+        self.pos = file.tell()
+        self.frame += 1
+
+    def seek(self, frame):
+        """Bring the indices to 'frame' (wrapped to the track's length),
+        marking the pixels that change. Stepping forward within a keyframe
+        interval reads just the patches; going backward, or past a
+        keyframe, restarts from the nearest keyframe at or before it."""
+        frame %= self.frames
+        if frame == self.frame:
+            return
+        key = frame // self.interval
+        if self.frame is None or frame < self.frame or key * self.interval > self.frame:
+            self.pos = self.keys[key]
+            self.frame = key * self.interval - 1
+        while self.frame < frame:
+            self.patch()
+
+    def write(self, framebuffer):
+        """Store the colors of pixels changed since the last write into a
+        FrameBuffer."""
+        if not self.count:
+            return
+        pixels, base = framebuffer.pixels, self.base
+        colors, indices, dirty = self.palette.colors, self.indices, self.dirty
+        first, last = self.pixels, 0
+        for n in range(self.count):
+            i = self.changed[n]
+            dirty[i] = 0
+            pixels[base + i] = colors[indices[i]]
+            first, last = min(first, i), max(last, i)
+        framebuffer.touch(base + first, base + last + 1)
+        self.count = 0
+
+
+class Playback:
+    """Time-driven frame numbering for EyeLightsAnim.play(): which step of
+    the animation is due is worked out from a monotonic clock, so playback
+    speed doesn't depend on how long the rest of the loop takes. With 'skip'
+    (default), frames that came due while the loop was busy are skipped to
+    stay on schedule; without it every frame is shown and a late loop slows
+    the animation down instead. index() maps the step count to a frame of a
+    sequence in LOOP, PING_PONG or ONCE order."""
+
+    def __init__(self, fps, mode=LOOP, skip=True, clock=monotonic):
+        if mode not in (LOOP, PING_PONG, ONCE):
+            raise ValueError("mode must be LOOP, PING_PONG or ONCE")
+        self.fps = fps
+        self.mode = mode
+        self.skip = skip
+        self.clock = clock
+        self.start = clock()
+        self.step = 0
+        self.skipped = 0  # Frames passed over to catch up
+
+    def update(self):
+        """Advance to the step due now and return it."""
+        now = self.clock()
+        step = int((now - self.start) * self.fps)
+        if step > self.step + 1:
+            if self.skip:
+                self.skipped += step - self.step - 1
+            else:  # Show the next frame and restart the schedule from it
+                step = self.step + 1
+                self.start = now - step / self.fps
+        self.step = max(step, self.step)
+        return self.step
+
+    def index(self, frames):
+        """Frame number (0 to frames-1) of a 'frames' long sequence at the
+        current step."""
+        step = self.step
+        if self.mode == ONCE:
+            return min(step, frames - 1)
+        if self.mode == PING_PONG and frames > 1:
+            step %= 2 * frames - 2
+            return step if step < frames else 2 * frames - 2 - step
+        return step % frames
+
+    def done(self, frames):
+        """True once a ONCE playback has reached the last of 'frames'."""
+        return self.mode == ONCE and self.step >= frames - 1
 
 
 class EyeLightsAnim:
     """Class encapsulating BMP image-based frame animation for the matrix
     and rings of an LED_Glasses object."""
 
-    def __init__(self, glasses, matrix_filename, ring_filename, rings_on_top=True):
+    def __init__(
+        self,
+        glasses,
+        matrix_filename,
+        ring_filename,
+        rings_on_top=True,
+        preload=False,
+        cache_bytes=None,
+        stream=False,
+    ):
         """Constructor for EyeLightsAnim. Accepts an LED_Glasses object and
         filenames for two indexed-color BMP images: first is a "sprite
         sheet" for animating on the matrix portion of the glasses, second is
@@ -52,16 +369,60 @@ class EyeLightsAnim:
         of the two bitmaps is drawn later or "on top." Default of True
         places the rings over the matrix, False gives the matrix priority.
         It's possible to use transparent palette indices but that may be
-        more trouble than it's worth."""
+        more trouble than it's worth: a transparent pixel leaves its LED as
+        it was, and on a shared LED shows the other bitmap if that's opaque.
+
+        With preload=True, frames are decoded ahead of time into packed
+        colors plus a transparency bitmask, so drawing a frame is a bulk
+        copy into the glasses' pixel buffer (or a masked one if the frame
+        has transparent pixels) instead of a bitmap read, palette lookup and
+        pixel() call per LED. cache_bytes caps the memory used for decoded
+        frames: as many as fit are decoded up front, the rest on first use,
+        evicting the least recently drawn. None (default) decodes them all.
+        Each matrix frame takes about 410 bytes, each ring frame 240.
+
+        With stream=True, the BMPs (uncompressed 1, 4 or 8 bit) aren't
+        loaded into RAM at all: each frame's tile or ring column is read
+        from the file as it's needed, plus the next one read ahead, so
+        animations can run as long as flash allows. Combined with preload
+        (and a cache_bytes budget), recently drawn frames stay decoded.
+
+        A matrix_filename ending in ".eya" is a delta-encoded animation
+        compiled from a BMP pair by host/compile_anim.py, holding both
+        matrix and rings (ring_filename is then ignored). It's played
+        straight from the file, and each frame writes only the pixels that
+        changed since the last one; preload and stream don't apply. The
+        format has no transparency: the compiler refuses BMPs whose
+        palettes have transparent indices."""
 
         self.glasses = glasses
         self.matrix_bitmap = self.ring_bitmap = None
+        self.matrix_track = self.ring_track = None
         self.rings_on_top = rings_on_top
+        self.cache = None
+        # Everything's drawn here, then committed to the glasses at once;
+        # it also decides which of matrix and rings shows on shared LEDs
+        self.framebuffer = FrameBuffer(glasses, rings_on_top)
+        self.stream = stream
+        self.matrix_ahead = self.ring_ahead = None
+        self.playback = None
+        self.stale = True  # Something else drew, don't skip the next frame
+
+        if matrix_filename and matrix_filename.endswith(".eya"):
+            self.open_delta(matrix_filename)
+            self.hide_missing()
+            return
+
+        self.cache = FrameCache(cache_bytes) if preload else None
 
         if matrix_filename:
-            self.matrix_bitmap, self.matrix_palette = adafruit_imageload.load(
-                matrix_filename, bitmap=displayio.Bitmap, palette=displayio.Palette
-            )
+            if stream:
+                self.matrix_bitmap = BmpStream(matrix_filename)
+                self.matrix_palette = self.matrix_bitmap.palette
+            else:
+                self.matrix_bitmap, self.matrix_palette = adafruit_imageload.load(
+                    matrix_filename, bitmap=displayio.Bitmap, palette=displayio.Palette
+                )
             if (self.matrix_bitmap.width < glasses.width) or (
                 self.matrix_bitmap.height < glasses.height
             ):
@@ -73,15 +434,192 @@ class EyeLightsAnim:
             self.matrix_frame = self.matrix_frames - 1
 
         if ring_filename:
-            self.ring_bitmap, self.ring_palette = adafruit_imageload.load(
-                ring_filename, bitmap=displayio.Bitmap, palette=displayio.Palette
-            )
+            if stream:
+                self.ring_bitmap = BmpStream(ring_filename)
+                self.ring_palette = self.ring_bitmap.palette
+            else:
+                self.ring_bitmap, self.ring_palette = adafruit_imageload.load(
+                    ring_filename, bitmap=displayio.Bitmap, palette=displayio.Palette
+                )
             if self.ring_bitmap.height < 48:
                 raise ValueError("Ring bitmap must be at least 48 pixels tall")
             gamma_adjust(self.ring_palette)
             self.ring_frames = self.ring_bitmap.width
             self.ring_frame = self.ring_frames - 1
 
+        self.hide_missing()
+        if stream:
+            size = glasses.width * glasses.height
+            self.colors = array("L", [0] * size)  # Packed colors, reused
+            if self.matrix_bitmap:
+                self.matrix_ahead = ReadAhead(self.tile_indices, size, self.matrix_frames)
+            if self.ring_bitmap:
+                self.ring_ahead = ReadAhead(self.ring_indices, 48, self.ring_frames)
+
+        if self.cache:
+            # Rings first, they're small and every frame uses both
+            if self.ring_bitmap:
+                for frame in range(self.ring_frames):
+                    if not self.cache.fits(48 * 4 + FRAME_OVERHEAD):
+                        break
+                    self.ring_colors(frame)
+            if self.matrix_bitmap:
+                for frame in range(self.matrix_frames):
+                    if not self.cache.fits(glasses.width * glasses.height * 4 + FRAME_OVERHEAD):
+                        break
+                    self.matrix_colors(frame)
+
+    def open_delta(self, filename):
+        """Set up matrix and ring DeltaTracks from a .eya file."""
+        file = open(filename, "rb")  # pylint: disable=consider-using-with
+        header = file.read(struct.calcsize(DELTA_HEADER))
+        (magic, version, width, height, _, matrix_frames, ring_frames, interval, rings_at) = (
+            struct.unpack(DELTA_HEADER, header)
+        )
+        if magic != DELTA_MAGIC or version != 1:
+            raise ValueError("Not an EyeLights delta animation")
+        if (width, height) != (self.glasses.width, self.glasses.height):
+            raise ValueError("Animation is for a %dx%d matrix" % (width, height))
+        if matrix_frames:
+            self.matrix_track = DeltaTrack(file, width * height, matrix_frames, interval, 0)
+            self.matrix_frames, self.matrix_frame = matrix_frames, matrix_frames - 1
+        if ring_frames:
+            file.seek(rings_at)
+            base = self.framebuffer.left_ring  # Right ring follows
+            self.ring_track = DeltaTrack(file, 48, ring_frames, interval, base)
+            self.ring_frames, self.ring_frame = ring_frames, ring_frames - 1
+
+    def hide_missing(self):
+        """Make the frame buffer's matrix or rings transparent if there's
+        no bitmap or track for them, so LEDs they share show the other."""
+        framebuffer = self.framebuffer
+        if not (self.matrix_bitmap or self.matrix_track):
+            framebuffer.set_alpha(0, framebuffer.left_ring, 0)
+        if not (self.ring_bitmap or self.ring_track):
+            framebuffer.set_alpha(framebuffer.left_ring, framebuffer.size, 0)
+
+    def play(self, fps, mode=LOOP, skip=True, clock=monotonic):
+        """Switch frame() to time-driven playback at 'fps' frames per second
+        from frame 0, in LOOP, PING_PONG or ONCE order (matrix and rings
+        each over their own length). With skip=True, frames that came due
+        while the caller was busy are skipped to keep to time; skip=False
+        shows every frame, running late instead. 'clock' is any monotonic
+        seconds function, swappable for testing."""
+        self.playback = Playback(fps, mode, skip, clock)
+        self.stale = True
+
+    def stop(self):
+        """Back to frame() advancing one frame per call."""
+        self.playback = None
+
+    @property
+    def done(self):
+        """True once a ONCE playback has shown its last frame (of the longer
+        of matrix and rings)."""
+        playback = self.playback
+        if playback is None:
+            return False
+        return all(
+            playback.done(frames)
+            for frames in (
+                self.matrix_frames if self.matrix_bitmap or self.matrix_track else 0,
+                self.ring_frames if self.ring_bitmap or self.ring_track else 0,
+            )
+        )
+
+    def invalidate(self):
+        """Redraw the next frame in full even if playback hasn't moved on,
+        e.g. after the display was cleared (with a delta animation, every
+        pixel rather than only changed ones)."""
+        self.stale = True
+        self.framebuffer.touch_all()
+        for track in (self.matrix_track, self.ring_track):
+            if track:
+                track.touch_all()
+
+    def frame_delta(self, matrix_frame, ring_frame):
+        """frame() for a delta animation: move each track to its frame, then
+        write only changed pixels."""
+        matrix, rings = self.matrix_track, self.ring_track
+        if matrix:
+            self.matrix_frame = self.matrix_frame + 1 if matrix_frame is None else matrix_frame
+            self.matrix_frame %= self.matrix_frames
+            matrix.seek(self.matrix_frame)
+        if rings:
+            self.ring_frame = self.ring_frame + 1 if ring_frame is None else ring_frame
+            self.ring_frame %= self.ring_frames
+            rings.seek(self.ring_frame)
+        for track in (matrix, rings):
+            if track:
+                track.write(self.framebuffer)
+
+    def tile_indices(self, matrix_frame, out):
+        """Fill bytearray 'out' with the palette indices of a matrix frame's
+        pixels, in row-major order."""
+        width, height = self.glasses.width, self.glasses.height
+        xoffset = matrix_frame % self.tiles_across * width
+        yoffset = matrix_frame // self.tiles_across * height
+        if self.stream:
+            self.matrix_bitmap.read_rect(xoffset, yoffset, width, height, out)
+            return
+        i = 0
+        for y in range(yoffset, yoffset + height):
+            for x in range(xoffset, xoffset + width):
+                out[i] = self.matrix_bitmap[x, y]
+                i += 1
+
+    def ring_indices(self, ring_frame, out):
+        """Fill bytearray 'out' with the palette indices of a ring frame's 48
+        LEDs, left ring then right."""
+        if self.stream:
+            self.ring_bitmap.read_rect(ring_frame, 0, 1, 48, out)
+            return
+        for y in range(48):
+            out[y] = self.ring_bitmap[ring_frame, y]
+
+    def matrix_colors(self, matrix_frame):
+        """Return (colors, mask) for a matrix frame, decoding it into the
+        cache if it isn't there: packed colors of the frame's pixels in
+        row-major order, and an int with bit N set if pixel N is opaque, or
+        None if all are."""
+        key = ("m", matrix_frame)
+        entry = self.cache.get(key)
+        if entry is None:
+            indices = bytearray(self.glasses.width * self.glasses.height)
+            self.tile_indices(matrix_frame, indices)
+            colors = array("L", [0] * len(indices))
+            mask, opaque = 0, True
+            for i, idx in enumerate(indices):
+                if self.matrix_palette.is_transparent(idx):
+                    opaque = False
+                else:
+                    colors[i] = self.matrix_palette[idx]
+                    mask |= 1 << i
+            entry = (colors, None if opaque else mask)
+            self.cache.put(key, entry, len(colors) * 4 + FRAME_OVERHEAD)
+        return entry
+
+    def ring_colors(self, ring_frame):
+        """Return (colors, mask) for a ring frame, decoding it into the cache
+        if it isn't there: 48 packed colors, left ring then right, and an int
+        with bit N set if LED N is opaque, or None if all are."""
+        key = ("r", ring_frame)
+        entry = self.cache.get(key)
+        if entry is None:
+            indices = bytearray(48)
+            self.ring_indices(ring_frame, indices)
+            colors = array("L", [0] * 48)
+            mask, opaque = 0, True
+            for y, idx in enumerate(indices):
+                if self.ring_palette.is_transparent(idx):
+                    opaque = False
+                else:
+                    colors[y] = self.ring_palette[idx]
+                    mask |= 1 << y
+            entry = (colors, None if opaque else mask)
+            self.cache.put(key, entry, 48 * 4 + FRAME_OVERHEAD)
+        return entry
+
     def draw_matrix(self, matrix_frame=None):
         """Draw the matrix portion of EyeLights from one frame of the matrix
         bitmap "sprite sheet." Can either request a specific frame index
@@ -89,21 +627,42 @@ class EyeLightsAnim:
         frame, "wrapping around" to beginning if needed. For internal use by
         library; user code should call frame(), not this function."""
 
-        if matrix_frame:  # Go to specific frame
+        if matrix_frame is not None:  # Go to specific frame
             self.matrix_frame = matrix_frame
         else:  # Advance one frame forward
             self.matrix_frame += 1
         self.matrix_frame %= self.matrix_frames  # Wrap to valid range
 
+        if self.cache:
+            colors, mask = self.matrix_colors(self.matrix_frame)
+            self.framebuffer.write_matrix(colors, 0, 0, self.glasses.width, self.glasses.height, mask)
+            return
+
+        if self.stream:
+            indices = self.matrix_ahead.take(self.matrix_frame)
+            colors, palette = self.colors, self.matrix_palette
+            for i, idx in enumerate(indices):  # Streamed palettes are opaque
+                colors[i] = palette[idx]
+            self.framebuffer.write_matrix(colors, 0, 0, self.glasses.width, self.glasses.height)
+            self.matrix_ahead.prefetch(self.matrix_frame + 1)
+            return
+
         xoffset = self.matrix_frame % self.tiles_across * self.glasses.width
         yoffset = self.matrix_frame // self.tiles_across * self.glasses.height
 
+        pixels, alpha = self.framebuffer.pixels, self.framebuffer.alpha
+        i = 0
         for y in range(self.glasses.height):
             y1 = y + yoffset
             for x in range(self.glasses.width):
                 idx = self.matrix_bitmap[x + xoffset, y1]
-                if not self.matrix_palette.is_transparent(idx):
-                    self.glasses.pixel(x, y, self.matrix_palette[idx])
+                if self.matrix_palette.is_transparent(idx):
+                    alpha[i] = 0  # Shared LEDs show the rings, or keep their color
+                else:
+                    pixels[i] = self.matrix_palette[idx]
+                    alpha[i] = 255
+                i += 1
+        self.framebuffer.touch(0, i)
 
     def draw_rings(self, ring_frame=None):
         """Draw the rings portion of EyeLights from one frame of the rings
@@ -112,19 +671,43 @@ class EyeLightsAnim:
         'wrapping around' to beginning if needed. For internal use by
         library; user code should call frame(), not this function."""
 
-        if ring_frame:  # Go to specific frame
+        if ring_frame is not None:  # Go to specific frame
             self.ring_frame = ring_frame
         else:  # Advance one frame forward
             self.ring_frame += 1
         self.ring_frame %= self.ring_frames  # Wrap to valid range
 
-        for y in range(24):
+        if self.cache:
+            colors, mask = self.ring_colors(self.ring_frame)
+            framebuffer = self.framebuffer
+            if mask is None:
+                framebuffer.write_ring(framebuffer.left_ring, colors, 0)
+                framebuffer.write_ring(framebuffer.right_ring, colors, 24)
+            else:
+                framebuffer.write_ring(framebuffer.left_ring, colors, 0, mask & 0xFFFFFF)
+                framebuffer.write_ring(framebuffer.right_ring, colors, 24, mask >> 24)
+            return
+
+        if self.stream:
+            indices = self.ring_ahead.take(self.ring_frame)
+            colors, palette = self.colors, self.ring_palette
+            for y in range(48):  # Streamed palettes are opaque
+                colors[y] = palette[indices[y]]
+            self.framebuffer.write_ring(self.framebuffer.left_ring, colors, 0)
+            self.framebuffer.write_ring(self.framebuffer.right_ring, colors, 24)
+            self.ring_ahead.prefetch(self.ring_frame + 1)
+            return
+
+        framebuffer = self.framebuffer
+        pixels, alpha, base = framebuffer.pixels, framebuffer.alpha, framebuffer.left_ring
+        for y in range(48):  # Left ring, then right
             idx = self.ring_bitmap[self.ring_frame, y]
-            if not self.ring_palette.is_transparent(idx):
-                self.glasses.left_ring[y] = self.ring_palette[idx]
-            idx = self.ring_bitmap[self.ring_frame, y + 24]
-            if not self.ring_palette.is_transparent(idx):
-                self.glasses.right_ring[y] = self.ring_palette[idx]
+            if self.ring_palette.is_transparent(idx):
+                alpha[base + y] = 0
+            else:
+                pixels[base + y] = self.ring_palette[idx]
+                alpha[base + y] = 255
+        self.framebuffer.touch(base, base + 48)
 
     def frame(self, matrix_frame=None, ring_frame=None):
         """Draw one frame of animation to the matrix and/or rings portions
@@ -133,13 +716,34 @@ class EyeLightsAnim:
         to advance by one frame, 'wrapping around' to beginning if needed.
         Because some pixels are shared in common between matrix and rings,
         the "stacking order" -- which of the two appears "on top", is
-        specified as an argument to the constructor."""
+        specified as an argument to the constructor. Drawing goes into a
+        FrameBuffer committed to the glasses at the end; show() is still
+        up to the caller.
 
-        if self.matrix_bitmap and self.rings_on_top:
-            self.draw_matrix(matrix_frame)
+        After play(), calling with no frame numbers draws whichever frames
+        are due by the clock; if that's what is already shown, nothing is
+        drawn. Returns True if a frame was drawn."""
 
-        if self.ring_bitmap:
-            self.draw_rings(ring_frame)
+        if self.playback and matrix_frame is None and ring_frame is None:
+            self.playback.update()
+            if self.matrix_bitmap or self.matrix_track:
+                matrix_frame = self.playback.index(self.matrix_frames)
+            if self.ring_bitmap or self.ring_track:
+                ring_frame = self.playback.index(self.ring_frames)
+            if (
+                not self.stale
+                and matrix_frame == getattr(self, "matrix_frame", None)
+                and ring_frame == getattr(self, "ring_frame", None)
+            ):
+                return False
+        self.stale = False
 
-        if self.matrix_bitmap and not self.rings_on_top:
-            self.draw_matrix(matrix_frame)
+        if self.matrix_track or self.ring_track:
+            self.frame_delta(matrix_frame, ring_frame)
+        else:
+            if self.matrix_bitmap:
+                self.draw_matrix(matrix_frame)
+            if self.ring_bitmap:
+                self.draw_rings(ring_frame)
+        self.framebuffer.commit()
+        return True
@@ -0,0 +1,3 @@
+"""Host-side (desktop CPython) helpers for the LED glasses modes. Nothing in
+here is copied to the CIRCUITPY drive; run scripts from the repository root,
+e.g. python -m host.bench_raster"""
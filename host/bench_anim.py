@@ -0,0 +1,167 @@
+"""Check EyeLightsAnim's drawing modes against the original per-pixel
+one, which drew straight to the glasses with pixel() (kept here as
+Reference): each variant draws the repository's matrix.bmp/rings.bmp
+into its own FakeGlasses, frame by frame, and the register images must
+match. "delta" plays the pair compiled to a .eya file by
+host/compile_anim.py, and is also checked jumping to random frames and
+with the matrix on top. The per-pixel and preload drawing are also checked
+with a transparent palette index (the LED shared by the matrix and a ring
+then shows whichever was last drawn opaque there). Then reports
+microseconds per frame for each.
+
+    python -m host.bench_anim [frames]"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import displayio
+import adafruit_imageload
+from Color import gamma_adjust
+from eyelights_anim import EyeLightsAnim
+from host.compile_anim import compile_anim
+from host.fake_glasses import FakeGlasses
+
+DELTA_FILE = os.path.join(tempfile.gettempdir(), "bench_anim.eya")
+
+VARIANTS = (
+    ("per-pixel", {}),
+    ("preload", {"preload": True}),
+    ("preload 3K", {"preload": True, "cache_bytes": 3000}),
+    ("stream", {"stream": True}),
+    ("stream + 3K", {"stream": True, "preload": True, "cache_bytes": 3000}),
+    ("delta", {"delta": True}),
+)
+
+
+class Reference:
+    """The original per-pixel drawing, kept here as the reference."""
+
+    def __init__(self, rings_on_top=True):
+        self.glasses = FakeGlasses()
+        self.rings_on_top = rings_on_top
+        self.matrix, self.matrix_palette = adafruit_imageload.load(
+            "matrix.bmp", bitmap=displayio.Bitmap, palette=displayio.Palette
+        )
+        self.rings, self.ring_palette = adafruit_imageload.load(
+            "rings.bmp", bitmap=displayio.Bitmap, palette=displayio.Palette
+        )
+        gamma_adjust(self.matrix_palette)
+        gamma_adjust(self.ring_palette)
+        self.across = self.matrix.width // 18
+        self.matrix_frames = self.across * (self.matrix.height // 5)
+        self.matrix_frame = self.matrix_frames - 1
+        self.ring_frames = self.rings.width
+        self.ring_frame = self.ring_frames - 1
+
+    def draw_matrix(self, frame):
+        self.matrix_frame = (self.matrix_frame + 1 if frame is None else frame) % self.matrix_frames
+        xoffset = self.matrix_frame % self.across * 18
+        yoffset = self.matrix_frame // self.across * 5
+        for y in range(5):
+            for x in range(18):
+                idx = self.matrix[x + xoffset, y + yoffset]
+                if not self.matrix_palette.is_transparent(idx):
+                    self.glasses.pixel(x, y, self.matrix_palette[idx])
+
+    def draw_rings(self, frame):
+        self.ring_frame = (self.ring_frame + 1 if frame is None else frame) % self.ring_frames
+        for y in range(24):
+            idx = self.rings[self.ring_frame, y]
+            if not self.ring_palette.is_transparent(idx):
+                self.glasses.left_ring[y] = self.ring_palette[idx]
+            idx = self.rings[self.ring_frame, y + 24]
+            if not self.ring_palette.is_transparent(idx):
+                self.glasses.right_ring[y] = self.ring_palette[idx]
+
+    def frame(self, matrix_frame=None, ring_frame=None):
+        if self.rings_on_top:
+            self.draw_matrix(matrix_frame)
+        self.draw_rings(ring_frame)
+        if not self.rings_on_top:
+            self.draw_matrix(matrix_frame)
+
+
+def make(options):
+    options = dict(options)
+    if options.pop("delta", False):
+        return EyeLightsAnim(FakeGlasses(), DELTA_FILE, None, **options)
+    return EyeLightsAnim(FakeGlasses(), "matrix.bmp", "rings.bmp", **options)
+
+
+def check_jumps(frames, rings_on_top):
+    """Draw the same random frame numbers per-pixel and from the .eya file,
+    return how many frames differ."""
+    reference = Reference(rings_on_top)
+    delta = make({"delta": True, "rings_on_top": rings_on_top})
+    mismatched = 0
+    for _ in range(frames):
+        matrix, ring = random.randrange(1, 1000), random.randrange(1, 1000)
+        reference.frame(matrix, ring)
+        delta.frame(matrix, ring)
+        if delta.glasses._pixel_buffer != reference.glasses._pixel_buffer:
+            mismatched += 1
+    return mismatched
+
+
+def check_transparent(frames, rings_on_top, palette):
+    """Draw with index 0 of the "matrix" or "ring" palette transparent,
+    per-pixel and preloaded (cache_bytes=1, so frames are decoded after
+    the palette changes), return how many frames differ."""
+    reference = Reference(rings_on_top)
+    anims = [
+        make({"rings_on_top": rings_on_top}),
+        make({"rings_on_top": rings_on_top, "preload": True, "cache_bytes": 1}),
+    ]
+    for target in [reference] + anims:
+        getattr(target, palette + "_palette").make_transparent(0)
+    mismatched = 0
+    for _ in range(frames):
+        reference.frame()
+        for anim in anims:
+            anim.frame()
+            if anim.glasses._pixel_buffer != reference.glasses._pixel_buffer:
+                mismatched += 1
+    return mismatched
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    random.seed(1)
+    data = compile_anim("matrix.bmp", "rings.bmp")
+    with open(DELTA_FILE, "wb") as file:
+        file.write(data)
+    sizes = os.path.getsize("matrix.bmp") + os.path.getsize("rings.bmp")
+    print("delta file: %d bytes (BMPs: %d)" % (len(data), sizes))
+    reference = Reference()
+    variants = [(name, make(options)) for name, options in VARIANTS]
+    mismatched = 0
+    for _ in range(frames):
+        reference.frame()
+        expected = reference.glasses._pixel_buffer
+        for _, anim in variants:
+            anim.frame()
+            if anim.glasses._pixel_buffer != expected:
+                mismatched += 1
+    print("equivalence: %d/%d frames differ" % (mismatched, frames * len(variants)))
+    jumped = check_jumps(frames, True) + check_jumps(frames, False)
+    print("delta random frames: %d/%d differ" % (jumped, frames * 2))
+    mismatched += jumped
+    for palette in ("matrix", "ring"):
+        for rings_on_top in (True, False):
+            clear = check_transparent(frames, rings_on_top, palette)
+            print("transparent %s index, %s on top: %d/%d frames differ"
+                  % (palette, "rings" if rings_on_top else "matrix", clear, frames * 2))
+            mismatched += clear
+
+    for name, anim in [("reference", Reference())] + [(name, make(options)) for name, options in VARIANTS]:
+        start = time.perf_counter()
+        for _ in range(frames):
+            anim.frame()
+        print("%s: %.0f us/frame" % (name, (time.perf_counter() - start) / frames * 1e6))
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
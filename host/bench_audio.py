@@ -0,0 +1,123 @@
+"""Compare AudioEyes' weight-matrix column math and matrix render against
+the original per-column, per-bin loop with pixel() calls: both draw into
+their own FakeGlasses from the same random audio, frame by frame, and the
+register images must match. Then reports frames/second for each.
+
+    python -m host.bench_audio [frames]"""
+
+import sys
+import time
+from math import log
+import numpy as np
+from AudioEyes import AudioEyes, PEAK_COLOR, colorwheel, spectrogram
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+
+def random_audio(seed, count=256, clips=64):
+    """Noise plus a few tones, changing every 'count' samples, generated up
+    front so timing measures AudioEyes only."""
+    rng = np.random.default_rng(seed)
+    n = np.arange(count)
+    samples = []
+    for _ in range(clips):
+        value = 32768 + rng.normal(0, 300, count)
+        for _ in range(3):
+            value += rng.uniform(500, 8000) * np.sin(n * rng.uniform(0.02, 0.3) * 2 * np.pi)
+        samples += np.clip(value, 0, 65535).astype(int).tolist()
+    return samples
+
+
+def column_table(eyes):
+    """The original list-of-lists column table, kept here as the reference."""
+    width = eyes.glasses.width
+    spectrum_bits = log(eyes.spectrum_size, 2)
+    low_frac = log(eyes.low_bin, 2) / spectrum_bits
+    frac_range = log(eyes.high_bin, 2) / spectrum_bits - low_frac
+    table = []
+    for column in range(width):
+        lower = low_frac + frac_range * (column / width * 0.95)
+        upper = low_frac + frac_range * ((column + 1) / width)
+        mid = (lower + upper) * 0.5
+        half_width = (upper - lower) * 0.5
+        first_bin = int(2 ** (spectrum_bits * lower) + 1e-4)
+        last_bin = int(2 ** (spectrum_bits * upper) + 1e-4)
+        bin_weights = []
+        for bin_index in range(first_bin, last_bin + 1):
+            bin_center = log(bin_index + 0.5, 2) / spectrum_bits
+            dist = abs(bin_center - mid) / half_width
+            if dist < 1.0:
+                dist = 1.0 - dist
+                bin_weights.append(((3.0 - (dist * 2.0)) * dist) * dist)
+        total = sum(bin_weights)
+        bin_weights = [
+            (weight / total) * (0.8 + idx / width * 1.4) for idx, weight in enumerate(bin_weights)
+        ]
+        table.append(
+            [first_bin - eyes.low_bin, bin_weights, colorwheel(225 * column / width), eyes.glasses.height, 0.0]
+        )
+    return table
+
+
+class Reference:
+    """The original AudioEyes.run(), less the spectrum code it shares."""
+
+    def __init__(self, glasses, mic):
+        self.eyes = AudioEyes(glasses, mic)
+        self.table = column_table(self.eyes)
+
+    def run(self):
+        eyes, glasses = self.eyes, self.eyes.glasses
+        eyes.mic.record(eyes.rec_buf, eyes.fft_size)
+        spectrum = spectrogram(np.array(eyes.rec_buf))[eyes.low_bin : eyes.high_bin + 1]
+        spectrum = np.log(spectrum + 1e-7)
+        lower = max(np.min(spectrum), 4)
+        upper = min(max(np.max(spectrum), lower + 6), 20)
+        if upper > eyes.dynamic_level:
+            eyes.dynamic_level = upper * 0.7 + eyes.dynamic_level * 0.3
+        else:
+            eyes.dynamic_level = eyes.dynamic_level * 0.5 + lower * 0.5
+        data = (spectrum - lower) * (7 / (eyes.dynamic_level - lower))
+        for column, element in enumerate(self.table):
+            first_bin = element[0]
+            column_top = glasses.height + 1
+            for bin_offset, weight in enumerate(element[1]):
+                column_top -= data[first_bin + bin_offset] * weight
+            if column_top < element[3]:
+                element[3] = column_top - 0.5
+                element[4] = 0
+            else:
+                element[3] += element[4]
+                element[4] += 0.2
+            column_top = int(column_top)
+            for row in range(column_top):
+                glasses.pixel(column, row, 0)
+            for row in range(column_top, 5):
+                glasses.pixel(column, row, element[2])
+            glasses.pixel(column, int(element[3]), PEAK_COLOR)
+        glasses.show()
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    reference = Reference(FakeGlasses(), FakePDMIn(random_audio(1)))
+    matrix = AudioEyes(FakeGlasses(), FakePDMIn(random_audio(1)))
+
+    mismatched = 0
+    for _ in range(frames):
+        reference.run()
+        matrix.run()
+        if reference.eyes.glasses._pixel_buffer != matrix.glasses._pixel_buffer:
+            mismatched += 1
+    print("equivalence: %d/%d frames differ" % (mismatched, frames))
+
+    for name, eyes in (("loops", reference), ("matrix", matrix)):
+        start = time.perf_counter()
+        for _ in range(frames):
+            eyes.run()
+        print("%s: %.0f frames/sec" % (name, frames / (time.perf_counter() - start)))
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
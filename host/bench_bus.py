@@ -0,0 +1,50 @@
+"""Compare I2C traffic per frame with and without BufferedGlasses, for the
+modes that run on a desktop, using FakeGlasses' byte-counting MockI2C. Also
+checks that with BufferedGlasses the chip's registers always end up
+matching the pixel buffer.
+
+    python -m host.bench_bus [frames]"""
+
+import sys
+from AudioEyes import AudioEyes
+from BlinkyEyes import BlinkyEyes
+from BufferedGlasses import BufferedGlasses
+from host.bench_audio import random_audio
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+MODES = (
+    ("blinky", lambda g: BlinkyEyes(g)),
+    ("audio", lambda g: AudioEyes(g, FakePDMIn(random_audio(1)))),
+    ("audio (silence)", lambda g: AudioEyes(g, FakePDMIn([32768]))),
+)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    failed = 0
+    for name, make in MODES:
+        results = []
+        for buffered in (False, True):
+            fake = FakeGlasses()
+            glasses = BufferedGlasses(fake) if buffered else fake
+            mode = make(glasses)
+            bus = fake.i2c_device
+            bus.bytes = bus.transactions = 0
+            for _ in range(frames):
+                mode.run()
+                if buffered and bus.pwm != fake._pixel_buffer[1:]:
+                    failed += 1
+            results.append((bus.bytes / frames, bus.transactions / frames))
+        (raw, raw_trans), (buf, buf_trans) = results
+        print(
+            "%s: %.0f -> %.0f bytes/frame (%.1f -> %.1f transactions), %.0f%% saved"
+            % (name, raw, buf, raw_trans, buf_trans, 100 - buf * 100 / raw)
+        )
+    if failed:
+        print("%d frames left the chip out of step with the buffer" % failed)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
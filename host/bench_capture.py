@@ -0,0 +1,38 @@
+"""Measure AudioEyes throughput and latency for a few hop sizes, driven by
+a FakePDMIn (a WAV file if given, else generated audio). On the board,
+PDMIn.record() blocks for as long as the audio it records, so each frame
+costs hop_size / sample_rate seconds of recording plus its compute time;
+this adds the two together.
+
+    python -m host.bench_capture [frames] [file.wav]"""
+
+import sys
+import time
+from AudioEyes import AudioEyes
+from host.bench_audio import random_audio
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for hop in (256, 128, 64):
+        mic = FakePDMIn.from_wav(sys.argv[2]) if len(sys.argv) > 2 else FakePDMIn(random_audio(1))
+        eyes = AudioEyes(FakeGlasses(), mic, hop_size=hop)
+        start = time.perf_counter()
+        for _ in range(frames):
+            eyes.run()
+        compute = (time.perf_counter() - start) / frames
+        record = mic.recorded_seconds / frames
+        # A sample is on screen at most one hop's recording plus one
+        # frame's compute after it arrives
+        window = eyes.fft_size / mic.sample_rate
+        print(
+            "hop %d: %.1f frames/sec, latency %.1f ms (window spans %.1f ms)"
+            % (hop, 1 / (record + compute), (record + compute) * 1000, window * 1000)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Compare AudioEyes' fixed-point (integer) path against its float path:
+both draw from the same random audio, frame by frame, for each FFT size
+and a few window functions, and every column's bar height (lit pixels)
+and falling dot are compared. Reports how far off the integer path is and
+frames/sec for each. On the desktop the float path's FFT is NumPy's C code
+and the integer one is Python, so only a board without an FPU shows which
+is faster; this checks the integer path draws the same picture.
+
+    python -m host.bench_fixed [frames]"""
+
+import sys
+import time
+from AudioEyes import AudioEyes, FFT_SIZES
+from host.bench_audio import random_audio
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+WINDOW_NAMES = ("rectangular", "hann", "blackman")
+AUDIO = random_audio(1)
+# Limits: mean bar height error (rows), share of bars off by more than one
+# row, share of falling dots in a different row (dots amplify the smallest
+# difference: a dot that rises in one path and falls in the other follows
+# a different path down for several frames)
+MEAN_ERROR = 0.1
+BAR_MISSES = 0.01
+DOT_MISSES = 0.1
+
+
+def make(fft_size, window, fixed_point):
+    eyes = AudioEyes(FakeGlasses(), FakePDMIn(AUDIO), fixed_point=fixed_point)
+    eyes.configure(fft_size, window, hop_size=fft_size // 2)
+    return eyes
+
+
+def picture(eyes):
+    """Bar height and dot row (or None) of each column, from its pixels."""
+    width, height = eyes.glasses.width, eyes.glasses.height
+    pixels, dot = eyes.framebuffer.pixels, eyes.palette[width + 1]
+    bars, dots = [], []
+    for column in range(width):
+        lit = [pixels[row * width + column] for row in range(height)]
+        dots.append(lit.index(dot) if dot in lit else None)
+        bars.append(sum(1 for color in lit if color and color != dot))
+    return bars, dots
+
+
+def compare(fft_size, window, frames):
+    float_eyes, fixed_eyes = make(fft_size, window, False), make(fft_size, window, True)
+    error = misses = dot_misses = columns = 0
+    for _ in range(frames):
+        float_eyes.run()
+        fixed_eyes.run()
+        (float_bars, float_dots), (fixed_bars, fixed_dots) = picture(float_eyes), picture(fixed_eyes)
+        for a, b in zip(float_bars, fixed_bars):
+            error += abs(a - b)
+            misses += abs(a - b) > 1
+        dot_misses += sum(a != b for a, b in zip(float_dots, fixed_dots))
+        columns += len(float_bars)
+
+    times = []
+    for eyes in (float_eyes, fixed_eyes):
+        start = time.perf_counter()
+        for _ in range(frames):
+            eyes.run()
+        times.append(frames / (time.perf_counter() - start))
+    return error / columns, misses / columns, dot_misses / columns, times
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    failed = 0
+    for fft_size in FFT_SIZES:
+        for window in WINDOW_NAMES:
+            mean, misses, dot_misses, (float_fps, fixed_fps) = compare(fft_size, window, frames)
+            ok = mean <= MEAN_ERROR and misses <= BAR_MISSES and dot_misses <= DOT_MISSES
+            failed += not ok
+            print(
+                "%4d %-11s bars off by %.3f rows (%.1f%% by >1), dots %.1f%% off; "
+                "float %.0f frames/sec, fixed %.0f: %s"
+                % (fft_size, window, mean, misses * 100, dot_misses * 100, float_fps, fixed_fps,
+                   "ok" if ok else "FAILED")
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
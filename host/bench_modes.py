@@ -0,0 +1,153 @@
+"""Run each animation mode in the desktop simulator (FakeGlasses behind a
+BufferedGlasses, FakePDMIn, FifoLIS3DH, simulated 60 fps time) for N frames
+and report frames/second, heap use and I2C bytes sent per frame. Results
+can be saved as a baseline and later runs compared against it, failing on
+a regression beyond the tolerance.
+
+    python -m host.bench_modes [-n frames] [--save FILE] [--compare FILE]
+                               [--tolerance 0.2] [--repeat 3] [mode ...]"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from AudioEyes import AudioEyes
+from BlinkyEyes import BlinkyEyes
+from BufferedGlasses import BufferedGlasses
+from PendulumEyes import PendulumEyes
+from eyelights_anim import EyeLightsAnim
+from host.bench_audio import random_audio
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+from host.fake_lis3dh import FifoLIS3DH
+from host.fake_pdmin import FakePDMIn
+
+FPS = 60  # Simulated frame rate, for modes that animate by the clock
+RETAINED_SLACK = 256  # Bytes of heap growth not counted as a regression
+
+
+class AnimMode:
+    """EyeLightsAnim has frame() rather than run(), and leaves show() to
+    the caller."""
+
+    def __init__(self, glasses, **options):
+        self.glasses = glasses
+        self.anim = EyeLightsAnim(glasses, "matrix.bmp", "rings.bmp", **options)
+
+    def run(self):
+        self.anim.frame()
+        self.glasses.show()
+
+
+def blinky(glasses, clock):
+    mode = BlinkyEyes(glasses)
+    mode.clock = clock
+    return mode
+
+
+def pendulum(glasses, clock):
+    lis3dh = FifoLIS3DH(clock=clock)
+    return PendulumEyes(glasses, lis3dh, clock=clock, device=lis3dh)
+
+
+MODES = {
+    "blinky": blinky,
+    "audio": lambda glasses, clock: AudioEyes(glasses, FakePDMIn(random_audio(1)), hop_size=128),
+    "pendulum": pendulum,
+    "anim": lambda glasses, clock: AnimMode(glasses),
+    "anim-preload": lambda glasses, clock: AnimMode(glasses, preload=True),
+    "anim-stream": lambda glasses, clock: AnimMode(glasses, stream=True),
+}
+
+
+def run_mode(make, frames, traced):
+    """Run one mode for 'frames' frames on fresh fakes; returns seconds,
+    bytes sent, and (if traced) heap retained and peak above the start."""
+    random.seed(1)  # Same eye moves, pendulum friction etc. every run
+    fake, clock = FakeGlasses(), FakeClock()
+    glasses = BufferedGlasses(fake)
+    mode = make(glasses, clock)
+    mode.run()  # First frame sends everything and allocates lazily
+    clock.now += 1 / FPS
+    fake.i2c_device.bytes = 0
+    if traced:
+        tracemalloc.start()
+        start_mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for _ in range(frames):
+        mode.run()
+        clock.now += 1 / FPS
+    seconds = time.perf_counter() - start
+    retained = peak = 0
+    if traced:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        retained, peak = current - start_mem, peak - start_mem
+    return seconds, fake.i2c_device.bytes, retained, peak
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of 'results' against 'baseline'."""
+    problems = []
+    for name, now in results.items():
+        then = baseline.get(name)
+        if not then:
+            continue
+        if now["fps"] < then["fps"] * (1 - tolerance):
+            problems.append("%s: fps %.0f, was %.0f" % (name, now["fps"], then["fps"]))
+        if now["bytes_per_frame"] > then["bytes_per_frame"] * (1 + tolerance) + 1:
+            problems.append(
+                "%s: %.0f bytes/frame, was %.0f" % (name, now["bytes_per_frame"], then["bytes_per_frame"])
+            )
+        if now["retained"] > then["retained"] + RETAINED_SLACK:
+            problems.append("%s: retained %d bytes, was %d" % (name, now["retained"], then["retained"]))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--frames", type=int, default=1000)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs, best counts")
+    parser.add_argument("modes", nargs="*", help="any of: " + ", ".join(MODES))
+    args = parser.parse_args()
+    for name in args.modes:
+        if name not in MODES:
+            parser.error("unknown mode %r" % name)
+
+    results = {}
+    for name in args.modes or MODES:
+        runs = [run_mode(MODES[name], args.frames, False) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        sent = runs[0][1]
+        _, _, retained, peak = run_mode(MODES[name], args.frames, True)
+        results[name] = {
+            "fps": args.frames / seconds,
+            "bytes_per_frame": sent / args.frames,
+            "retained": retained,
+            "peak": peak,
+        }
+        print(
+            "%-12s %8.0f fps  %6.1f bytes/frame  heap: %6d retained, %7d peak"
+            % (name, args.frames / seconds, sent / args.frames, retained, peak)
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as file:
+            problems = compare(results, json.load(file), args.tolerance)
+        for problem in problems:
+            print("REGRESSION " + problem)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
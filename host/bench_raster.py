@@ -0,0 +1,95 @@
+"""Compare the span-based BlinkyEyes.rasterize against the original
+brute-force "two nails and a string" rasterizer: first checks that both
+produce the same 3X bitmap over a few thousand random ellipses, then reports
+pixels/second (of bounding rect processed) for each.
+
+    python -m host.bench_raster [iterations]"""
+
+import random
+import sys
+import time
+from BlinkyEyes import BlinkyEyes
+
+
+def rasterize_brute(radius, data, point1, point2, rect):
+    """The original per-pixel rasterizer, kept here as the reference."""
+    dx = point2[0] - point1[0]
+    dy = point2[1] - point1[1]
+    d2 = dx * dx + dy * dy
+    if d2 <= 0:
+        perimeter = 2 * radius
+        d = 0
+    else:
+        d = d2 ** 0.5
+        c = d * 0.5
+        b2 = ((c ** 2) + (((c ** 4) + 4 * (radius ** 4)) ** 0.5)) * 0.5
+        perimeter = d + 2 * (b2 ** 0.5)
+    for y in range(rect[1], rect[3]):
+        y5 = y + 0.5
+        dy1 = y5 - point1[1]
+        dy2 = y5 - point2[1]
+        dy1 *= dy1
+        dy2 *= dy2
+        for x in range(rect[0], rect[2]):
+            x5 = x + 0.5
+            dx1 = x5 - point1[0]
+            dx2 = x5 - point2[0]
+            d1 = (dx1 * dx1 + dy1) ** 0.5
+            d2 = (dx2 * dx2 + dy2) ** 0.5
+            if (d1 + d2 + d) <= perimeter:
+                data[y] |= 1 << x
+
+
+def random_case(rng, radius):
+    """Foci and bounds the way BlinkyEyes.run() produces them."""
+    cx, cy = 9 + rng.uniform(-9.5, 9.5), 7.5 + rng.uniform(-8, 8)
+    if rng.random() < 0.3:
+        p1 = p2 = (cx, cy)
+    else:
+        p1 = (cx, cy)
+        p2 = (cx + rng.uniform(-6, 6), cy + rng.uniform(-5, 5))
+    rect = (
+        max(int(min(p1[0], p2[0]) - radius), 0),
+        max(int(min(p1[1], p2[1]) - radius), 0),
+        min(int(max(p1[0], p2[0]) + radius + 1), 18),
+        min(int(max(p1[1], p2[1]) + radius + 1), 15),
+    )
+    return p1, p2, rect
+
+
+def new_bitmap():
+    return [0] * (5 * 3)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    eyes = BlinkyEyes.__new__(BlinkyEyes)  # Rasterizer needs only 'radius'
+    eyes.radius = 3.4
+    rng = random.Random(1234)
+    cases = [random_case(rng, eyes.radius) for _ in range(iterations)]
+
+    mismatched = 0
+    for p1, p2, rect in cases:
+        expected, actual = new_bitmap(), new_bitmap()
+        rasterize_brute(eyes.radius, expected, p1, p2, rect)
+        eyes.rasterize(actual, p1[0], p1[1], p2[0], p2[1], *rect)
+        if expected != actual:
+            mismatched += 1
+    print("equivalence: %d/%d cases differ" % (mismatched, len(cases)))
+
+    pixels = sum(max(r[2] - r[0], 0) * max(r[3] - r[1], 0) for _, _, r in cases)
+    bitmap = new_bitmap()
+    for name, func in (
+        ("brute", lambda *a: rasterize_brute(eyes.radius, *a)),
+        ("spans", lambda d, p1, p2, r: eyes.rasterize(d, p1[0], p1[1], p2[0], p2[1], *r)),
+    ):
+        start = time.perf_counter()
+        for p1, p2, rect in cases:
+            func(bitmap, p1, p2, rect)
+        elapsed = time.perf_counter() - start
+        print("%s: %.0f pixels/sec" % (name, pixels / elapsed))
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
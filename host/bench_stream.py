@@ -0,0 +1,94 @@
+"""Loopback test of frame streaming: frames from the animation modes,
+running in the simulator, are encoded by host/stream_encoder.py with each
+encoding, delivered through a fake UART in 20-byte BLE notifications to
+StreamEyes' parser, and must decode to the same (gamma-corrected) pixels.
+Reports bytes per frame and the frames/second a BLE UART link of the
+given throughput carries, and decode time per frame. Also checks that a
+lost delta frame is ignored and the picture recovers at the next keyframe.
+
+    python -m host.bench_stream [frames] [bytes/sec]"""
+
+import random
+import sys
+import time
+from Color import gammify
+from FrameBuffer import Surface
+from FrameStream import DELTA, RAW, StreamParser
+from host.bench_modes import MODES
+from host.check_ble_parser import FakeUART
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+from host.stream_encoder import ENCODINGS, Encoder
+
+SOURCES = ("blinky", "audio", "pendulum", "anim")
+NOTIFICATION = 20  # Bytes per BLE UART notification
+BANDWIDTH = 2000  # Bytes/second, a conservative BLE UART figure
+
+
+def record(name, frames):
+    """Pixels of 'frames' frames of a mode at 60 fps."""
+    random.seed(1)
+    clock = FakeClock()
+    mode = MODES[name](FakeGlasses(), clock)
+    framebuffer = mode.anim.framebuffer if hasattr(mode, "anim") else mode.framebuffer
+    result = []
+    for _ in range(frames):
+        mode.run()
+        clock.now += 1 / 60
+        result.append(list(framebuffer.pixels))
+    return result
+
+
+def loopback(packets, expected, drop=None):
+    """Feed each frame's packets (except frame 'drop') to a parser, return
+    it, the numbers of frames decoded wrong, and seconds spent decoding."""
+    surface = Surface(18, 5)
+    parser = StreamParser(surface)
+    uart = FakeUART()
+    wrong, seconds = [], 0.0
+    for n, data in enumerate(packets):
+        if n == drop:
+            continue
+        start = time.perf_counter()
+        for i in range(0, len(data), NOTIFICATION):
+            uart.arrive(data[i : i + NOTIFICATION])
+            parser.poll(uart)
+        seconds += time.perf_counter() - start
+        if list(surface.pixels) != expected[n]:
+            wrong.append(n)
+    return parser, wrong, seconds
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    bandwidth = int(sys.argv[2]) if len(sys.argv) > 2 else BANDWIDTH
+    failed = 0
+    print("%-9s %-6s %10s %8s %10s" % ("source", "coding", "bytes/frm", "fps", "decode us"))
+    for name in SOURCES:
+        source = record(name, frames)
+        expected = [[gammify(color) for color in pixels] for pixels in source]
+        for coding, encodings in ENCODINGS.items():
+            encoder = Encoder(encodings)
+            packets = [encoder.encode(pixels) for pixels in source]
+            parser, wrong, seconds = loopback(packets, expected)
+            size = sum(map(len, packets)) / frames
+            failed += len(wrong) + (parser.frames != frames)
+            print("%-9s %-6s %10.1f %8.1f %10.0f%s" % (
+                name, coding, size, bandwidth / size, seconds / frames * 1e6,
+                "  FAILED: %d frames wrong" % len(wrong) if wrong else ""))
+
+    # Drop a frame: later deltas are ignored until the next keyframe
+    source = record("pendulum", 60)
+    expected = [[gammify(color) for color in pixels] for pixels in source]
+    encoder = Encoder((RAW, DELTA), keyframe_every=30)
+    packets = [encoder.encode(pixels) for pixels in source]
+    keyframe = 30
+    parser, wrong, _ = loopback(packets, expected, drop=10)
+    ok = parser.missed == keyframe - 11 and all(10 <= n < keyframe for n in wrong)
+    print("lost frame: %d deltas ignored, picture recovered at keyframe: %s" % (parser.missed, "ok" if ok else "FAILED"))
+    failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Time AudioEyes column table setup three ways for each FFT size: the full
+log()/2** math, a memoized switch, and loading from a save_tables() file
+(checked to round-trip within float32 precision). Then runs a few frames
+for every FFT size and window function to make sure they all render.
+
+    python -m host.bench_tables"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import AudioEyes as audio
+from AudioEyes import AudioEyes, FFT_SIZES, WINDOWS
+from host.bench_audio import random_audio
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+
+def main():
+    eyes = AudioEyes(FakeGlasses(), FakePDMIn(random_audio(1)))
+    path = os.path.join(tempfile.mkdtemp(), "audio_tables.bin")
+    failed = 0
+
+    for fft_size in FFT_SIZES:
+        audio._weights_cache.clear()
+        start = time.perf_counter()
+        eyes.configure(fft_size)
+        computed = time.perf_counter() - start
+        eyes.configure(256)
+        start = time.perf_counter()
+        eyes.configure(fft_size)
+        switched = time.perf_counter() - start
+
+        expected = eyes.weights
+        audio.save_tables(path)
+        audio._weights_cache.clear()
+        start = time.perf_counter()
+        audio.load_tables(path)
+        loaded = time.perf_counter() - start
+        key = (fft_size, eyes.low_bin, eyes.high_bin, eyes.glasses.width)
+        if not np.allclose(audio._weights_cache[key], expected, rtol=1e-6):
+            print("fft %d: table file round trip differs" % fft_size)
+            failed += 1
+        print(
+            "fft %d (bins %d-%d): math %.2f ms, switch %.3f ms, load %.2f ms, file %d bytes"
+            % (fft_size, eyes.low_bin, eyes.high_bin, computed * 1000, switched * 1000,
+               loaded * 1000, os.path.getsize(path))
+        )
+
+    for fft_size in FFT_SIZES:
+        for window in WINDOWS:
+            eyes.configure(fft_size, window)
+            for _ in range(20):
+                eyes.run()
+            print("fft %d %s: ok, level offset %.2f" % (fft_size, window, eyes.level_offset))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
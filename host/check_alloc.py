@@ -0,0 +1,64 @@
+"""Run BlinkyEyes against a FakeGlasses and check its steady-state frame
+loop, using the mem_alloc/alloc_bytes hook with tracemalloc standing in
+for gc.mem_alloc(). Random numbers are seeded and time is simulated (60
+frames/second), so every run sees the same frames and the same result.
+
+Two things are checked, after a warm-up for one-time allocations (lookup
+tables, interned ints):
+  - retained: heap growth over all frames (frame start to frame start, as
+    alloc_bytes counts it) must be nothing, give or take a little slack for
+    objects that merely change size, like the counters themselves.
+  - allocated: the most heap any one frame takes while it runs. Python
+    can't do float math without allocating (CPython, and CircuitPython on
+    most boards), so this isn't zero, but it must stay within a few dozen
+    bytes of what the loop's float temporaries take now, so even a small
+    buffer or color list built per frame fails it. That is the guarantee:
+    no per-frame buffers, not zero allocation.
+
+    python -m host.check_alloc [frames]"""
+
+import random
+import sys
+import tracemalloc
+from BlinkyEyes import BlinkyEyes
+from host.checks import check
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+
+SLACK = 128  # Bytes retained; 96 measured
+# Bytes allocated within a frame: 864 measured, about 2.7K before
+# preallocation
+TEMPORARIES = 928
+
+
+def traced():
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(1)
+    clock = FakeClock()
+    eyes = BlinkyEyes(FakeGlasses())
+    eyes.clock = clock
+    tracemalloc.start()
+    eyes.mem_alloc = traced
+    for _ in range(1000):  # Warm-up
+        eyes.run()
+        clock.now += 1 / 60
+    start, most = eyes.alloc_bytes, 0
+    for _ in range(frames):
+        before = traced()
+        tracemalloc.reset_peak()
+        eyes.run()
+        most = max(most, tracemalloc.get_traced_memory()[1] - before)
+        clock.now += 1 / 60
+    grown = eyes.alloc_bytes - start
+    tracemalloc.stop()
+    failed = check("%d frames: %d bytes retained" % (frames, grown), grown <= SLACK)
+    failed += check("at most %d bytes allocated in a frame" % most, most <= TEMPORARIES)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Check PacketParser against Bluefruit Connect byte streams arriving
+through a fake UART in random pieces: packets split across reads, many in
+one read (more than the ring holds), and mixed with noise and corrupt
+packets, which must be skipped without losing the good ones around them.
+Then reports packets/sec.
+
+    python -m host.check_ble_parser [packets]"""
+
+import random
+import struct
+import sys
+import time
+from PacketParser import PacketParser
+from host.checks import check
+
+
+def packet(kind, payload):
+    data = b"!" + kind + payload
+    return data + bytes((~sum(data) & 0xFF,))
+
+
+def color_packet(color):
+    return packet(b"C", bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)))
+
+
+def random_packets(rng, count):
+    """(bytes, kind, value) for a random mix of packet types."""
+    packets = []
+    for _ in range(count):
+        choice = rng.random()
+        if choice < 0.6:
+            color = rng.randrange(0x1000000)
+            packets.append((color_packet(color), "color", color))
+        elif choice < 0.8:
+            button = (str(rng.randrange(1, 9)), rng.random() < 0.5)
+            data = packet(b"B", (button[0] + ("1" if button[1] else "0")).encode())
+            packets.append((data, "button", button))
+        elif choice < 0.95:
+            packets.append((packet(b"A", struct.pack("<fff", 0.0, 1.0, 9.8)), "other", None))
+        else:
+            packets.append((packet(b"Q", struct.pack("<ffff", 1.0, 0.0, 0.0, 0.0)), "other", None))
+    return packets
+
+
+class FakeUART:
+    """UARTService stand-in: bytes arrive when given to arrive(), and
+    readinto() never returns more than has arrived."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.reads = 0
+
+    def arrive(self, data):
+        self.data += data
+
+    @property
+    def in_waiting(self):
+        return len(self.data)
+
+    def readinto(self, buf, nbytes=None):
+        n = min(len(buf) if nbytes is None else nbytes, len(self.data))
+        if not n:
+            return None  # As CircuitPython's, after its timeout
+        buf[:n] = self.data[:n]
+        del self.data[:n]
+        self.reads += 1
+        return n
+
+
+def feed(parser, stream, rng, largest):
+    """Deliver 'stream' in random pieces of 1 to 'largest' bytes, polling
+    after each; return the colors and buttons seen after each poll."""
+    uart = FakeUART()
+    colors, buttons = [], []
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1, largest)
+        uart.arrive(stream[position : position + size])
+        position += size
+        parser.poll(uart)
+        if parser.color is not None:
+            colors.append(parser.color)
+            parser.color = None
+        if parser.button is not None:
+            buttons.append((parser.button, parser.pressed))
+            parser.button = None
+    return colors, buttons
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(1)
+    failed = 0
+    packets = random_packets(rng, count)
+    stream = b"".join(data for data, _, _ in packets)
+    colors = [value for _, kind, value in packets if kind == "color"]
+
+    # Split into pieces from a byte at a time to far more than the ring
+    for largest in (1, 7, 20, 300):
+        parser = PacketParser()
+        seen, _ = feed(parser, stream, rng, largest)
+        ok = parser.packets == count and not parser.dropped and seen[-1] == colors[-1]
+        ok = ok and all(color in colors for color in seen)
+        failed += check("pieces of up to %d bytes, %d/%d packets" % (largest, parser.packets, count), ok)
+
+    # One poll per packet sees every color and button, in order
+    parser = PacketParser()
+    uart = FakeUART()
+    seen = []
+    for data, kind, value in packets:
+        uart.arrive(data)
+        parser.poll(uart)
+        if kind == "color":
+            seen.append(parser.color == value)
+        elif kind == "button":
+            seen.append((parser.button, parser.pressed) == value)
+    failed += check("each packet decoded as sent", all(seen))
+
+    # Noise between packets, and corrupt packets, are skipped
+    good, noisy = [], bytearray()
+    for data, kind, value in packets:
+        roll = rng.random()
+        if roll < 0.1:
+            noisy += bytes(rng.randrange(256) for _ in range(rng.randint(1, 10)))
+        if roll > 0.9:
+            data = bytearray(data)
+            data[rng.randrange(2, len(data))] ^= 1 << rng.randrange(8)  # Bit flip
+            noisy += data
+            continue
+        noisy += data
+        good.append((kind, value))
+    parser = PacketParser()
+    feed(parser, bytes(noisy), rng, 20)
+    # Noise can hide a packet start now and then, e.g. a stray "!C"
+    failed += check(
+        "noise and corruption, %d/%d good packets, %d bytes skipped" % (parser.packets, len(good), parser.dropped),
+        len(good) * 0.98 <= parser.packets <= len(good),
+    )
+
+    parser = PacketParser()
+    uart = FakeUART()
+    start = time.perf_counter()
+    for _ in range(5):
+        uart.arrive(stream)
+        while uart.in_waiting:
+            parser.poll(uart)
+    print("%.0f packets/sec" % (count * 5 / (time.perf_counter() - start)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
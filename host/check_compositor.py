@@ -0,0 +1,132 @@
+"""Check the Compositor: the blend modes' math, then audio and pendulum
+modes running together in one Stack (pendulum layer blended MAX over the
+audio layer) against each run alone into its own FakeGlasses from the same
+fake microphone, accelerometer trace and clock. Audio draws only the
+matrix and the pendulums only the rings, so every register must be the
+brighter of the two alone. Then reports pixels blended per frame and
+microseconds per frame for the stack, and checks that with the pendulum
+layer alone only the rings are blended again. Also checks that a plain
+FrameBuffer leaves the LEDs of transparent pixels as they were, whether
+a ring shares them or not.
+
+    python -m host.check_compositor [frames]"""
+
+import random
+import sys
+import time
+from AudioEyes import AudioEyes
+from Compositor import ADD, MAX, OVER, Compositor, Stack, composite
+from FrameBuffer import FrameBuffer
+from PendulumEyes import PendulumEyes
+from host.bench_audio import random_audio
+from host.checks import check
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+from host.fake_lis3dh import FifoLIS3DH, synthetic_trace
+from host.fake_pdmin import FakePDMIn
+
+
+def check_blends():
+    failed = 0
+    below, color = 0x204080, 0xF08010
+    failed += check("over, opaque", composite(below, color, 255, OVER) == color)
+    failed += check("over, transparent", composite(below, color, 0, OVER) == below)
+    failed += check("over, half", composite(below, color, 128, OVER) == 0x875F47)
+    failed += check("add", composite(below, color, 255, ADD) == 0xFFC090)
+    failed += check("max", composite(below, color, 255, MAX) == 0xF08080)
+    return failed
+
+
+def check_transparent():
+    framebuffer = FrameBuffer(FakeGlasses())
+    pixels, buf = framebuffer.pixels, framebuffer.ledmap.buffer
+    for i in range(framebuffer.size):
+        pixels[i] = 0x204080
+    framebuffer.commit()  # First commit stores everything, opaque
+    before = bytes(buf)
+    for i in range(framebuffer.size):
+        pixels[i] = 0xF08010
+    framebuffer.set_alpha(0, framebuffer.size, 0)
+    framebuffer.commit()
+    failed = check("transparent pixels keep their LEDs", bytes(buf) == before)
+    # Opaque again: one unshared matrix pixel and the left ring (on top of
+    # the matrix where they share LEDs) change, nothing else
+    unshared = next(i for i in range(framebuffer.left_ring) if framebuffer.other[i] == i)
+    framebuffer.set_alpha(unshared, unshared + 1)
+    framebuffer.fill_ring(framebuffer.left_ring, 0xF08010)
+    framebuffer.commit()
+    changed = sum(a != b for a, b in zip(buf, before))
+    failed += check("opaque pixels stored, %d registers changed" % changed, changed == 25 * 3)
+    return failed
+
+
+def make(trace, clock, compositor=None):
+    """Audio and pendulum modes, into their own glasses or the
+    compositor's layers."""
+    random.seed(1)  # Same pendulum angles and frictions
+    glasses = compositor.held if compositor else FakeGlasses()
+    audio = AudioEyes(
+        glasses, FakePDMIn(random_audio(1)), hop_size=128,
+        framebuffer=compositor.layer() if compositor else None,
+    )
+    glasses = compositor.held if compositor else FakeGlasses()
+    lis3dh = FifoLIS3DH(trace, clock)
+    pendulum = PendulumEyes(
+        glasses, lis3dh, clock=clock, device=lis3dh,
+        framebuffer=compositor.layer(MAX) if compositor else None,
+    )
+    return audio, pendulum
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    failed = check_blends()
+    failed += check_transparent()
+    trace = synthetic_trace(frames * 2 + 100)
+    clock = FakeClock()
+    audio, pendulum = make(trace, clock)
+    glasses = FakeGlasses()
+    compositor = Compositor(glasses)
+    stack = Stack(compositor, make(trace, clock, compositor))
+
+    blended = []
+    commit = compositor.commit
+
+    def counting_commit():
+        blended.append(max(compositor.end, max(layer.end for layer in compositor.layers))
+                       - min(compositor.start, min(layer.start for layer in compositor.layers)))
+        commit()
+
+    compositor.commit = counting_commit
+    mismatched = 0
+    for frame in range(1, frames + 1):
+        clock.now = frame / 60
+        audio.run()
+        pendulum.run()
+        stack.run()
+        expected = bytes(map(max, audio.glasses._pixel_buffer, pendulum.glasses._pixel_buffer))
+        if glasses._pixel_buffer != expected:
+            mismatched += 1
+    failed += check("audio + pendulum, %d/%d frames differ" % (mismatched, frames), not mismatched)
+    print("pixels blended: %d first frame, %.0f/frame after (of %d)"
+          % (blended[0], sum(blended[1:]) / (len(blended) - 1), compositor.size))
+
+    start = time.perf_counter()
+    for frame in range(frames + 1, frames * 2 + 1):
+        clock.now = frame / 60
+        stack.run()
+    print("stack: %.0f us/frame" % ((time.perf_counter() - start) / frames * 1e6))
+
+    alone = Stack(compositor, stack.modes[1:])  # Pendulum layer only
+    del blended[:]
+    for frame in range(frames * 2 + 1, frames * 2 + 11):
+        clock.now = frame / 60
+        alone.run()
+    print("pendulum alone: %d pixels blended first frame, %d/frame after"
+          % (blended[0], max(blended[1:])))
+    failed += check("pendulum alone blends rings only", max(blended[1:]) == 48)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Check that PendulumEyes' physics don't depend on frame rate: the same
+accelerometer trace, replayed through a fake LIS3DH FIFO against a fake
+clock, is rendered at several frame rates (and at random intervals), and
+at each whole second the pendulums must be in exactly the same place and
+the rings exactly the same colors.
+
+    python -m host.check_fixed_step [seconds] [trace.csv]"""
+
+import random
+import sys
+from PendulumEyes import PendulumEyes
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+from host.fake_lis3dh import FifoLIS3DH, synthetic_trace
+
+RATES = (24, 60, 144, "random")
+
+
+def replay(trace, fps, seconds):
+    """Run PendulumEyes at 'fps' (or random 1-100 ms frames) for 'seconds',
+    return (angles, ring registers) at the end of every whole second, and
+    samples lost to FIFO overrun."""
+    random.seed(1)  # Same starting angles and frictions for every rate
+    clock = FakeClock()
+    lis3dh = FifoLIS3DH(trace, clock)
+    eyes = PendulumEyes(FakeGlasses(), lis3dh, clock=clock, device=lis3dh)
+    rng = random.Random(2)
+    snapshots, frame = [], 0
+    for second in range(1, seconds + 1):
+        while True:
+            frame += 1
+            if fps == "random":
+                clock.now = min(clock.now + rng.uniform(0.001, 0.1), second)
+            else:
+                clock.now = min(frame / fps, second)
+            eyes.run()
+            if clock.now == second:
+                break
+        snapshots.append((list(eyes.pendulums.angle), bytes(eyes.glasses._pixel_buffer)))
+    return snapshots, eyes.accel.lost
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if len(sys.argv) > 2:
+        from host.fake_lis3dh import FakeLIS3DH
+
+        trace = FakeLIS3DH.from_csv(sys.argv[2]).trace
+    else:
+        trace = synthetic_trace(seconds * 100)
+    expected, _ = replay(trace, RATES[0], seconds)
+    failed = 0
+    for fps in RATES[1:]:
+        got, lost = replay(trace, fps, seconds)
+        same = sum(a == b for a, b in zip(expected, got))
+        ok = same == seconds and not lost
+        failed += not ok
+        print("%s fps: %d/%d seconds match %s fps, %d samples lost: %s"
+              % (fps, same, seconds, RATES[0], lost, "ok" if ok else "FAILED"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Compare PendulumEyes' batched pendulum physics and table-driven ring
+render against the original one-pendulum-at-a-time loop with its per-pixel
+distance branches: both run from the same random start on the same
+accelerometer trace, and every ring LED must agree to within 1 (the table
+quantizes pendulum position to 1/32 pixel). Then reports frames/second for
+each, and for several pendulums per ring.
+
+    python -m host.check_pendulum [frames]"""
+
+import math
+import random
+import sys
+import time
+from PendulumEyes import PendulumEyes
+from host.fake_glasses import FakeGlasses
+from host.fake_lis3dh import FakeLIS3DH
+
+
+class Reference:
+    """The original Pendulum class, kept here as the reference."""
+
+    def __init__(self, ring, color):
+        self.ring = ring
+        self.color = color
+        self.angle = random.random()
+        self.momentum = 0
+        self.friction = random.uniform(0.85, 0.9)
+
+    def interp(self, pixel, scale):
+        self.ring[pixel] = (
+            (int(self.color[0] * scale) << 16)
+            | (int(self.color[1] * scale) << 8)
+            | int(self.color[2] * scale)
+        )
+
+    def iterate(self, xyz):
+        self.momentum = (
+            self.momentum * self.friction
+            - (math.cos(self.angle) * xyz[2] + math.sin(self.angle) * xyz[0]) * 0.05
+        )
+        self.angle += self.momentum
+        midpoint = self.angle * 12 / math.pi % 24
+        for i in range(24):
+            dist = abs(midpoint - i)
+            if dist > 12:
+                dist = 24 - dist
+            if dist > 5:
+                self.ring[i] = 0
+            elif dist < 2:
+                self.interp(i, 1.0)
+            else:
+                self.interp(i, (5 - dist) / 3)
+
+
+def reference_frame(pendulums, accel):
+    for p in pendulums:
+        p.iterate(accel)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(1)
+    reference = FakeGlasses()
+    pendulums = [Reference(reference.left_ring, (0, 20, 50)), Reference(reference.right_ring, (0, 20, 50))]
+    random.seed(1)
+    eyes = PendulumEyes(FakeGlasses(), FakeLIS3DH())
+    lis3dh = FakeLIS3DH()  # One trace feeds both
+    worst = 0
+    for _ in range(frames):
+        accel = lis3dh.acceleration
+        reference_frame(pendulums, accel)
+        eyes.pendulums.iterate(accel)
+        eyes.framebuffer.commit()
+        worst = max(worst, max(abs(a - b) for a, b in zip(reference._pixel_buffer, eyes.glasses._pixel_buffer)))
+    print("largest LED difference: %d" % worst)
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        reference_frame(pendulums, lis3dh.acceleration)
+    print("reference: %.0f frames/sec" % (frames / (time.perf_counter() - start)))
+    for colors in (((0, 20, 50),), ((0, 20, 50), (50, 0, 20), (20, 50, 0), (40, 40, 40))):
+        eyes = PendulumEyes(FakeGlasses(), FakeLIS3DH(), colors)
+        start = time.perf_counter()
+        for _ in range(frames):
+            eyes.pendulums.iterate(lis3dh.acceleration)
+        print("batched, %d per ring: %.0f frames/sec" % (len(colors), frames / (time.perf_counter() - start)))
+    return 1 if worst > 1 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
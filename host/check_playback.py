@@ -0,0 +1,79 @@
+"""Check EyeLightsAnim's frame numbering against a fake clock: frame 0 can
+be requested, time-driven playback shows the frame due by the clock no
+matter how often it's called, LOOP/PING_PONG/ONCE orders, and skipping
+(or not) frames when the caller falls behind.
+
+    python -m host.check_playback"""
+
+import random
+import sys
+from eyelights_anim import EyeLightsAnim, Playback, LOOP, PING_PONG, ONCE
+from host.checks import check
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+
+
+def sequence(mode, frames, steps):
+    clock = FakeClock()
+    playback = Playback(10, mode, clock=clock)
+    out = []
+    for step in range(steps):
+        clock.now = (step + 0.5) / 10  # Mid-frame, clear of rounding
+        playback.update()
+        out.append(playback.index(frames))
+    return out, playback
+
+
+def main():
+    failed = 0
+    make = lambda: EyeLightsAnim(FakeGlasses(), "matrix.bmp", "rings.bmp")
+
+    fresh, jumped = make(), make()
+    fresh.frame()  # First frame() advances to frame 0
+    jumped.frame(5, 5)
+    jumped.frame(0, 0)
+    failed += check("frame 0 by number", jumped.glasses._pixel_buffer == fresh.glasses._pixel_buffer)
+
+    loop, _ = sequence(LOOP, 4, 10)
+    failed += check("loop order", loop == [0, 1, 2, 3, 0, 1, 2, 3, 0, 1])
+    pong, _ = sequence(PING_PONG, 4, 10)
+    failed += check("ping-pong order", pong == [0, 1, 2, 3, 2, 1, 0, 1, 2, 3])
+    once, playback = sequence(ONCE, 4, 6)
+    failed += check("one-shot order", once == [0, 1, 2, 3, 3, 3] and playback.done(4))
+
+    # Called at random intervals, as a loop doing other work would, the
+    # frame shown is always the one due by the clock
+    clock = FakeClock()
+    anim = make()
+    anim.play(24, clock=clock)
+    on_time = drawn = 0
+    for _ in range(1000):
+        clock.now += random.uniform(0.001, 0.1)
+        drawn += anim.frame()
+        on_time += anim.matrix_frame == int(clock.now * 24) % anim.matrix_frames
+    failed += check("frames follow the clock", on_time == 1000 and drawn < 1000)
+    failed += check("frames skipped when behind", anim.playback.skipped > 0)
+
+    clock = FakeClock()
+    anim = make()
+    anim.play(10, skip=False, clock=clock)
+    anim.frame()
+    clock.now += 1.0  # A long stall...
+    anim.frame()
+    clock.now += 0.1
+    anim.frame()
+    failed += check("no skipping shows every frame", anim.matrix_frame == 2 and anim.playback.skipped == 0)
+
+    clock = FakeClock()
+    anim = make()
+    anim.play(10, clock=clock)
+    first = anim.frame()
+    again = anim.frame()
+    anim.invalidate()
+    failed += check("idle until due", first and not again and anim.frame())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    sys.exit(main())
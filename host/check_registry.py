@@ -0,0 +1,153 @@
+"""Check ModeRegistry and the Runtime's enter()/exit() switching in the
+simulator, with modes set up as code.py does (audio and pendulum as parts
+of compositor Stacks): reports boot-to-first-frame time building every
+mode up front against building only the first, and mode switch latency
+cold (building the mode) and warm (cached). Checks that switching via
+enter() shows exactly what clearing the glasses first did, and that under
+a small heap budget (measured with tracemalloc) idle modes are dropped,
+the budget held, and compositor layers don't pile up.
+
+    python -m host.check_registry [cycles]"""
+
+import random
+import sys
+import time
+import tracemalloc
+from AudioEyes import AudioEyes
+from BlinkyEyes import BlinkyEyes
+from Compositor import MAX, Compositor, Stack
+from ModeRegistry import ModeRegistry
+from PendulumEyes import PendulumEyes
+from Runtime import Runtime
+from TintedGlasses import TintedGlasses
+from host.bench_audio import random_audio
+from host.checks import check
+from host.fake_clock import FakeClock
+from host.fake_glasses import FakeGlasses
+from host.fake_lis3dh import FifoLIS3DH
+from host.fake_pdmin import FakePDMIn
+
+MODES = ("blinky", "audio", "pendulum", "both")
+AUDIO = random_audio(1)  # Made once, so it doesn't count as AudioEyes' heap
+
+
+class NoEnter:
+    """A mode with its enter() hidden, so the Runtime clears instead."""
+
+    def __init__(self, mode):
+        self.mode = mode
+
+    def __getattr__(self, name):
+        if name == "enter":
+            raise AttributeError(name)
+        return getattr(self.mode, name)
+
+
+def setup(budget=None, mem_free=None, hooks=True):
+    """Glasses, a registry of modes as in code.py, and a Runtime on them."""
+    random.seed(1)
+    fake, clock = FakeGlasses(), FakeClock()
+    glasses = TintedGlasses(fake)
+    compositor = Compositor(glasses)
+    modes = ModeRegistry(budget, mem_free, clock)
+    wrap = (lambda mode: mode) if hooks else NoEnter
+
+    def blinky():
+        mode = BlinkyEyes(glasses)
+        mode.clock = clock
+        return wrap(mode)
+
+    def drop_layer(mode):
+        compositor.remove(mode.framebuffer)
+
+    def pendulum_eyes():
+        lis3dh = FifoLIS3DH(clock=clock)
+        return PendulumEyes(compositor.held, lis3dh, clock=clock, framebuffer=compositor.layer(MAX), device=lis3dh)
+
+    modes.add("blinky", blinky, 60)
+    modes.add("audio", lambda: wrap(Stack(compositor, [modes.get("audio eyes")])), 60)
+    modes.add("pendulum", lambda: wrap(Stack(compositor, [modes.get("pendulum eyes")])), 60)
+    modes.add("both", lambda: wrap(Stack(compositor, [modes.get("audio eyes"), modes.get("pendulum eyes")])), 60)
+    modes.add(
+        "audio eyes",
+        lambda: AudioEyes(compositor.held, FakePDMIn(AUDIO), hop_size=128, framebuffer=compositor.layer()),
+        release=drop_layer,
+    )
+    modes.add("pendulum eyes", pendulum_eyes, release=drop_layer)
+    return fake, clock, compositor, modes, Runtime(modes, glasses, clock)
+
+
+def frame(runtime, clock):
+    runtime.mode.run()
+    clock.now += 1 / 60
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failed = 0
+
+    start = time.perf_counter()
+    fake, clock, compositor, modes, runtime = setup()
+    frame(runtime, clock)
+    lazy = time.perf_counter() - start
+    start = time.perf_counter()
+    fake, clock, compositor, modes, runtime = setup()
+    for index in range(len(modes)):
+        modes[index]  # Build them all, as code.py used to
+    runtime.select(0)
+    frame(runtime, clock)
+    eager = time.perf_counter() - start
+    print("boot to first frame: %.1f ms building all modes, %.1f ms building the first" % (eager * 1000, lazy * 1000))
+
+    # Switch through the modes, via enter() and via clearing first
+    cold, warm, shown, shows = [], [], [], []
+    for hooks in (True, False):
+        fake, clock, compositor, modes, runtime = setup(hooks=hooks)
+        shown.append([])
+        for _ in range(cycles):
+            for n in range(len(MODES)):
+                for _ in range(10):
+                    frame(runtime, clock)
+                built = modes.built(MODES[(n + 1) % len(MODES)]) is not None
+                start = time.perf_counter()
+                runtime.next()
+                frame(runtime, clock)
+                if hooks:
+                    (warm if built else cold).append(time.perf_counter() - start)
+                shown[-1].append(bytes(fake._pixel_buffer))
+        shows.append(fake.shows)
+    mismatched = sum(a != b for a, b in zip(*shown))
+    print("switch latency: %.1f ms cold (%d), %.1f ms warm (%d)" % (
+        sum(cold) / len(cold) * 1000, len(cold), sum(warm) / len(warm) * 1000, len(warm)))
+    failed += check("enter() shows what clearing did, %d/%d switches differ"
+                    % (mismatched, cycles * len(MODES)), not mismatched)
+    failed += check("no clearing via enter()", shows[0] < shows[1])
+
+    # Under a budget that holds only about one mode
+    tracemalloc.start()
+    fake, clock, compositor, modes, runtime = setup(mem_free=lambda: (1 << 30) - tracemalloc.get_traced_memory()[0])
+    sizes = {}
+    for _ in range(len(MODES)):
+        runtime.next()
+        frame(runtime, clock)
+    for entry in modes.entries.values():
+        sizes[entry.name] = entry.size
+    budget = max(sizes[name] for name in MODES) + max(sizes["audio eyes"], sizes["pendulum eyes"])
+    fake, clock, compositor, modes, runtime = setup(budget, lambda: (1 << 30) - tracemalloc.get_traced_memory()[0])
+    over = 0
+    for _ in range(cycles * len(MODES)):
+        runtime.next()
+        frame(runtime, clock)
+        needed = modes.in_use()
+        if modes.total() > budget and any(e.mode is not None and e not in needed for e in modes.entries.values()):
+            over += 1
+    tracemalloc.stop()
+    print("measured: " + ", ".join("%s %d bytes" % item for item in sorted(sizes.items())))
+    failed += check("budget %d bytes: %d builds, %d drops, over budget %d times"
+                    % (budget, modes.builds, modes.drops, over), modes.drops and not over)
+    failed += check("compositor layers: %d" % len(compositor.layers), len(compositor.layers) <= 2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Run the asyncio Runtime under CPython, in real time, with simulated
+hardware: BlinkyEyes and AudioEyes on FakeGlasses, a scripted button and a
+stand-in for BleEyes whose radio connects and receives a color partway
+through. Checks frame pacing with the button and BLE tasks running
+alongside, that the color tints what's shown (and only what's shown),
+mode switch latency, and that a mode reading the UART itself is left
+alone by the listener.
+
+    python -m host.check_runtime"""
+
+import asyncio
+import sys
+from time import monotonic
+from AudioEyes import AudioEyes
+from BlinkyEyes import BlinkyEyes
+from BufferedGlasses import BufferedGlasses
+from PacketParser import PacketParser
+from Runtime import Runtime
+from TintedGlasses import TintedGlasses
+from host.bench_audio import random_audio
+from host.check_ble_parser import FakeUART, color_packet
+from host.checks import check
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+TINT = 0x80FF40
+
+
+class FakeRadio:
+    def __init__(self):
+        self.connected = self.advertising = False
+
+    def start_advertising(self, advertisement):
+        self.advertising = True
+
+
+class FakeBle:
+    """BleEyes stand-in: the same attributes, run() just counts frames."""
+
+    reads_uart = True
+
+    def __init__(self):
+        self.ble, self.advertisement = FakeRadio(), None
+        self.uart, self.parser = FakeUART(), PacketParser()
+        self.color = 0
+        self.frames = 0
+
+    def run(self):
+        self.frames += 1
+
+
+class FakeButton:
+    """ButtonManager stand-in, pressed by press()."""
+
+    def __init__(self):
+        self.pending = False
+        self.pressed_at = None
+
+    def press(self):
+        self.pending = True
+        self.pressed_at = monotonic()
+
+    def ButtonPressed(self):
+        pressed, self.pending = self.pending, False
+        return pressed
+
+
+class Timed:
+    """A mode, recording when each frame ran."""
+
+    def __init__(self, mode):
+        self.mode, self.times = mode, []
+
+    def __getattr__(self, name):
+        return getattr(self.mode, name)
+
+    def run(self):
+        self.times.append(monotonic())
+        self.mode.run()
+
+
+def tinted(fake, glasses):
+    """Whether the registers last sent are the pixel buffer, tinted."""
+    for regs, table in zip(glasses.channels, glasses.tables):
+        for r in regs:
+            if fake.i2c_device.pwm[r - 1] != table[fake._pixel_buffer[r]]:
+                return False
+    return True
+
+
+async def script(runtime, fake, blinky, audio, ble, button):
+    failed = 0
+    await asyncio.sleep(0.5)
+    gaps = [b - a for a, b in zip(blinky.times, blinky.times[1:])]
+    failed += check("60 fps with other tasks running, %d frames in 0.5 s" % len(blinky.times),
+                    27 <= len(blinky.times) <= 31 and max(gaps) < 2 / 60)
+    failed += check("advertising while disconnected", ble.ble.advertising)
+
+    ble.ble.connected = True
+    packet = color_packet(TINT)
+    ble.uart.arrive(packet[:4])  # Split across notifications
+    await asyncio.sleep(0.06)
+    ble.uart.arrive(packet[4:])
+    await asyncio.sleep(0.1)
+    glasses = runtime.glasses
+    failed += check("BLE color tints the running mode", glasses.tint == TINT and tinted(fake, glasses))
+    failed += check("pixel buffer left untinted", fake.i2c_device.pwm != fake._pixel_buffer[1:])
+
+    button.press()
+    await asyncio.sleep(0.1)
+    latency = audio.times[0] - button.pressed_at if audio.times else 1
+    failed += check("switch to audio, first frame %.1f ms after press" % (latency * 1000),
+                    latency < 0.03 and runtime.switches == 1)
+    count = len(blinky.times)
+    await asyncio.sleep(0.1)
+    failed += check("previous mode's task idle", len(blinky.times) == count)
+    failed += check("tint carried over", tinted(fake, glasses))
+
+    button.press()
+    await asyncio.sleep(0.05)
+    ble.uart.arrive(color_packet(0x0000FF))
+    await asyncio.sleep(0.2)
+    failed += check("UART left to a mode reading it itself",
+                    ble.frames and ble.uart.in_waiting and glasses.tint is None)
+    return failed
+
+
+async def main_async():
+    fake = FakeGlasses()
+    glasses = TintedGlasses(BufferedGlasses(fake))
+    blinky = Timed(BlinkyEyes(glasses))
+    audio = Timed(AudioEyes(glasses, FakePDMIn(random_audio(1)), hop_size=128))
+    ble = FakeBle()
+    button = FakeButton()
+    runtime = Runtime([(blinky, 60), (audio, 30), (ble, 10)], glasses)
+    task = asyncio.create_task(runtime.main(button, ble))
+    failed = await script(runtime, fake, blinky, audio, ble, button)
+    if task.done():  # A task raised
+        task.result()
+    task.cancel()
+    return failed
+
+
+def main():
+    failed = asyncio.run(main_async())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
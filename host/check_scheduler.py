@@ -0,0 +1,57 @@
+"""Check Scheduler's frame pacing against a fake clock: frames land on
+their deadlines, idle time is slept rather than spun, an overrunning frame
+restarts pacing instead of bursting to catch up, and uncapped modes run
+back to back.
+
+    python -m host.check_scheduler"""
+
+import sys
+from Scheduler import Scheduler
+from host.checks import check
+from host.fake_clock import FakeClock
+
+
+class FakeMode:
+    def __init__(self, clock, cost):
+        self.clock, self.cost = clock, cost
+        self.times = []  # When each frame started
+
+    def run(self):
+        self.times.append(self.clock.now)
+        self.clock.now += self.cost() if callable(self.cost) else self.cost
+
+
+def run_for(scheduler, clock, seconds):
+    end = clock.now + seconds
+    while clock.now < end:
+        scheduler.step()
+
+
+def main():
+    failed = 0
+    clock = FakeClock()
+    steady = FakeMode(clock, 0.004)
+    fast = FakeMode(clock, 0.001)
+    costs = iter([0.004] * 10 + [0.1] + [0.004] * 100)
+    hiccup = FakeMode(clock, lambda: next(costs))
+    scheduler = Scheduler([(steady, 50), (fast, None), (hiccup, 50)], clock, clock.sleep)
+
+    run_for(scheduler, clock, 1.0)
+    gaps = [b - a for a, b in zip(steady.times, steady.times[1:])]
+    failed += check("50 fps pacing", len(steady.times) == 50 and max(abs(g - 0.02) for g in gaps) < 1e-9)
+    failed += check("idle time slept", abs(clock.slept - (1.0 - 50 * 0.004)) < 0.02)
+
+    scheduler.next()
+    clock.slept = 0.0
+    run_for(scheduler, clock, 0.1)
+    failed += check("uncapped runs back to back", len(fast.times) >= 99 and clock.slept == 0)
+
+    scheduler.next()
+    run_for(scheduler, clock, 1.0)
+    gaps = [b - a for a, b in zip(hiccup.times, hiccup.times[1:])]
+    failed += check("overrun restarts pacing", scheduler.late == 1 and min(gaps) > 0.02 - 1e-9)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""Reporting shared by the host check scripts."""
+
+
+def check(name, ok):
+    """Print a named result, and return 1 if it failed (for summing into an
+    exit status), else 0."""
+    print("%s: %s" % (name, "ok" if ok else "FAILED"))
+    return 0 if ok else 1
@@ -0,0 +1,150 @@
+"""Compile an EyeLightsAnim BMP pair (matrix sprite sheet and/or rings
+graph, same conventions as EyeLightsAnim) into the delta-encoded .eya
+format described in eyelights_anim.py: a keyframe every so often, and
+in between only the runs of pixels that changed from the frame before.
+Copy the result to the board and pass it as EyeLightsAnim's
+matrix_filename.
+
+    python -m host.compile_anim matrix.bmp rings.bmp anim.eya [interval]
+
+Either BMP may be given as "-" if not used. Palettes with transparent
+indices are refused: .eya frames are opaque."""
+
+import os
+import struct
+import sys
+import displayio
+import adafruit_imageload
+from eyelights_anim import DELTA_HEADER, DELTA_KEYFRAME, DELTA_MAGIC
+
+WIDTH, HEIGHT = 18, 5
+INTERVAL = 32  # Default frames per keyframe
+
+
+def load(filename):
+    """Bitmap and palette colors of a BMP. .eya has no transparency, so a
+    palette with transparent indices raises ValueError rather than have
+    those pixels play opaque."""
+    bitmap, palette = adafruit_imageload.load(
+        filename, bitmap=displayio.Bitmap, palette=displayio.Palette
+    )
+    transparent = [n for n in range(len(palette)) if palette.is_transparent(n)]
+    if transparent:
+        raise ValueError(
+            "%s has transparent palette indices (%s), which .eya can't encode"
+            % (filename, ", ".join(str(n) for n in transparent))
+        )
+    return bitmap, [palette[n] for n in range(len(palette))]
+
+
+def matrix_frames(bitmap):
+    """Palette indices of each sprite sheet tile, row-major, as bytes."""
+    across, down = bitmap.width // WIDTH, bitmap.height // HEIGHT
+    if not across or not down:
+        raise ValueError("Matrix bitmap must be at least 18x5 pixels")
+    frames = []
+    for frame in range(across * down):
+        left, top = frame % across * WIDTH, frame // across * HEIGHT
+        frames.append(
+            bytes(bitmap[x, y] for y in range(top, top + HEIGHT) for x in range(left, left + WIDTH))
+        )
+    return frames
+
+
+def ring_frames(bitmap):
+    """Palette indices of each column's 48 ring LEDs, as bytes."""
+    if bitmap.height < 48:
+        raise ValueError("Ring bitmap must be at least 48 pixels tall")
+    return [bytes(bitmap[x, y] for y in range(48)) for x in range(bitmap.width)]
+
+
+def patch(before, after):
+    """Record turning frame 'before' into 'after': runs of changed pixels,
+    each as (skipped, length, indices...)."""
+    runs, i, last = [], 0, 0
+    while i < len(after):
+        if before[i] == after[i]:
+            i += 1
+            continue
+        start = i
+        while i < len(after) and i - start < 255:
+            if before[i] == after[i]:
+                # Bridge a gap of one unchanged pixel: one index byte is
+                # cheaper than starting a new run (two bytes)
+                if i + 1 < len(after) and before[i + 1] != after[i + 1] and i + 1 - start < 255:
+                    i += 1
+                    continue
+                break
+            i += 1
+        runs.append([start - last, i - start])
+        last = i
+    record = bytearray([len(runs)])
+    pos = 0
+    for skip, length in runs:
+        pos += skip
+        record += bytes((skip, length)) + after[pos : pos + length]
+        pos += length
+    return bytes(record)
+
+
+def encode_track(frames, palette, interval, base):
+    """Palette, keyframe table and frame records of one track, which will
+    start at file offset 'base'."""
+    head = struct.pack("<H", len(palette))
+    head += b"".join(bytes(((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF)) for c in palette)
+    keys = (len(frames) + interval - 1) // interval
+    start = base + len(head) + keys * 4  # First record
+    records, offsets = [], []
+    for n, frame in enumerate(frames):
+        if n % interval == 0:
+            offsets.append(start + sum(len(r) for r in records))
+            records.append(bytes([DELTA_KEYFRAME]) + frame)
+        else:
+            records.append(patch(frames[n - 1], frame))
+    return head + struct.pack("<%dI" % keys, *offsets) + b"".join(records)
+
+
+def compile_anim(matrix_filename, ring_filename, interval=INTERVAL):
+    """Return the .eya file contents for a BMP pair (either may be None)."""
+    matrix = rings = []
+    if matrix_filename:
+        bitmap, matrix_palette = load(matrix_filename)
+        matrix = matrix_frames(bitmap)
+    if ring_filename:
+        bitmap, ring_palette = load(ring_filename)
+        rings = ring_frames(bitmap)
+    data = bytearray(struct.calcsize(DELTA_HEADER))  # Header goes in last
+    if matrix:
+        data += encode_track(matrix, matrix_palette, interval, len(data))
+    rings_at = len(data) if rings else 0
+    if rings:
+        data += encode_track(rings, ring_palette, interval, len(data))
+    struct.pack_into(
+        DELTA_HEADER, data, 0, DELTA_MAGIC, 1, WIDTH, HEIGHT, 0, len(matrix), len(rings), interval, rings_at
+    )
+    return bytes(data)
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        print(__doc__)
+        return 2
+    matrix, rings, output = [None if arg == "-" else arg for arg in sys.argv[1:4]]
+    interval = int(sys.argv[4]) if len(sys.argv) > 4 else INTERVAL
+    if not 1 <= interval <= 0xFFFF:
+        print("interval must be 1 to 65535")
+        return 2
+    try:
+        data = compile_anim(matrix, rings, interval)
+    except ValueError as error:
+        print(error)
+        return 2
+    with open(output, "wb") as file:
+        file.write(data)
+    sizes = sum(os.path.getsize(name) for name in (matrix, rings) if name)
+    print("%s: %d bytes (BMPs: %d)" % (output, len(data), sizes))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
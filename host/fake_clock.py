@@ -0,0 +1,16 @@
+"""Simulated time for host checks and benchmarks: a clock function (as
+passed to modes, Scheduler and Runtime as 'clock') that only moves when
+the caller advances 'now' or sleeps on it."""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0  # Total seconds slept
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
@@ -0,0 +1,132 @@
+"""Stand-in for adafruit_is31fl3741's LED_Glasses, just enough of it for the
+animation classes to run on a desktop: a buffered 352-byte PWM register
+image, pixel_addrs() for the matrix and both rings, and a show() and page
+switching that make the same I2C writes as the real driver, to a MockI2C
+that counts bytes and keeps its own copy of the chip's PWM registers.
+Register addresses are made up (and wrap), not the real board's."""
+
+_REGISTERS = 351
+_PAGE_REG, _LOCK_REG = 0xFD, 0xFE
+
+
+class MockI2C:
+    """I2CDevice stand-in: counts bytes and transactions written (plus one
+    address byte each, as on the wire) and applies PWM writes to 'pwm', the
+    chip's 351 registers as LED_Glasses' buffer would hold them."""
+
+    def __init__(self):
+        self.transactions = self.bytes = 0
+        self.page = 0
+        self.pwm = bytearray(_REGISTERS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, buf, start=0, end=None):
+        end = len(buf) if end is None else end
+        self.transactions += 1
+        self.bytes += end - start + 1  # + I2C address byte
+        reg = buf[start]
+        if end - start == 2 and reg == _PAGE_REG:
+            self.page = buf[start + 1]
+        elif end - start == 2 and reg == _LOCK_REG:
+            pass
+        elif self.page in (0, 1):
+            first = reg + self.page * 180
+            self.pwm[first : first + end - start - 1] = buf[start + 1 : end]
+
+
+class FakeRing:
+    def __init__(self, glasses, first):
+        self._glasses = glasses
+        self._first = first
+
+    def pixel_addrs(self, led):
+        if not 0 <= led <= 23:
+            raise ValueError("led must be 0~23")
+        n = (self._first + led * 3) % _REGISTERS
+        return (n, (n + 1) % _REGISTERS, (n + 2) % _REGISTERS)
+
+    def __setitem__(self, led, color):
+        addrs = self.pixel_addrs(led)
+        buf = self._glasses._pixel_buffer
+        buf[1 + addrs[self._glasses.r_offset]] = (color >> 16) & 0xFF
+        buf[1 + addrs[self._glasses.g_offset]] = (color >> 8) & 0xFF
+        buf[1 + addrs[self._glasses.b_offset]] = color & 0xFF
+
+    def fill(self, color):
+        for n in range(24):
+            self[n] = color
+
+
+class FakeGlasses:
+    width = 18
+    height = 5
+    r_offset, g_offset, b_offset = 2, 1, 0  # BGR, like the real board
+
+    def __init__(self):
+        self._pixel_buffer = bytearray(352)
+        self.left_ring = FakeRing(self, 270)
+        self.right_ring = FakeRing(self, 270 + 72)
+        self.i2c_device = MockI2C()
+        self._page = None
+        self.shows = 0
+
+    @property
+    def page(self):
+        return self._page
+
+    @page.setter
+    def page(self, value):
+        if value != self._page:  # Unlock, then select page, as the driver does
+            self._page = value
+            self.i2c_device.write(bytes((_LOCK_REG, 0xC5)))
+            self.i2c_device.write(bytes((_PAGE_REG, value)))
+
+    @staticmethod
+    def pixel_addrs(x, y):
+        n = ((x * 5) + y) * 3
+        return (n, n + 1, n + 2)
+
+    def __getitem__(self, led):
+        return self._pixel_buffer[1 + led]
+
+    def __setitem__(self, led, pwm):
+        self._pixel_buffer[1 + led] = pwm
+
+    def pixel(self, x, y, color=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None  # Out of bounds is ignored, as on the real thing
+        addrs = self.pixel_addrs(x, y)
+        buf = self._pixel_buffer
+        if color is None:
+            return (
+                (buf[1 + addrs[self.r_offset]] << 16)
+                | (buf[1 + addrs[self.g_offset]] << 8)
+                | buf[1 + addrs[self.b_offset]]
+            )
+        buf[1 + addrs[self.r_offset]] = (color >> 16) & 0xFF
+        buf[1 + addrs[self.g_offset]] = (color >> 8) & 0xFF
+        buf[1 + addrs[self.b_offset]] = color & 0xFF
+        return None
+
+    def fill(self, color):
+        for y in range(self.height):
+            for x in range(self.width):
+                self.pixel(x, y, color)
+
+    def show(self):
+        self.shows += 1
+        buf = self._pixel_buffer
+        self.page = 0
+        with self.i2c_device as i2c:
+            i2c.write(buf, start=0, end=181)
+        self.page = 1
+        with self.i2c_device as i2c:
+            save = buf[180]
+            buf[180] = 0
+            i2c.write(buf, start=180, end=352)
+            buf[180] = save
@@ -0,0 +1,112 @@
+"""Stand-in for adafruit_lis3dh.LIS3DH_I2C: each read of 'acceleration'
+returns the next (x, y, z) reading, in m/s^2, from a recorded trace (CSV
+file, or any sequence, played in a loop) or a synthetic one. FifoLIS3DH
+adds the FIFO, sampling the trace at the data rate by a clock, and the
+I2CDevice register access AccelFifo reads it through."""
+
+import csv
+import math
+import random
+import struct
+from AccelFifo import DATA_RATES
+
+STANDARD_GRAVITY = 9.806
+
+
+def synthetic_trace(readings=600, seed=1, rate=60):
+    """Head movement at 'rate' readings/second: glasses mostly level with a
+    slow side-to-side sway and nod, the occasional sharp head turn, and a
+    little sensor noise."""
+    rng = random.Random(seed)
+    trace = []
+    turn = 0.0
+    for n in range(readings):
+        t = n / rate
+        if rng.random() < 0.01:
+            turn = rng.choice((-1, 1)) * rng.uniform(3, 8)  # Sudden jolt
+        turn *= 0.8
+        roll = 0.3 * math.sin(t * 1.3)  # Radians
+        pitch = 0.15 * math.sin(t * 0.7 + 1)
+        trace.append(
+            (
+                STANDARD_GRAVITY * math.sin(roll) + turn + rng.gauss(0, 0.1),
+                STANDARD_GRAVITY * math.sin(pitch) + rng.gauss(0, 0.1),
+                STANDARD_GRAVITY * math.cos(roll) * math.cos(pitch) + rng.gauss(0, 0.1),
+            )
+        )
+    return trace
+
+
+class FakeLIS3DH:
+    def __init__(self, trace=None):
+        self.trace = trace or synthetic_trace()
+        self.index = 0
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load x,y,z readings, one per row (rows that aren't three numbers,
+        such as a header, are skipped)."""
+        trace = []
+        with open(path, newline="") as file:
+            for row in csv.reader(file):
+                try:
+                    x, y, z = (float(value) for value in row[:3])
+                except ValueError:
+                    continue
+                trace.append((x, y, z))
+        return cls(trace)
+
+    @property
+    def acceleration(self):
+        reading = self.trace[self.index]
+        self.index = (self.index + 1) % len(self.trace)
+        return reading
+
+
+class FifoLIS3DH(FakeLIS3DH):
+    """FakeLIS3DH that is also the I2CDevice AccelFifo reads its registers
+    through (pass it as both), with the FIFO in stream mode: trace reading
+    n is sampled at time n / data rate on 'clock' (seconds, e.g. a fake
+    clock), the newest 32 kept unread, and readings come back quantized as
+    the chip's +/-2 g range would."""
+
+    def __init__(self, trace=None, clock=None):
+        super().__init__(trace)
+        self.clock = clock
+        self.data_rate = DATA_RATES[100]
+        self.range = 0  # RANGE_2_G
+        self.registers = bytearray(0x40)
+        self.sampled = 0  # Trace readings sampled so far
+        self.fifo = []
+
+    def _sample(self):
+        rate = {code: hz for hz, code in DATA_RATES.items()}[self.data_rate]
+        due = int(self.clock() * rate) + 1  # First sample at time 0
+        while self.sampled < due:
+            reading = self.trace[self.sampled % len(self.trace)]
+            self.fifo.append(
+                [max(-32768, min(32767, round(v / STANDARD_GRAVITY * 16380))) for v in reading]
+            )
+            del self.fifo[:-32]
+            self.sampled += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, buffer, *, start=0, end=None):
+        self.registers[buffer[start]] = buffer[start + 1]
+
+    def write_then_readinto(self, out_buffer, in_buffer, *, out_start=0, out_end=None, in_start=0, in_end=None):
+        register = out_buffer[out_start] & 0x7F
+        in_end = len(in_buffer) if in_end is None else in_end
+        if register == 0x2F:  # FIFO_SRC_REG
+            self._sample()
+            in_buffer[in_start] = (0x40 if len(self.fifo) == 32 else 0) | (len(self.fifo) & 0x1F)
+        elif register == 0x28:  # OUT_X_L pops a sample
+            if self.fifo:
+                struct.pack_into("<hhh", in_buffer, in_start, *self.fifo.pop(0))
+        else:
+            in_buffer[in_start:in_end] = self.registers[register : register + in_end - in_start]
@@ -0,0 +1,48 @@
+"""Stand-in for audiobusio.PDMIn, fed from a WAV file or any sequence or
+iterator of 16-bit unsigned samples instead of a microphone. record()
+returns immediately but keeps count of the audio time it would have spent
+recording, so benchmarks can add that in for throughput and latency."""
+
+import wave
+from array import array
+
+
+class FakePDMIn:
+    def __init__(self, samples, sample_rate=16000):
+        """'samples' is a sequence (played in a loop) or an iterator (which
+        must not run out)."""
+        self.sample_rate = sample_rate
+        if hasattr(samples, "__getitem__"):
+            self.samples, self.source = samples, None
+        else:
+            self.samples, self.source = None, iter(samples)
+        self.position = 0
+        self.recorded = 0  # Total samples recorded so far
+
+    @classmethod
+    def from_wav(cls, path):
+        """Load a 16-bit mono WAV file, converted to PDMIn's unsigned range."""
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError("need 16-bit mono WAV")
+            signed = array("h", wav.readframes(wav.getnframes()))
+            rate = wav.getframerate()
+        return cls(array("H", [s + 32768 for s in signed]), rate)
+
+    @property
+    def recorded_seconds(self):
+        return self.recorded / self.sample_rate
+
+    def record(self, buf, count):
+        if self.source:
+            source = self.source
+            for n in range(count):
+                buf[n] = next(source)
+        else:
+            samples, position = self.samples, self.position
+            for n in range(count):
+                buf[n] = samples[position]
+                position = (position + 1) % len(samples)
+            self.position = position
+        self.recorded += count
+        return count
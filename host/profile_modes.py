@@ -0,0 +1,41 @@
+"""Run BlinkyEyes and AudioEyes against FakeGlasses with a Profiler
+attached and print its per-stage report, then time the same frames with no
+profiler to show what profiling costs.
+
+    python -m host.profile_modes [frames]"""
+
+import sys
+import time
+from AudioEyes import AudioEyes
+from BlinkyEyes import BlinkyEyes
+from BufferedGlasses import BufferedGlasses
+from Profiler import Profiler
+from host.bench_audio import random_audio
+from host.fake_glasses import FakeGlasses
+from host.fake_pdmin import FakePDMIn
+
+MODES = (
+    ("blinky", lambda g: BlinkyEyes(g)),
+    ("audio", lambda g: AudioEyes(g, FakePDMIn(random_audio(1)))),
+)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, make in MODES:
+        timings = []
+        for profiled in (True, False):
+            mode = make(BufferedGlasses(FakeGlasses()))
+            mode.profiler = Profiler(name) if profiled else None
+            start = time.perf_counter()
+            for _ in range(frames):
+                mode.run()
+            timings.append((time.perf_counter() - start) / frames)
+            if profiled:
+                mode.profiler.dump()
+        print("  profiling overhead: %.1f us/frame" % ((timings[0] - timings[1]) * 1e6))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Encode frames of packed colors (in Surface order: matrix rows, then left
+and right rings) as FrameStream packets for StreamEyes, keeping the palette
+and previous frame between calls. Each frame is sent as whichever allowed
+encoding is smallest: raw indices, runs, or changes from the previous
+frame, with a keyframe every so often so a lost packet is recovered from.
+Keyframes start the palette afresh, sending just the colors they use.
+
+    python -m host.stream_encoder frames.txt out.bin [raw|runs|delta]
+
+reads one frame per line (packed colors as hex, space separated) and
+writes the packets to send, e.g. to the UART of a connected phone app."""
+
+import sys
+from FrameStream import DELTA, FRAME, PALETTE, RAW, RUNS
+
+ENCODINGS = {"raw": (RAW,), "runs": (RAW, RUNS), "delta": (RAW, RUNS, DELTA)}
+MAX_PAYLOAD = 255
+PALETTE_CHUNK = 84  # Colors per palette packet: 1 + 84 * 3 bytes
+
+
+def packet(kind, payload):
+    """A packet of type 'kind' (a byte) around 'payload' (bytes)."""
+    data = bytes((0x21, kind, len(payload))) + payload
+    return data + bytes((~sum(data) & 0xFF,))
+
+
+def runs(indices, start=0, end=None):
+    """(first, count, index) for each run of one index, counts up to 255."""
+    end = len(indices) if end is None else end
+    result = []
+    p = start
+    while p < end:
+        q = p + 1
+        while q < end and q - p < 255 and indices[q] == indices[p]:
+            q += 1
+        result.append((p, q - p, indices[p]))
+        p = q
+    return result
+
+
+class Encoder:
+    def __init__(self, encodings=ENCODINGS["delta"], keyframe_every=30):
+        self.encodings = encodings
+        self.keyframe_every = keyframe_every
+        self.palette = {}  # Packed color: index
+        self.previous = None  # Indices of the last frame sent
+        self.sequence = 255  # Of the last frame sent
+        self.since_keyframe = 0
+        self.encoding = None  # Of the last frame sent
+
+    def encode(self, pixels):
+        """Packets (bytes) for the next frame."""
+        palette = self.palette
+        keyframe = self.previous is None or self.since_keyframe + 1 >= self.keyframe_every
+        new = [color for color in dict.fromkeys(pixels) if color not in palette]
+        if keyframe or len(palette) + len(new) > 256:
+            # Start over with this frame's colors, so a keyframe needs
+            # nothing sent before it
+            palette.clear()
+            keyframe = True
+            new = list(dict.fromkeys(pixels))
+        data = b""
+        first = len(palette)
+        for n in range(0, len(new), PALETTE_CHUNK):
+            chunk = new[n : n + PALETTE_CHUNK]
+            payload = bytearray((first + n,))
+            for color in chunk:
+                payload += bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+            data += packet(PALETTE, bytes(payload))
+        for n, color in enumerate(new):
+            palette[color] = first + n
+
+        indices = bytes(palette[color] for color in pixels)
+        self.sequence = (self.sequence + 1) & 0xFF
+        candidates = []
+        if RAW in self.encodings:
+            candidates.append((RAW, indices))
+        if RUNS in self.encodings:
+            candidates.append((RUNS, bytes(b for _, count, index in runs(indices) for b in (count, index))))
+        if DELTA in self.encodings and not keyframe:
+            candidates.append((DELTA, self.delta(indices)))
+        encoding, body = min(
+            (c for c in candidates if len(c[1]) + 2 <= MAX_PAYLOAD), key=lambda c: len(c[1])
+        )
+        self.since_keyframe = self.since_keyframe + 1 if encoding == DELTA else 0
+        self.encoding = encoding
+        self.previous = indices
+        return data + packet(FRAME, bytes((self.sequence, encoding)) + body)
+
+    def delta(self, indices):
+        """Skip, count, index triples changing the previous frame into
+        'indices'."""
+        previous = self.previous
+        body = bytearray()
+        p = last = 0
+        while p < len(indices):
+            if indices[p] == previous[p]:
+                p += 1
+                continue
+            q = p
+            while q < len(indices) and indices[q] != previous[q]:
+                q += 1
+            for first, count, index in runs(indices, p, q):
+                skip = first - last
+                while skip > 255:
+                    body += bytes((255, 0, 0))
+                    skip -= 255
+                body += bytes((skip, count, index))
+                last = first + count
+            p = q
+        return bytes(body)
+
+
+def main():
+    source, out = sys.argv[1], sys.argv[2]
+    encoder = Encoder(ENCODINGS[sys.argv[3] if len(sys.argv) > 3 else "delta"])
+    frames = 0
+    with open(source) as lines, open(out, "wb") as file:
+        for line in lines:
+            if line.strip():
+                file.write(encoder.encode([int(word, 16) for word in line.split()]))
+                frames += 1
+    print("%d frames" % frames)
+
+
+if __name__ == "__main__":
+    main()